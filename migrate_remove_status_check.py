@@ -1,42 +1,24 @@
 """
 Migration: remove CHECK constraint from ActionList.Status
-Run once from the project directory.
-"""
-import sqlite3
-from pathlib import Path
-
-DB = r"D:\Datafiles5\softwarebuilds_other\Local_Task__List\tasks.db"
-
-con = sqlite3.connect(DB)
-cur = con.cursor()
-
-# Get current columns
-cols = [r[1] for r in cur.execute("PRAGMA table_info(ActionList)").fetchall()]
-print("Columns:", cols)
 
-cur.executescript("""
-    PRAGMA foreign_keys = OFF;
+This is now migration 2 in tasks_db.MIGRATIONS and runs automatically at
+start-up (without copying the table). Running this script applies every
+pending migration and prints how long each step took.
 
-    ALTER TABLE ActionList RENAME TO ActionList_old;
-
-    CREATE TABLE ActionList (
-        ItemID   INTEGER PRIMARY KEY AUTOINCREMENT,
-        Project  TEXT,
-        Who      TEXT,
-        Status   TEXT,
-        Priority INTEGER,
-        Action   TEXT,
-        Notes    TEXT
-    );
-
-    INSERT INTO ActionList SELECT ItemID, Project, Who, Status, Priority, Action, Notes
-    FROM ActionList_old;
+    python migrate_remove_status_check.py [--db path\\to\\tasks.db]
+"""
+import argparse
 
-    DROP TABLE ActionList_old;
+import tasks_db
 
-    PRAGMA foreign_keys = ON;
-""")
+ap = argparse.ArgumentParser(description="Apply pending tasks.db schema migrations.")
+ap.add_argument("--db", help="path to tasks.db (default: tasks_db.DB)")
+args = ap.parse_args()
+if args.db:
+    tasks_db.DB = args.db
 
-con.commit()
-con.close()
-print("Migration complete.")
+applied = tasks_db.migrate()
+for version, name, seconds, rows in applied:
+    print(f"  {version:>3}  {name}: {seconds * 1000:.0f} ms" + (f", {rows} rows" if rows else ""))
+print(f"Migration complete (schema version {tasks_db.schema_version()})."
+      if applied else f"Already at schema version {tasks_db.schema_version()}.")
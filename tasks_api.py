@@ -0,0 +1,211 @@
+"""
+JSON API for tasks.db, mounted by tasks_web under /api.
+
+Every response carries an ETag and Last-Modified taken from the db_version
+change counter, and conditional requests are answered before any task query
+runs, so polling clients get a cheap 304 until something changes.
+"""
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, jsonify, request
+
+from tasks_db import (
+    ALLOWED_STATUS, SORT_COLUMNS, fetch_one, fetch_page, fetch_status_history,
+    run_search_query, encode_cursor, decode_cursor, last_change, change_seq, changes_since,
+)
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+TASK_FIELDS = ("ItemID", "Project", "Who", "Status", "Priority", "Action", "Notes")
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@api.errorhandler(ApiError)
+def _api_error(exc):
+    return jsonify(error=str(exc)), exc.status
+
+
+def _fields():
+    raw = request.args.get("fields", "")
+    if not raw:
+        return TASK_FIELDS
+    fields = tuple(f.strip() for f in raw.split(",") if f.strip())
+    unknown = [f for f in fields if f not in TASK_FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _limit():
+    raw = request.args.get("limit", str(DEFAULT_LIMIT))
+    if not raw.isdigit() or not 1 <= int(raw) <= MAX_LIMIT:
+        raise ApiError(f"limit must be an integer from 1 to {MAX_LIMIT}")
+    return int(raw)
+
+
+def _as_dict(row, fields):
+    return {f: row[f] for f in fields}
+
+
+# @agent:ApiConditional:authority
+def _validators():
+    """Return (etag, last_modified) for the current DB state, or (None, None)."""
+    change = last_change()
+    if change is None:
+        return None, None
+    version, changed_at = change
+    modified = datetime.strptime(changed_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return f"v{version}", modified
+
+
+def _conditional(build):
+    """Answer 304 if the client's validators are current, else build() a body.
+
+    If-None-Match wins over If-Modified-Since: Last-Modified only has
+    one-second resolution, the counter doesn't.
+    """
+    etag, modified = _validators()
+    if etag is not None:
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            fresh = since is not None and modified <= since
+        if fresh:
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            response.last_modified = modified
+            return response
+    response = build()
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+        response.last_modified = modified
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+# @agent:ApiTasks:entry
+@api.route("/tasks")
+def list_tasks():
+    """Filtered task list: project, who, status (repeatable), q, sort, dir,
+    fields, limit and cursor (the next_cursor of the previous page).
+
+    With q the project/who/status filters narrow the search matches, which
+    come back in relevance order (sort and dir don't apply)."""
+    q = request.args.get("q", "").strip()
+    project = request.args.get("project") or None
+    who = request.args.get("who") or None
+    statuses = request.args.getlist("status")
+    sort = request.args.get("sort", "ItemID")
+    direction = request.args.get("dir", "desc")
+    fields = _fields()
+    limit = _limit()
+    cursor = request.args.get("cursor", "")
+    position = decode_cursor(cursor)
+
+    bad = [s for s in statuses if s not in ALLOWED_STATUS]
+    if bad:
+        raise ApiError(f"Unknown status(es): {', '.join(bad)}")
+    if sort not in SORT_COLUMNS:
+        raise ApiError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    if direction not in ("asc", "desc"):
+        raise ApiError("dir must be asc or desc")
+    if cursor and position is None:
+        raise ApiError("Invalid cursor")
+
+    def build():
+        if q:
+            offset = position if isinstance(position, int) and position > 0 else 0
+            rows = run_search_query(q, limit=limit + 1, offset=offset,
+                                    project=project, who=who, statuses=statuses)
+            next_pos = offset + limit if len(rows) > limit else None
+            rows = rows[:limit]
+        else:
+            rows, next_pos = fetch_page(
+                project, who, statuses, sort, direction,
+                after=position if isinstance(position, list) else None,
+                limit=limit,
+                columns=", ".join(fields),
+            )
+        return jsonify(
+            tasks=[_as_dict(r, fields) for r in rows],
+            next_cursor=encode_cursor(next_pos) if next_pos is not None else None,
+        )
+
+    return _conditional(build)
+
+
+# @agent:ApiTasks:entry
+@api.route("/tasks/<int:item_id>")
+def get_task(item_id):
+    fields = _fields()
+
+    def build():
+        row = fetch_one(item_id)
+        if row is None:
+            raise ApiError(f"Task {item_id} not found", 404)
+        return jsonify(_as_dict(row, fields))
+
+    return _conditional(build)
+
+
+# @agent:ApiTasks:entry
+@api.route("/tasks/<int:item_id>/history")
+def get_task_history(item_id):
+    def build():
+        if fetch_one(item_id) is None:
+            raise ApiError(f"Task {item_id} not found", 404)
+        history = fetch_status_history(item_id)
+        return jsonify(
+            item_id=item_id,
+            history=[{"status": h["status"], "changed_at": h["changed_at"]} for h in history],
+        )
+
+    return _conditional(build)
+
+
+# @agent:ApiChanges:entry
+@api.route("/changes")
+def list_changes():
+    """Incremental sync: tasks changed after ?since=<seq>, oldest first.
+
+    Returns {"changes": [{"seq", "item_id", "op", "task"}], "cursor", "more",
+    "reset"}. Store `cursor` and pass it as `since` next time; keep calling
+    while `more` is true. `reset` means `since` is older than the retained
+    change log: reload everything, then continue from `cursor`.
+    """
+    raw = request.args.get("since", "0")
+    if not raw.isdigit():
+        raise ApiError("since must be a non-negative integer")
+    fields = _fields()
+    limit = _limit()
+    if change_seq() is None:
+        raise ApiError("Change log is not set up", 404)
+
+    def build():
+        columns = ", ".join(dict.fromkeys(("ItemID",) + fields))
+        changes, cursor, reset = changes_since(int(raw), limit=limit, columns=columns)
+        if reset:
+            cursor = change_seq()
+        return jsonify(
+            changes=[
+                {**c, "task": _as_dict(c["task"], fields) if c["task"] else None}
+                for c in ([] if reset else changes)
+            ],
+            cursor=cursor,
+            more=not reset and len(changes) == limit,
+            reset=reset,
+        )
+
+    return _conditional(build)
@@ -0,0 +1,398 @@
+"""
+Scriptable command-line interface to tasks.db (JSON / JSON Lines / TSV out).
+
+    python tasks_cli.py search "invoice" --format tsv
+    python tasks_cli.py add --project Infra --title "Renew cert" --priority 4
+    python tasks_cli.py update 42 --status Done
+    python tasks_cli.py history 42
+    python tasks_cli.py versions 42
+    python tasks_cli.py restore 43
+    python tasks_cli.py stats
+    python tasks_cli.py export --status Open --format jsonl > open.jsonl
+    python tasks_cli.py export --as-of 2025-01-31T17:00 --format tsv
+    python tasks_cli.py batch < ops.jsonl
+    python tasks_cli.py migrate --list
+    python tasks_cli.py report cycle --by Project
+    python tasks_cli.py counters --fix
+
+`batch` reads one JSON operation per line and runs them all in a single
+transaction; any invalid line rolls the whole batch back:
+
+    {"op": "add", "project": "Infra", "title": "Renew cert", "priority": 4}
+    {"op": "update", "id": 42, "status": "Done"}
+    {"op": "delete", "id": 43}
+    {"op": "restore", "id": 43}
+
+Exit status is 0 on success, 1 on a bad operation (message on stderr) and
+2 on bad usage.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from datetime import datetime
+
+import tasks_db
+import tasks_profile
+import tasks_reports
+from tasks_db import (
+    ALLOWED_STATUS, SORT_COLUMNS, STATS_COLUMNS, check_counters, count_by,
+    delete_task, ensure_schema, fetch_as_of, fetch_status_history, fetch_tasks, fetch_versions,
+    insert_task, iter_tasks, job_counts, migrate, migration_status, rebuild_counters,
+    restore_task, run_search_query, update_tasks, write_transaction,
+)
+
+FIELDS = ("ItemID", "Project", "Who", "Status", "Priority", "Action", "Notes")
+# Option name -> ActionList column for add / update.
+OPTION_COLUMNS = {
+    "project": "Project", "who": "Who", "status": "Status", "priority": "Priority",
+    "title": "Action", "notes": "Notes",
+}
+
+
+class CommandError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def _tsv_cell(value):
+    if value is None:
+        return ""
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def emit(records, fmt, fields=None, out=sys.stdout):
+    """Write dict records as a JSON array, JSON Lines or TSV with a header."""
+    if fmt == "json":
+        json.dump(list(records), out, ensure_ascii=False, indent=2)
+        out.write("\n")
+        return
+    if fmt == "jsonl":
+        for rec in records:
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        return
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return
+    fields = fields or list(first)
+    out.write("\t".join(fields) + "\n")
+    for rec in itertools.chain([first], records):
+        out.write("\t".join(_tsv_cell(rec.get(f)) for f in fields) + "\n")
+
+
+def _task(row):
+    return {f: row[f] for f in FIELDS}
+
+
+# ---------------------------------------------------------------------------
+# Operations (shared by the subcommands and batch)
+# ---------------------------------------------------------------------------
+
+def _changes(spec):
+    return {col: spec[opt] for opt, col in OPTION_COLUMNS.items() if spec.get(opt) is not None}
+
+
+def op_add(spec):
+    title = (spec.get("title") or "").strip()
+    if not title:
+        raise CommandError("add needs a title")
+    status = spec.get("status") or "Open"
+    if status not in ALLOWED_STATUS:
+        raise CommandError(f"Invalid status: {status!r}")
+    priority = int(spec.get("priority") or 3)
+    if not 1 <= priority <= 5:
+        raise CommandError("priority must be 1-5")
+    item_id = insert_task((spec.get("project") or "").strip(), (spec.get("who") or "").strip()[:5], status,
+                          priority, title, spec.get("notes") or "")
+    return {"op": "add", "ItemID": item_id}
+
+
+def op_update(spec):
+    item_id = int(spec["id"])
+    changes = _changes(spec)
+    if not changes:
+        raise CommandError("update needs at least one field to change")
+    if not fetch_tasks([item_id]):
+        raise CommandError(f"No task with ItemID {item_id}")
+    try:
+        changed = update_tasks([item_id], changes)
+    except ValueError as e:
+        raise CommandError(str(e)) from e
+    return {"op": "update", "ItemID": item_id, "changed": bool(changed)}
+
+
+def op_delete(spec):
+    item_id = int(spec["id"])
+    if not delete_task(item_id):
+        raise CommandError(f"No task with ItemID {item_id}")
+    return {"op": "delete", "ItemID": item_id}
+
+
+def op_restore(spec):
+    item_id = int(spec["id"])
+    if not restore_task(item_id):
+        raise CommandError(f"Task {item_id} is not deleted (or was never recorded)")
+    return {"op": "restore", "ItemID": item_id}
+
+
+OPS = {"add": op_add, "update": op_update, "delete": op_delete, "restore": op_restore}
+
+
+def run_batch(lines):
+    """Run JSON-lines operations in one transaction; returns their results.
+
+    Raises CommandError (after rolling everything back) naming the first bad
+    line.
+    """
+    results = []
+    with write_transaction():
+        for n, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                spec = json.loads(line)
+                if not isinstance(spec, dict):
+                    raise CommandError(f"expected a JSON object, got {type(spec).__name__}")
+                handler = OPS[spec.get("op")]
+                results.append(handler(spec))
+            except (CommandError, ValueError, KeyError, TypeError) as e:
+                raise CommandError(f"line {n}: {e}") from e
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Subcommands
+# ---------------------------------------------------------------------------
+
+def cmd_search(args):
+    rows = run_search_query(args.query, order=args.order, limit=args.limit)
+    emit((_task(r) for r in rows), args.format, FIELDS)
+
+
+def cmd_add(args):
+    emit([op_add(vars(args))], args.format)
+
+
+def cmd_update(args):
+    emit([op_update(vars(args))], args.format)
+
+
+def cmd_delete(args):
+    emit([op_delete(vars(args))], args.format)
+
+
+def cmd_history(args):
+    if not fetch_tasks([args.id]):
+        raise CommandError(f"No task with ItemID {args.id}")
+    history = fetch_status_history(args.id)
+    emit(({"ItemID": args.id, "status": h["status"], "changed_at": h["changed_at"]}
+          for h in history), args.format, ["ItemID", "status", "changed_at"])
+
+
+def cmd_versions(args):
+    versions = fetch_versions(args.id)
+    if not versions:
+        raise CommandError(f"No versions recorded for ItemID {args.id}")
+    fields = ["ItemID", "version", "op", "changed_at", "column", "old", "new"]
+    emit(({"ItemID": args.id, "version": v["id"], "op": v["op"], "changed_at": v["changed_at"],
+           "column": col, "old": old, "new": new}
+          for v in versions for col, (old, new) in v["changes"].items()), args.format, fields)
+
+
+def cmd_restore(args):
+    emit([op_restore(vars(args))], args.format)
+
+
+def cmd_stats(args):
+    columns = [args.by] if args.by else STATS_COLUMNS
+    records = [
+        {"column": col, "value": value, "count": n}
+        for col in columns
+        for value, n in count_by(col, open_only=args.open)
+    ]
+    if not args.by:
+        records += [{"column": "jobs", "value": k, "count": v} for k, v in job_counts().items()]
+    emit(records, args.format, ["column", "value", "count"])
+
+
+def _timestamp(text):
+    try:
+        return datetime.fromisoformat(text).isoformat(timespec="seconds")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date/time: {text!r}")
+
+
+def cmd_export(args):
+    if args.as_of:
+        rows = fetch_as_of(args.as_of, args.project, args.who, args.status or None,
+                           sort=args.sort, direction=args.dir)
+    else:
+        rows = iter_tasks(args.project, args.who, args.status or None,
+                          sort=args.sort, direction=args.dir)
+    emit((_task(r) for r in rows), args.format, FIELDS)
+
+
+def cmd_batch(args):
+    emit(run_batch(sys.stdin), args.format)
+
+
+def cmd_migrate(args):
+    fields = ["version", "name", "applied_at", "seconds", "rows"]
+    if args.list:
+        emit((dict(zip(fields, m)) for m in migration_status()), args.format, fields)
+        return
+    applied = migrate(target=args.to, batch_size=args.batch_size)
+    emit(({"version": v, "name": n, "seconds": round(t, 3), "rows": r}
+          for v, n, t, r in applied), args.format, ["version", "name", "seconds", "rows"])
+
+
+def cmd_counters(args):
+    fields = ["column", "value", "stored_total", "stored_open", "total", "open"]
+    mismatches = check_counters()
+    emit(({"column": col, "value": value, "stored_total": stored[0], "stored_open": stored[1],
+           "total": counted[0], "open": counted[1]}
+          for col, value, stored, counted in mismatches), args.format, fields)
+    if mismatches and args.fix:
+        rebuild_counters()
+    elif mismatches:
+        raise CommandError(f"{len(mismatches)} task counters out of step (rerun with --fix)")
+
+
+def _rounded(rec):
+    return {k: round(v, 2) if isinstance(v, float) else v for k, v in rec.items()}
+
+
+def cmd_report(args):
+    since = args.since
+    if since is None and args.days is not None:
+        since = tasks_reports.days_ago(args.days)
+    if args.kind == "throughput":
+        records = tasks_reports.weekly_throughput(weeks=args.weeks, group_by=args.by)
+    elif args.kind == "oldest":
+        records = tasks_reports.oldest_wip(limit=args.limit)
+    elif args.kind == "cycle":
+        result = tasks_reports.cycle_time(since=since, group_by=args.by)
+        records = [dict(kind=kind, **r) for kind in ("cycle", "lead") for r in result[kind]]
+    elif args.kind == "aging":
+        records = tasks_reports.wip_aging(group_by=args.by)
+    else:
+        records = tasks_reports.time_in_status(since=since, group_by=args.by)
+    emit((_rounded(r) for r in records), args.format)
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(description="Scriptable access to tasks.db.")
+    ap.add_argument("--db", help="path to tasks.db (default: tasks_db.DB)")
+    formats = ("json", "jsonl", "tsv")
+    ap.add_argument("--format", choices=formats, default="json")
+    # --format is also accepted after the subcommand; SUPPRESS keeps a value
+    # given before it from being reset to the default.
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--format", choices=formats, default=argparse.SUPPRESS)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("search", parents=[common], help="full-text search")
+    p.add_argument("query")
+    p.add_argument("--order", choices=("rank", "status"), default="rank")
+    p.add_argument("--limit", type=int)
+    p.set_defaults(func=cmd_search)
+
+    def task_options(p, required_title):
+        p.add_argument("--project")
+        p.add_argument("--who")
+        p.add_argument("--status", choices=ALLOWED_STATUS)
+        p.add_argument("--priority", type=int, choices=range(1, 6))
+        p.add_argument("--title", required=required_title)
+        p.add_argument("--notes")
+
+    p = sub.add_parser("add", parents=[common], help="add a task; prints its ItemID")
+    task_options(p, required_title=True)
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("update", parents=[common], help="change fields of one task")
+    p.add_argument("id", type=int)
+    task_options(p, required_title=False)
+    p.set_defaults(func=cmd_update)
+
+    p = sub.add_parser("delete", parents=[common], help="delete one task")
+    p.add_argument("id", type=int)
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser("history", parents=[common], help="status history of one task")
+    p.add_argument("id", type=int)
+    p.set_defaults(func=cmd_history)
+
+    p = sub.add_parser("versions", parents=[common], help="every recorded change to one task, per column")
+    p.add_argument("id", type=int)
+    p.set_defaults(func=cmd_versions)
+
+    p = sub.add_parser("restore", parents=[common], help="undo the delete of a task")
+    p.add_argument("id", type=int)
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("stats", parents=[common], help="task counts by status / project / who / priority")
+    p.add_argument("--by", choices=STATS_COLUMNS)
+    p.add_argument("--open", action="store_true", help="only tasks not Done/Cncld")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("export", parents=[common], help="stream tasks (filtered)")
+    p.add_argument("--project")
+    p.add_argument("--who")
+    p.add_argument("--status", action="append", choices=ALLOWED_STATUS)
+    p.add_argument("--sort", choices=SORT_COLUMNS, default="ItemID")
+    p.add_argument("--dir", choices=("asc", "desc"), default="asc")
+    p.add_argument("--as-of", type=_timestamp, metavar="WHEN",
+                   help="the tasks as they stood then (local ISO date/time)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("batch", parents=[common], help="run JSON-lines ops from stdin in one transaction")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("report", parents=[common], help="flow reports from status history (days)")
+    p.add_argument("kind", choices=tuple(tasks_reports.REPORTS))
+    p.add_argument("--by", choices=tasks_reports.GROUP_COLUMNS)
+    p.add_argument("--since", help="ISO date/time (time-in-status, cycle)")
+    p.add_argument("--days", type=int, help="look back N days instead of --since")
+    p.add_argument("--weeks", type=int, default=tasks_reports.DEFAULT_WEEKS)
+    p.add_argument("--limit", type=int, default=20, help="rows for `oldest`")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("counters", parents=[common], help="check the task_counts counters against ActionList")
+    p.add_argument("--fix", action="store_true", help="recount them if any are off")
+    p.set_defaults(func=cmd_counters)
+
+    p = sub.add_parser("migrate", parents=[common], help="apply pending schema migrations (timed)")
+    p.add_argument("--to", type=int, help="stop at this schema version")
+    p.add_argument("--batch-size", type=int, default=tasks_db.BACKFILL_BATCH,
+                   help="rows per transaction in online backfills")
+    p.add_argument("--list", action="store_true", help="show applied / pending migrations")
+    p.set_defaults(func=cmd_migrate)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        tasks_db.DB = args.db
+    try:
+        with tasks_profile.trace(f"tasks_cli {args.func.__name__[4:]}"):
+            if args.func is not cmd_migrate:
+                ensure_schema()
+            args.func(args)
+    except CommandError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output piped into head & co.; stop quietly. Point stdout at devnull
+        # so the interpreter's final flush doesn't raise again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
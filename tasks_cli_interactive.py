@@ -1,28 +1,36 @@
 import os
-import subprocess
-import json
+from importlib.util import find_spec
 
-try:
-    import pyperclip
-    HAS_CLIP = True
-except Exception:
-    HAS_CLIP = False
+# pyperclip and tasks_llm (http.client, email, ssl) are only imported when a
+# clipboard summary is actually used; find_spec checks without importing.
+HAS_CLIP = find_spec("pyperclip") is not None
 
 from tasks_db import (
-    ALLOWED_STATUS, ensure_project_column, ensure_status_history_table,
-    get_distinct, fetch_one, insert_task, count_open_tasks,
-    run_search_query, fetch_status_history,
+    ALLOWED_STATUS, ensure_schema,
+    get_distinct, fetch_one, insert_task, insert_task_for_summary, placeholder_title,
+    count_open_tasks,
+    run_search_query, fetch_status_history, change_seq, changes_since,
 )
 
-MODEL = "qwen3:8b"
-
 # CMD cosmetics (Windows CMD)
 CMD_COLOR = "B0"  # background=B (bright acqua), foreground=0 (black)
 
 
+_ui = {"colored": False, "title": None}
+
+
 def set_cmd_ui(title: str):
-    os.system(f"color {CMD_COLOR}")
-    os.system(f'title {title}')
+    """Set the console colour (once) and window title (when it changes).
+
+    The title goes out as an OSC escape sequence, which Windows 10+ consoles
+    and other terminals honour, so no shell process is spawned per menu loop.
+    """
+    if not _ui["colored"] and os.name == "nt":
+        os.system(f"color {CMD_COLOR}")
+    _ui["colored"] = True
+    if title != _ui["title"]:
+        print(f"\x1b]0;{title}\x07", end="", flush=True)
+        _ui["title"] = title
 
 
 def prompt(text, default=None, required=False):
@@ -91,95 +99,6 @@ def prompt_menu(label, options, default_index=1, allow_custom=False):
 
 
 
-def run_ollama(prompt_text):
-    result = subprocess.run(
-        ["ollama", "run", MODEL],
-        input=prompt_text,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-        capture_output=True,
-    )
-    if result.returncode != 0:
-        raise SystemExit(result.stderr)
-    return result.stdout.strip()
-
-
-def extract_json(text):
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        s = text.rfind("{")
-        e = text.rfind("}")
-        if s >= 0 and e > s:
-            return json.loads(text[s:e + 1])
-        raise SystemExit("Invalid JSON from model.")
-
-
-def validate_summary(data):
-    """Return error string if schema invalid, else None."""
-    if not isinstance(data, dict):
-        return "Response is not a JSON object."
-    if not isinstance(data.get("title"), str) or not data["title"].strip():
-        return "Missing or empty 'title' field."
-    if not isinstance(data.get("summary"), str) or not data["summary"].strip():
-        return "Missing or empty 'summary' field."
-    bullets = data.get("bullets")
-    if not isinstance(bullets, list) or len(bullets) == 0:
-        return "'bullets' must be a non-empty list."
-    if not all(isinstance(b, str) for b in bullets):
-        return "'bullets' must contain only strings."
-    return None
-
-
-def summarize_clipboard(text):
-    base_prompt = (
-        "Return ONLY JSON. No analysis. No markdown.\n"
-        "Summarize into JSON: "
-        "{\"title\": string, \"summary\": string, \"bullets\": [string]}.\n"
-        "Constraints:\n"
-        "- title <= 80 chars\n"
-        "- summary <= 3 sentences\n"
-        "- bullets: 3-7 items, each <= 120 chars\n"
-        "Text:\n" + text
-    )
-
-    prompt_text = base_prompt
-    max_attempts = 3
-
-    for attempt in range(1, max_attempts + 1):
-        output = run_ollama(prompt_text)
-        try:
-            data = extract_json(output)
-        except SystemExit:
-            error = "Could not parse JSON from model response."
-            data = None
-        else:
-            error = validate_summary(data)
-
-        if error is None:
-            break
-
-        if attempt < max_attempts:
-            print(f"Model output invalid (attempt {attempt}): {error} Retrying...")
-            prompt_text = (
-                base_prompt
-                + f"\n\nYour previous response was invalid: {error}"
-                + "\nReturn ONLY valid JSON matching the required schema."
-            )
-        else:
-            raise SystemExit(f"Model failed to return valid output after {max_attempts} attempts: {error}")
-
-    title = data["title"].strip()
-    summary = data["summary"].strip()
-    bullets = data["bullets"]
-    bullets_txt = "\n".join(f"- {b}" for b in bullets if isinstance(b, str))
-    notes = f"{summary}\n\n{bullets_txt}".strip()
-
-    return title, notes
-
-
-
 def print_item_full(row):
     print("\n=== ITEM DETAIL ===")
     print(f"ItemID  : {row['ItemID']}")
@@ -199,7 +118,7 @@ def do_search(initial_q=None):
     if initial_q:
         q = initial_q
     else:
-        q = prompt("Search text (matches Project/Title/Notes/Who)", required=True)
+        q = prompt('Search text (matches Project/Title/Notes/Who; word prefixes, "exact phrase")', required=True)
 
     while True:
         rows = run_search_query(q)
@@ -257,6 +176,24 @@ def do_search(initial_q=None):
         print("Invalid selection.")
 
 
+# Kept for the whole session: after the first load it is only patched from
+# the change log, never re-read.
+_live_index = None
+
+
+# @agent:CliSearch:extension
+def do_live_search():
+    global _live_index
+    import tasks_tui
+
+    if not tasks_tui.HAS_PROMPT_TOOLKIT:
+        print("Live search needs prompt_toolkit (pip install prompt_toolkit).")
+        return
+    if _live_index is None:
+        _live_index = tasks_tui.TaskIndex()
+    tasks_tui.run_live_search(_live_index)
+
+
 # @agent:CliAdd:authority
 def do_add():
     default_project = "Project X"
@@ -281,19 +218,39 @@ def do_add():
 
     title = ""
     notes = ""
+    queued = False
 
     if HAS_CLIP:
-        use_clip = prompt_menu("Use clipboard summary for Title/Notes?", ["Yes", "No"], default_index=1)
-        if use_clip == "Yes":
+        use_clip = prompt_menu("Use clipboard summary for Title/Notes?",
+                               ["Yes, in background", "Yes, wait for it", "No"], default_index=1)
+        if use_clip != "No":
+            import pyperclip
+
             clip_text = (pyperclip.paste() or "").strip()
-            if clip_text:
-                print("\nSummarizing clipboard with Ollama...\n")
-                title, notes = summarize_clipboard(clip_text)
-                print("Proposed Title:")
-                print(title)
-                print("\nProposed Notes:")
-                print(notes)
-                accept = prompt_menu("Accept?", ["Yes", "No"], default_index=1)
+            if clip_text and use_clip == "Yes, in background":
+                # Saved with the raw text now; tasks_worker.py fills in
+                # Title/Notes when the summary job runs.
+                queued = True
+                title, notes = placeholder_title(clip_text), clip_text
+            elif clip_text:
+                import tasks_profile
+                from tasks_llm import MODEL, SummaryError, summarize
+
+                print(f"\nSummarizing clipboard with {MODEL}...\n")
+                try:
+                    with tasks_profile.trace("summarize"):
+                        title, notes = summarize(
+                            clip_text, on_token=lambda t: print(t, end="", flush=True)
+                        )
+                except SummaryError as e:
+                    print(f"\n{e}")
+                    accept = "No"
+                else:
+                    print("\n\nProposed Title:")
+                    print(title)
+                    print("\nProposed Notes:")
+                    print(notes)
+                    accept = prompt_menu("Accept?", ["Yes", "No"], default_index=1)
                 if accept != "Yes":
                     title = prompt("Title", required=True)
                     notes = prompt("Notes", default="")
@@ -315,6 +272,8 @@ def do_add():
     print("Priority:", priority)
     print("Title   :", title)
     print("Notes   :", notes)
+    if queued:
+        print("(Title/Notes will be replaced by the summary when the worker runs it)")
 
     confirm = prompt_menu("Write to SQLite?", ["Yes", "No"], default_index=1)
     if confirm != "Yes":
@@ -322,8 +281,12 @@ def do_add():
         input("\nPress Enter to return...")
         return
 
-    item_id = insert_task(project, who, status, priority, title, notes)
-    print(f"OK: added ItemID={item_id}")
+    if queued:
+        item_id = insert_task_for_summary(project, who, status, priority, notes)
+        print(f"OK: added ItemID={item_id}, summary queued")
+    else:
+        item_id = insert_task(project, who, status, priority, title, notes)
+        print(f"OK: added ItemID={item_id}")
     input("\nPress Enter to return...")
 
 
@@ -353,12 +316,29 @@ def do_history():
     input("\nPress Enter to return...")
 
 
+def print_changes(changes):
+    """One line per task changed since the last menu (from any process)."""
+    print(f"\n{len(changes)} task(s) changed since the last menu:")
+    for c in changes[:10]:
+        t = c["task"]
+        if t is None:
+            print(f"  #{c['item_id']} deleted")
+        else:
+            print(f"  #{t['ItemID']} [{t['Status']}] P{t['Priority']} {t['Action'] or ''}")
+    if len(changes) > 10:
+        print(f"  ... and {len(changes) - 10} more")
+
+
 # @agent:CliMain:entry
 def main():
-    ensure_project_column()
-    ensure_status_history_table()
+    ensure_schema()
+    seen = change_seq()
 
     while True:
+        if seen is not None:
+            changes, seen, reset = changes_since(seen, limit=100)
+            if changes and not reset:
+                print_changes(changes)
         open_count = count_open_tasks()
         set_cmd_ui(f"Task List — Open/IP/Wait: {open_count}")
 
@@ -368,6 +348,7 @@ def main():
         print("  2. Add New")
         print("  3. Status History")
         print("  4. Quit")
+        print("  5. Live search (full screen, search as you type)")
         raw = input("Choose: ").strip()
 
         if not raw or raw == "4":
@@ -377,6 +358,8 @@ def main():
             do_add()
         elif raw == "3":
             do_history()
+        elif raw == "5":
+            do_live_search()
         elif raw == "1":
             do_search()
         elif raw.startswith("1 "):
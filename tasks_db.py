@@ -1,5 +1,13 @@
+import atexit
+import base64
+import json
+import re
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
 
 DB = r"D:\Datafiles5\softwarebuilds_other\Local_Task__List\tasks.db"
@@ -19,29 +27,176 @@ STATUS_ORDER = (
     "ELSE 8 END"
 )
 
+# The same ranking for sorting rows in Python.
+STATUS_RANK = {s: n for n, s in enumerate(ALLOWED_STATUS, 1)}
+
+# bm25 column weights for search, in ActionList_fts column order:
+# Project, Action (title), Notes, Who.
+SEARCH_WEIGHTS = (2.0, 4.0, 1.0, 2.0)
+
+# Idle connections kept for reuse, and the size of each connection's
+# prepared-statement cache (sqlite3 keys it on the exact SQL text).
+POOL_SIZE = 8
+STATEMENT_CACHE_SIZE = 256
+# Class of every new connection; tasks_profile swaps in a timing subclass
+# when TASKS_PROFILE is set.
+CONNECTION_FACTORY = sqlite3.Connection
+
+# Connection tuning. WAL lets the CLI and the web app read while the other
+# writes; busy_timeout makes a second writer wait instead of failing with
+# "database is locked".
+JOURNAL_MODE = "WAL"
+BUSY_TIMEOUT_MS = 5000
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
 
 # @agent:DbConnect:authority
 def db_connect():
     p = Path(DB)
     if not p.exists():
         raise SystemExit(f"DB not found: {p}")
-    return sqlite3.connect(DB)
+    # isolation_level=None: no implicit BEGIN. Reads run in autocommit mode so
+    # they never pin an old WAL snapshot; writes use write_transaction().
+    con = sqlite3.connect(
+        DB,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=CONNECTION_FACTORY,
+    )
+    con.row_factory = sqlite3.Row
+    con.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    con.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+    for pragma in CONNECTION_PRAGMAS:
+        con.execute(pragma)
+    return con
+
+
+_local = threading.local()
+_pool = []
+_pool_lock = threading.Lock()
+_all_connections = set()
+
+
+# @agent:DbConnect:extension
+def get_connection():
+    """Return this thread's connection, reusing a pooled one when possible.
+
+    The CLI keeps a single connection for the whole session; the web app
+    hands it back with release_connection() when each request ends.
+    """
+    con = getattr(_local, "con", None)
+    if con is not None:
+        return con
+    with _pool_lock:
+        con = _pool.pop() if _pool else None
+    if con is None:
+        con = db_connect()
+        with _pool_lock:
+            _all_connections.add(con)
+    _local.con = con
+    return con
+
+
+# @agent:DbConnect:extension
+def release_connection():
+    """Return this thread's connection to the pool (or close it if full)."""
+    con = getattr(_local, "con", None)
+    if con is None:
+        return
+    _local.con = None
+    if con.in_transaction:
+        con.rollback()
+    with _pool_lock:
+        if len(_pool) < POOL_SIZE:
+            _pool.append(con)
+            return
+        _all_connections.discard(con)
+    con.close()
+
+
+# @agent:DbConnect:extension
+def close_all_connections():
+    """Close every connection opened by this process. Runs at exit."""
+    with _pool_lock:
+        cons = list(_all_connections)
+        _all_connections.clear()
+        _pool.clear()
+    _local.con = None
+    for con in cons:
+        try:
+            con.close()
+        except sqlite3.Error:
+            pass
+
+
+# @agent:DbConnect:extension
+def prepare_pool(size):
+    """Open `size` pooled connections up front, for a server worker with that
+    many request threads.
+
+    Raises POOL_SIZE to match, so each thread hands its connection back
+    instead of closing it, and no request pays for opening tasks.db.
+    """
+    global POOL_SIZE
+    POOL_SIZE = max(POOL_SIZE, size)
+    with _pool_lock:
+        missing = size - len(_pool)
+    cons = [db_connect() for _ in range(missing)]
+    with _pool_lock:
+        _pool.extend(cons)
+        _all_connections.update(cons)
+
+
+atexit.register(close_all_connections)
+
+
+# One writer at a time per process; BEGIN IMMEDIATE (plus busy_timeout)
+# serialises writers across processes. Readers are never blocked in WAL mode.
+_write_lock = threading.RLock()
+
+
+# @agent:DbWrite:authority
+@contextmanager
+def write_transaction():
+    """Run the block as a single serialized write transaction.
+
+    Takes the write lock up front (BEGIN IMMEDIATE) so the transaction can
+    never fail half-way with SQLITE_BUSY on lock upgrade. Nested use joins
+    the outer transaction.
+    """
+    con = get_connection()
+    with _write_lock:
+        if con.in_transaction:
+            yield con
+            return
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+        con.commit()
+        invalidate_lookup_cache()
 
 
 # @agent:StatusHistory:authority
 def ensure_status_history_table():
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS status_history ("
-        "  id         INTEGER PRIMARY KEY AUTOINCREMENT, "
-        "  item_id    INTEGER NOT NULL, "
-        "  status     TEXT NOT NULL, "
-        "  changed_at TEXT NOT NULL"
-        ")"
-    )
-    con.commit()
-    con.close()
+    with write_transaction() as con:
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS status_history ("
+            "  id         INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "  item_id    INTEGER NOT NULL, "
+            "  status     TEXT NOT NULL, "
+            "  changed_at TEXT NOT NULL"
+            ")"
+        )
 
 
 # @agent:StatusHistory:extension
@@ -52,100 +207,1910 @@ def log_status_change(cur, item_id, status):
     )
 
 
+# @agent:StatusSpans:authority
+# One row per stretch a task spent in one status: opened by each
+# status_history insert, closed (ended_at) by the next one for the same
+# task. Reports read these instead of pairing up history rows themselves.
+STATUS_SPANS_DDL = {
+    "status_spans": (
+        "CREATE TABLE IF NOT EXISTS status_spans ("
+        "  history_id INTEGER PRIMARY KEY, "
+        "  item_id    INTEGER NOT NULL, "
+        "  status     TEXT NOT NULL, "
+        "  started_at TEXT NOT NULL, "
+        "  ended_at   TEXT"
+        ")"
+    ),
+    "ix_status_spans_item": (
+        "CREATE INDEX IF NOT EXISTS ix_status_spans_item ON status_spans (item_id, history_id)"
+    ),
+    "ix_status_spans_status": (
+        "CREATE INDEX IF NOT EXISTS ix_status_spans_status ON status_spans (status, started_at)"
+    ),
+    # Covers time-in-status over a date window without touching the table;
+    # ended_at IS NULL picks out every task's current span for WIP aging.
+    "ix_status_spans_ended": (
+        "CREATE INDEX IF NOT EXISTS ix_status_spans_ended "
+        "ON status_spans (ended_at, status, started_at, item_id)"
+    ),
+
+    "status_spans_ai": (
+        "CREATE TRIGGER IF NOT EXISTS status_spans_ai AFTER INSERT ON status_history BEGIN "
+        "  UPDATE status_spans SET ended_at = NEW.changed_at "
+        "    WHERE item_id = NEW.item_id AND ended_at IS NULL; "
+        "  INSERT INTO status_spans (history_id, item_id, status, started_at) "
+        "    VALUES (NEW.id, NEW.item_id, NEW.status, NEW.changed_at); "
+        "END"
+    ),
+}
+
+
+def _add_status_spans(con):
+    """Index status_history by task and build status_spans from it."""
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS ix_status_history_item ON status_history (item_id, id)"
+    )
+    for ddl in STATUS_SPANS_DDL.values():
+        con.execute(ddl)
+    return con.execute(
+        "INSERT OR IGNORE INTO status_spans (history_id, item_id, status, started_at, ended_at) "
+        "SELECT id, item_id, status, changed_at, "
+        "       LEAD(changed_at) OVER (PARTITION BY item_id ORDER BY id) "
+        "FROM status_history"
+    ).rowcount
+
+
 def ensure_project_column():
-    con = db_connect()
-    cur = con.cursor()
-    cols = [r[1] for r in cur.execute("PRAGMA table_info(ActionList)").fetchall()]
+    con = get_connection()
+    cols = [r[1] for r in con.execute("PRAGMA table_info(ActionList)").fetchall()]
     if "Project" not in cols:
-        cur.execute("ALTER TABLE ActionList ADD COLUMN Project TEXT;")
-        con.commit()
-    con.close()
+        with write_transaction():
+            con.execute("ALTER TABLE ActionList ADD COLUMN Project TEXT;")
+
+
+# @agent:SchemaSetup:authority
+def schema_version(con=None):
+    """The last migration applied to this database (PRAGMA user_version)."""
+    return (con or get_connection()).execute("PRAGMA user_version").fetchone()[0]
+
+
+def ensure_schema(force=False):
+    """Bring the database up to SCHEMA_VERSION by running pending MIGRATIONS.
+
+    A database that is already current skips all DDL checks (one PRAGMA
+    read), which keeps CLI start-up fast. force=True re-runs the idempotent
+    baseline steps anyway, e.g. after the schema was changed by hand.
+    """
+    con = get_connection()
+    if force:
+        with write_transaction():
+            _migrate_baseline(con)
+    if schema_version(con) < SCHEMA_VERSION:
+        migrate()
+    prune_change_log()
+
+
+# @agent:LookupLists:authority
+# Distinct Project / Who values with reference counts, maintained by
+# triggers so the dropdown lists never need a DISTINCT scan of ActionList.
+LOOKUP_COLUMNS = ("Project", "Who")
+
+
+def _lookup_add(col, ref):
+    return (
+        f"INSERT INTO ActionList_lookup (col, value, refs) "
+        f"SELECT '{col}', {ref}.{col}, 1 "
+        f"WHERE {ref}.{col} IS NOT NULL AND TRIM({ref}.{col}) <> '' "
+        f"ON CONFLICT (col, value) DO UPDATE SET refs = refs + 1; "
+    )
+
+
+def _lookup_remove(col, ref):
+    return (
+        f"UPDATE ActionList_lookup SET refs = refs - 1 "
+        f"WHERE col = '{col}' AND value = {ref}.{col}; "
+        f"DELETE FROM ActionList_lookup "
+        f"WHERE col = '{col}' AND value = {ref}.{col} AND refs <= 0; "
+    )
+
+
+LOOKUP_DDL = {
+    "ActionList_lookup": (
+        "CREATE TABLE IF NOT EXISTS ActionList_lookup ("
+        "  col   TEXT NOT NULL, "
+        "  value TEXT NOT NULL, "
+        "  refs  INTEGER NOT NULL, "
+        "  PRIMARY KEY (col, value)"
+        ") WITHOUT ROWID"
+    ),
+    "ActionList_lookup_ai": (
+        "CREATE TRIGGER ActionList_lookup_ai AFTER INSERT ON ActionList BEGIN "
+        + "".join(_lookup_add(c, "new") for c in LOOKUP_COLUMNS)
+        + "END"
+    ),
+    "ActionList_lookup_ad": (
+        "CREATE TRIGGER ActionList_lookup_ad AFTER DELETE ON ActionList BEGIN "
+        + "".join(_lookup_remove(c, "old") for c in LOOKUP_COLUMNS)
+        + "END"
+    ),
+    "ActionList_lookup_au_project": (
+        "CREATE TRIGGER ActionList_lookup_au_project AFTER UPDATE OF Project ON ActionList "
+        "WHEN old.Project IS NOT new.Project BEGIN "
+        + _lookup_remove("Project", "old") + _lookup_add("Project", "new")
+        + "END"
+    ),
+    "ActionList_lookup_au_who": (
+        "CREATE TRIGGER ActionList_lookup_au_who AFTER UPDATE OF Who ON ActionList "
+        "WHEN old.Who IS NOT new.Who BEGIN "
+        + _lookup_remove("Who", "old") + _lookup_add("Who", "new")
+        + "END"
+    ),
+}
+
 
+# @agent:LookupLists:authority
+def ensure_lookup_table():
+    """Create ActionList_lookup and its triggers, recounting from ActionList."""
+    con = get_connection()
+    if _objects_present(con, LOOKUP_DDL):
+        return
+    with write_transaction():
+        for name in tuple(LOOKUP_DDL)[1:]:
+            con.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for ddl in LOOKUP_DDL.values():
+            con.execute(ddl)
+        con.execute("DELETE FROM ActionList_lookup")
+        for col in LOOKUP_COLUMNS:
+            con.execute(
+                f"INSERT INTO ActionList_lookup (col, value, refs) "
+                f"SELECT '{col}', {col}, COUNT(*) FROM ActionList "
+                f"WHERE {col} IS NOT NULL AND TRIM({col}) <> '' GROUP BY {col}"
+            )
 
+
+# column -> (data_version, values). Checked against the change counter on
+# every call, so writes from this process or any other invalidate it.
+_lookup_cache = {}
+
+
+def invalidate_lookup_cache():
+    _lookup_cache.clear()
+
+
+# @agent:LookupLists:extension
 def get_distinct(column):
-    if column not in {"Project", "Who"}:
+    if column not in LOOKUP_COLUMNS:
         raise ValueError("Unsupported column.")
-    con = db_connect()
-    cur = con.cursor()
-    rows = cur.execute(
-        f"SELECT DISTINCT {column} FROM ActionList "
-        f"WHERE {column} IS NOT NULL AND TRIM({column}) <> '' "
-        f"ORDER BY {column} COLLATE NOCASE"
-    ).fetchall()
-    con.close()
-    return [r[0] for r in rows if isinstance(r[0], str) and r[0].strip()]
+    version = data_version()
+    cached = _lookup_cache.get(column)
+    if cached is not None and version is not None and cached[0] == version:
+        return list(cached[1])
+    con = get_connection()
+    if _objects_present(con, LOOKUP_DDL):
+        rows = con.execute(
+            "SELECT value FROM ActionList_lookup WHERE col = ? "
+            "ORDER BY value COLLATE NOCASE",
+            (column,),
+        ).fetchall()
+    else:
+        rows = con.execute(
+            f"SELECT DISTINCT {column} FROM ActionList "
+            f"WHERE {column} IS NOT NULL AND TRIM({column}) <> '' "
+            f"ORDER BY {column} COLLATE NOCASE"
+        ).fetchall()
+    values = [r[0] for r in rows if isinstance(r[0], str) and r[0].strip()]
+    if version is not None:
+        _lookup_cache[column] = (version, values)
+    return list(values)
+
+
+# @agent:TaskIndexes:authority
+# Secondary indexes owned by this module, keyed by name. The list view filters
+# on Project / Who / Status and sorts on any column, including STATUS_ORDER;
+# the expression index lets that CASE sort read rows in index order.
+# tools/check_query_plans.py asserts the plans these produce.
+TASK_INDEXES = {
+    "ix_ActionList_status_priority": "ON ActionList (Status, Priority)",
+    "ix_ActionList_project_status": "ON ActionList (Project, Status)",
+    "ix_ActionList_who_status": "ON ActionList (Who, Status)",
+    "ix_ActionList_priority": "ON ActionList (Priority)",
+    "ix_ActionList_action": "ON ActionList (Action)",
+    "ix_ActionList_status_rank": f"ON ActionList ({STATUS_ORDER}, Priority)",
+}
+
+
+# @agent:TaskIndexes:authority
+def ensure_indexes():
+    """Bring the ix_ActionList_* indexes in line with TASK_INDEXES.
+
+    Creates missing ones, recreates any whose definition changed and drops
+    ones no longer listed. Indexes not named ix_ActionList_* are left alone.
+    """
+    con = get_connection()
+    if _index_changes(con) == ([], []):
+        return
+    with write_transaction():
+        stale, missing = _index_changes(con)
+        for name in stale:
+            con.execute(f"DROP INDEX IF EXISTS {name}")
+        for name in missing:
+            con.execute(f"CREATE INDEX {name} {TASK_INDEXES[name]}")
+
+
+def _index_changes(con):
+    """Return (stale, missing) managed index names."""
+    wanted = {name: f"CREATE INDEX {name} {ddl}" for name, ddl in TASK_INDEXES.items()}
+    existing = {
+        r["name"]: r["sql"]
+        for r in con.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND name LIKE 'ix\\_ActionList\\_%' ESCAPE '\\'"
+        )
+    }
+    stale = [name for name, sql in existing.items() if wanted.get(name) != sql]
+    missing = [name for name, sql in wanted.items() if existing.get(name) != sql]
+    return stale, missing
 
 
 # @agent:TaskRead:authority
 def fetch_one(item_id: int):
-    con = db_connect()
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    row = cur.execute(
+    return get_connection().execute(
         "SELECT ItemID, Project, Who, Status, Priority, Action, Notes "
         "FROM ActionList WHERE ItemID = ?",
         (item_id,),
     ).fetchone()
-    con.close()
-    return row
+
+
+# Columns the task list can sort by.
+SORT_COLUMNS = ("ItemID", "Project", "Who", "Status", "Priority", "Action")
+
+TASK_COLUMNS = "ItemID, Project, Who, Status, Priority, Action, Notes"
+
+# List views only show the first couple of lines of Notes, so they select a
+# prefix instead of the full (possibly LLM-generated) text.
+NOTES_PREVIEW_CHARS = 240
+LIST_COLUMNS = (
+    "ItemID, Project, Who, Status, Priority, Action, "
+    f"substr(Notes, 1, {NOTES_PREVIEW_CHARS}) AS Notes"
+)
+
+PAGE_SIZE = 100
+
+
+def sort_keys(sort, direction):
+    """Return the [(expression, direction)] ORDER BY keys for a list sort.
+
+    Every key list ends in ItemID so the order is total, which keyset
+    paging needs. Tiebreaks follow the column order of the matching
+    TASK_INDEXES entry so the sort can still be read straight off the index.
+    """
+    if sort == "Status":
+        return [(STATUS_ORDER, direction), ("Priority", "asc"), ("ItemID", "asc")]
+    if sort == "ItemID":
+        return [("ItemID", direction)]
+    if sort in ("Project", "Who"):
+        return [(sort, direction), ("Status", direction), ("ItemID", direction)]
+    return [(sort, direction), ("ItemID", direction)]
+
+
+def _seek_clause(keys, values):
+    """Return (sql, params) matching rows that sort strictly after `values`.
+
+    SQLite sorts NULL first ascending and last descending, so NULL keys get
+    their own comparisons.
+    """
+    ors = []
+    params = []
+    for i, (expr, direction) in enumerate(keys):
+        terms = []
+        term_params = []
+        for (eq_expr, _), v in zip(keys[:i], values[:i]):
+            terms.append(f"{eq_expr} IS ?")
+            term_params.append(v)
+        v = values[i]
+        if direction == "asc":
+            if v is None:
+                terms.append(f"{expr} IS NOT NULL")
+            else:
+                terms.append(f"{expr} > ?")
+                term_params.append(v)
+        else:
+            if v is None:
+                continue
+            terms.append(f"({expr} < ? OR {expr} IS NULL)")
+            term_params.append(v)
+        ors.append("(" + " AND ".join(terms) + ")")
+        params.extend(term_params)
+    if not ors:
+        return "0", []
+    sql = "(" + " OR ".join(ors) + ")"
+    # Lead with a plain range on the first key where that is exact, so the
+    # planner can seek into an index instead of filtering from the start.
+    # Descending, NULLs sort last, so only never-NULL keys get the hint.
+    expr, direction = keys[0]
+    if values[0] is not None:
+        if direction == "asc":
+            sql = f"{expr} >= ? AND {sql}"
+            params.insert(0, values[0])
+        elif expr in (STATUS_ORDER, "ItemID"):
+            sql = f"{expr} <= ? AND {sql}"
+            params.insert(0, values[0])
+    return sql, params
+
+
+def _task_filters(project=None, who=None, statuses=None):
+    wheres = []
+    params = []
+    if project:
+        wheres.append("Project = ?")
+        params.append(project)
+    if who:
+        wheres.append("Who = ?")
+        params.append(who)
+    if statuses:
+        placeholders = ",".join("?" * len(statuses))
+        wheres.append(f"Status IN ({placeholders})")
+        params.extend(statuses)
+    return wheres, params
+
+
+# @agent:TaskRead:extension
+def build_task_query(project=None, who=None, statuses=None, sort="ItemID", direction="desc",
+                     after=None, limit=None, columns=TASK_COLUMNS):
+    """Return (sql, params) for the filtered, sorted task list.
+
+    `after` is the key tuple of the last row already shown (see
+    sort_keys); the query then continues from there. Key values come back
+    as extra columns _k0, _k1, ...
+    """
+    if sort not in SORT_COLUMNS:
+        sort = "ItemID"
+    if direction not in ("asc", "desc"):
+        direction = "desc"
+    keys = sort_keys(sort, direction)
+
+    wheres, params = _task_filters(project, who, statuses)
+    if after is not None and len(after) == len(keys):
+        seek_sql, seek_params = _seek_clause(keys, list(after))
+        wheres.append(seek_sql)
+        params.extend(seek_params)
+
+    where_clause = ("WHERE " + " AND ".join(wheres)) if wheres else ""
+    order_clause = "ORDER BY " + ", ".join(f"{e} {d.upper()}" for e, d in keys)
+    key_columns = "".join(f", {e} AS _k{i}" for i, (e, _) in enumerate(keys))
+    limit_clause = f" LIMIT {int(limit)}" if limit else ""
+
+    sql = (
+        f"SELECT {columns}{key_columns} "
+        f"FROM ActionList {where_clause} {order_clause}{limit_clause}"
+    )
+    return sql, params
+
+
+# @agent:TaskRead:extension
+def fetch_all(project=None, who=None, statuses=None, sort="ItemID", direction="desc"):
+    sql, params = build_task_query(project, who, statuses, sort, direction)
+    return get_connection().execute(sql, params).fetchall()
+
+
+# @agent:TaskRead:extension
+def fetch_page(project=None, who=None, statuses=None, sort="ItemID", direction="desc",
+               after=None, limit=PAGE_SIZE, columns=LIST_COLUMNS):
+    """Return (rows, next_after) for one page of the list view.
+
+    By default rows carry a Notes preview only. next_after is the key tuple
+    to pass back as `after` for the following page, or None on the last page.
+    """
+    sql, params = build_task_query(project, who, statuses, sort, direction,
+                                   after=after, limit=limit + 1, columns=columns)
+    rows = get_connection().execute(sql, params).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, [last[k] for k in last.keys() if k.startswith("_k")]
+
+
+def count_tasks(project=None, who=None, statuses=None):
+    con = get_connection()
+    filters = [(col, values) for col, values in (
+        ("Project", [project] if project else None),
+        ("Who", [who] if who else None),
+        ("Status", statuses or None),
+    ) if values]
+    if len(filters) <= 1:
+        # Filtering on one column (or none) is a sum over its counters.
+        col, values = filters[0] if filters else ("Status", None)
+        sql, params = "SELECT COALESCE(SUM(total), 0) FROM task_counts WHERE col = ?", [col]
+        if values:
+            sql += f" AND value IN ({','.join('?' * len(values))})"
+            params += values
+        return con.execute(sql, params).fetchone()[0]
+    wheres, params = _task_filters(project, who, statuses)
+    return con.execute(
+        f"SELECT COUNT(*) FROM ActionList WHERE {' AND '.join(wheres)}", params
+    ).fetchone()[0]
+
+
+# @agent:TaskRead:extension
+def encode_cursor(value):
+    """Pack a page position (keys or offset) into an opaque URL-safe token."""
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# @agent:TaskRead:extension
+def decode_cursor(token):
+    """Inverse of encode_cursor(); returns None for a missing or bad token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        return json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        return None
 
 
 # @agent:TaskWrite:authority
 def insert_task(project, who, status, priority, title, notes):
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute(
-        "INSERT INTO ActionList (Project, Who, Status, Priority, Action, Notes) "
-        "VALUES (?, ?, ?, ?, ?, ?)",
-        (project, who[:5], status, int(priority), title, notes),
-    )
-    item_id = cur.lastrowid
-    log_status_change(cur, item_id, status)
-    con.commit()
-    con.close()
+    with write_transaction() as con:
+        cur = con.cursor()
+        cur.execute(
+            "INSERT INTO ActionList (Project, Who, Status, Priority, Action, Notes) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (project, who[:5], status, int(priority), title, notes),
+        )
+        item_id = cur.lastrowid
+        log_status_change(cur, item_id, status)
     return item_id
 
 
+SUMMARY_JOB = "summarize"
+
+
+def placeholder_title(text):
+    """First non-blank line of text, cut to 80 chars (title until summarised)."""
+    line = next((l.strip() for l in text.splitlines() if l.strip()), "")
+    return line[:77] + "..." if len(line) > 80 else line
+
+
+# @agent:TaskWrite:extension
+def insert_task_for_summary(project, who, status, priority, text, title=""):
+    """Insert a task holding the raw text and queue a job to summarise it.
+
+    Returns immediately; tasks_worker.py fills in Notes (and Title, unless
+    one was given) via apply_summary() when the job runs.
+    """
+    with write_transaction():
+        item_id = insert_task(project, who, status, priority,
+                              title or placeholder_title(text), text)
+        enqueue_job(SUMMARY_JOB, {"text": text, "keep_title": bool(title)}, item_id=item_id)
+    return item_id
+
+
+# @agent:TaskWrite:extension
+def apply_summary(item_id, text, title, notes, keep_title=False):
+    """Write a finished summary onto its task. Returns False (and changes
+    nothing) if the task is gone or its Notes were edited in the meantime."""
+    with write_transaction() as con:
+        cur = con.execute(
+            "UPDATE ActionList SET Action = CASE WHEN ? THEN Action ELSE ? END, Notes = ? "
+            "WHERE ItemID = ? AND Notes IS ?",
+            (keep_title, title, notes, item_id, text),
+        )
+    return cur.rowcount > 0
+
+
+# @agent:TaskWrite:extension
+def update_task(item_id, project, who, status, priority, action, notes):
+    with write_transaction() as con:
+        cur = con.cursor()
+        row = cur.execute("SELECT Status FROM ActionList WHERE ItemID=?", (item_id,)).fetchone()
+        old_status = row[0] if row else None
+        cur.execute(
+            "UPDATE ActionList SET Project=?, Who=?, Status=?, Priority=?, Action=?, Notes=? "
+            "WHERE ItemID=?",
+            (project, who[:5], status, int(priority), action, notes, item_id),
+        )
+        if status != old_status:
+            log_status_change(cur, item_id, status)
+
+
+# @agent:TaskWrite:extension
+def delete_task(item_id):
+    """Delete a task. Returns True if it existed."""
+    with write_transaction() as con:
+        cur = con.execute("DELETE FROM ActionList WHERE ItemID = ?", (item_id,))
+    return cur.rowcount > 0
+
+
+# @agent:TaskWrite:extension
+def insert_tasks(rows):
+    """Insert many (project, who, status, priority, title, notes) rows at once.
+
+    One executemany for the tasks, then set-based upkeep for everything the
+    per-row AFTER INSERT triggers would do (FTS, lookup refs, change counter,
+    change log, counters, versions, sync stamps, initial status_history and
+    status_spans), all inside a single write transaction. Rows are not
+    validated here (see tasks_io). Returns the number inserted.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    with write_transaction() as con:
+        start = con.execute("SELECT COALESCE(MAX(ItemID), 0) FROM ActionList").fetchone()[0]
+        # Deleted tasks keep their history, so new history rows are found by
+        # id, not by item_id > start.
+        history_start = con.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM status_history").fetchone()[0]
+        # The triggers are dropped and recreated within this transaction, so
+        # no other connection ever sees them missing.
+        deferred = _present_triggers(con, BULK_DEFERRED_TRIGGERS)
+        for name in deferred:
+            con.execute(f"DROP TRIGGER {name}")
+        cur = con.executemany(
+            "INSERT INTO ActionList (Project, Who, Status, Priority, Action, Notes) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((p, (w or "")[:5], st, int(pr), t, n) for p, w, st, pr, t, n in rows),
+        )
+        count = cur.rowcount
+        # AUTOINCREMENT keys only grow, and the write lock is held, so every
+        # ItemID above `start` belongs to this batch.
+        con.execute(
+            "INSERT INTO status_history (item_id, status, changed_at) "
+            "SELECT ItemID, Status, ? FROM ActionList WHERE ItemID > ?",
+            (now, start),
+        )
+        if "status_spans_ai" in deferred:
+            # New tasks have no open span to close.
+            con.execute(
+                "INSERT INTO status_spans (history_id, item_id, status, started_at) "
+                "SELECT id, item_id, status, changed_at FROM status_history WHERE id > ?",
+                (history_start,),
+            )
+        if "task_counts_ai" in deferred:
+            _count_rows(con, "WHERE ItemID > ?", (start,))
+        if "sync_history_ai" in deferred:
+            con.execute("UPDATE sync_state SET seq = seq + 1")
+            con.execute(
+                f"INSERT INTO history_uids (history_id, uid, replica, seq) "
+                f"SELECT h.id, {_NEW_UID}, NULL, s.seq FROM status_history h, sync_state s "
+                f"WHERE h.id > ?",
+                (history_start,),
+            )
+        if "sync_ai" in deferred:
+            con.execute(
+                f"INSERT OR IGNORE INTO task_uids (item_id, uid) "
+                f"SELECT ItemID, {_NEW_UID} FROM ActionList WHERE ItemID > ?",
+                (start,),
+            )
+            con.execute(_NEXT_STAMP)
+            con.execute(_stamp_sql("u.item_id > ?", _sync_cols()), (start,))
+        if "task_versions_ai" in deferred:
+            con.execute(
+                "INSERT INTO task_versions (item_id, op, changed_at, mask) "
+                "SELECT ItemID, 'I', ?, 0 FROM ActionList WHERE ItemID > ?",
+                (now, start),
+            )
+        if "ActionList_fts_ai" in deferred:
+            con.execute(
+                "INSERT INTO ActionList_fts (rowid, Project, Action, Notes, Who) "
+                "SELECT ItemID, Project, Action, Notes, Who FROM ActionList WHERE ItemID > ?",
+                (start,),
+            )
+        if "ActionList_lookup_ai" in deferred:
+            for col in LOOKUP_COLUMNS:
+                con.execute(
+                    f"INSERT INTO ActionList_lookup (col, value, refs) "
+                    f"SELECT '{col}', {col}, COUNT(*) FROM ActionList "
+                    f"WHERE ItemID > ? AND {col} IS NOT NULL AND TRIM({col}) <> '' "
+                    f"GROUP BY {col} "
+                    f"ON CONFLICT (col, value) DO UPDATE SET refs = refs + excluded.refs",
+                    (start,),
+                )
+        if "change_log_ai" in deferred:
+            con.execute(
+                "INSERT INTO change_log (item_id, op, changed_at) "
+                "SELECT ItemID, 'I', strftime('%Y-%m-%dT%H:%M:%SZ', 'now') "
+                "FROM ActionList WHERE ItemID > ? ORDER BY ItemID",
+                (start,),
+            )
+        if "db_version_ai" in deferred and count > 0:
+            con.execute(
+                "UPDATE db_version SET version = version + ?, "
+                "changed_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now')",
+                (count,),
+            )
+        for name in deferred:
+            con.execute(BULK_DEFERRED_TRIGGERS[name])
+    return count
+
+
+# Columns update_tasks() may change, and the subset the web list's inline
+# dropdowns and bulk bar offer (Project plus the dropdowns).
+TASK_UPDATE_FIELDS = ("Project", "Who", "Status", "Priority", "Action", "Notes")
+BULK_UPDATE_FIELDS = ("Project", "Who", "Status", "Priority")
+
+
+def _normalise_change(col, value):
+    if col == "Status":
+        if value not in ALLOWED_STATUS:
+            raise ValueError(f"Invalid status: {value!r}")
+    elif col == "Priority":
+        value = int(value)
+        if not 1 <= value <= 5:
+            raise ValueError(f"Priority must be 1-5, got {value}")
+    elif col == "Who":
+        value = (value or "").strip()[:5]
+    elif col in ("Project", "Action"):
+        value = (value or "").strip()
+    return value
+
+
+# @agent:TaskWrite:extension
+def update_tasks(item_ids, changes):
+    """Apply the same {column: value} changes to many tasks in one transaction.
+
+    Only rows where some value actually differs are touched, so triggers and
+    history fire once per real change. Status changes are logged with one
+    INSERT ... SELECT. Returns the sorted ItemIDs that changed.
+    """
+    unknown = set(changes) - set(TASK_UPDATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot update: {', '.join(sorted(unknown))}")
+    changes = {col: _normalise_change(col, v) for col, v in changes.items()}
+    ids = json.dumps(sorted({int(i) for i in item_ids}))
+    if not changes or ids == "[]":
+        return []
+    cols = list(changes)
+    values = [changes[c] for c in cols]
+    # json_each keeps this one statement however many IDs are selected.
+    where = (
+        "ItemID IN (SELECT value FROM json_each(?)) AND ("
+        + " OR ".join(f"{c} IS NOT ?" for c in cols) + ")"
+    )
+    now = datetime.now().isoformat(timespec="seconds")
+    with write_transaction() as con:
+        changed = [r[0] for r in con.execute(
+            f"SELECT ItemID FROM ActionList WHERE {where} ORDER BY ItemID", [ids, *values]
+        )]
+        if not changed:
+            return []
+        ids = json.dumps(changed)
+        if "Status" in changes:
+            con.execute(
+                "INSERT INTO status_history (item_id, status, changed_at) "
+                "SELECT ItemID, ?, ? FROM ActionList "
+                "WHERE ItemID IN (SELECT value FROM json_each(?)) AND Status IS NOT ?",
+                (changes["Status"], now, ids, changes["Status"]),
+            )
+        con.execute(
+            f"UPDATE ActionList SET {', '.join(f'{c} = ?' for c in cols)} "
+            f"WHERE ItemID IN (SELECT value FROM json_each(?))",
+            [*values, ids],
+        )
+    return changed
+
+
+# @agent:TaskRead:extension
+def fetch_tasks(item_ids, columns=LIST_COLUMNS):
+    """Return the rows for the given ItemIDs, in ItemID order."""
+    return get_connection().execute(
+        f"SELECT {columns} FROM ActionList "
+        f"WHERE ItemID IN (SELECT value FROM json_each(?)) ORDER BY ItemID",
+        (json.dumps(sorted({int(i) for i in item_ids})),),
+    ).fetchall()
+
+
+# @agent:TaskRead:extension
+def iter_tasks(project=None, who=None, statuses=None, sort="ItemID", direction="asc",
+               batch_size=1000):
+    """Yield full task rows for a filtered list, batch_size rows at a time.
+
+    Streams straight off one cursor, so memory stays flat however many
+    rows match.
+    """
+    sql, params = build_task_query(project, who, statuses, sort, direction)
+    cur = get_connection().execute(sql, params)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
 # @agent:StatusHistory:extension
 def fetch_status_history(item_id: int):
-    con = db_connect()
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    rows = cur.execute(
+    return get_connection().execute(
         "SELECT status, changed_at FROM status_history WHERE item_id=? ORDER BY id ASC",
         (item_id,),
     ).fetchall()
-    con.close()
-    return rows
+
+
+# Columns count_by() may group on.
+STATS_COLUMNS = ("Status", "Project", "Who", "Priority")
+
+
+def count_by(column, open_only=False):
+    """[(value, count)] for one column, most common first.
+
+    Status, Project and Who are read from the task_counts counters (blank
+    and NULL both come back as ''); other columns are counted.
+    """
+    if column not in STATS_COLUMNS:
+        raise ValueError("Unsupported column.")
+    con = get_connection()
+    if column in COUNTER_COLUMNS:
+        n = "open" if open_only else "total"
+        return [tuple(r) for r in con.execute(
+            f"SELECT value, {n} FROM task_counts WHERE col = ? AND {n} > 0 "
+            f"ORDER BY {n} DESC, value",
+            (column,),
+        )]
+    where = f"WHERE {OPEN_CONDITION} " if open_only else ""
+    return [tuple(r) for r in con.execute(
+        f"SELECT {column}, COUNT(*) AS n FROM ActionList {where}"
+        f"GROUP BY {column} ORDER BY n DESC, {column}"
+    )]
 
 
 def count_open_tasks():
-    con = db_connect()
-    cur = con.cursor()
-    n = cur.execute(
-        "SELECT COUNT(*) FROM ActionList WHERE Status NOT IN ('Done', 'Cncld')"
+    """Tasks not Done/Cncld, summed from the (at most 7) Status counters."""
+    n = get_connection().execute(
+        "SELECT SUM(open) FROM task_counts WHERE col = 'Status'"
     ).fetchone()[0]
-    con.close()
-    return int(n)
+    return int(n or 0)
+
+
+def status_counts():
+    """{status: task count}: every status in ALLOWED_STATUS (0 if unused),
+    plus any other value found, e.g. '' for blank."""
+    counts = dict.fromkeys(ALLOWED_STATUS, 0)
+    counts.update(get_connection().execute(
+        "SELECT value, total FROM task_counts WHERE col = 'Status'"
+    ).fetchall())
+    return counts
+
+
+# @agent:TaskCounters:authority
+# Task counts per Status / Project / Who value, total and open (not Done or
+# Cncld), kept by triggers so dashboards and the open count never scan
+# ActionList. Blank and NULL values are both counted under ''.
+COUNTER_COLUMNS = ("Status", "Project", "Who")
+CLOSED_STATUSES = ("Done", "Cncld")
+OPEN_CONDITION = f"Status NOT IN ({', '.join(repr(s) for s in CLOSED_STATUSES)})"
+
+
+def _counter_sql(row, sign):
+    """Statements adding (sign=+1) or removing (-1) one row (NEW or OLD)."""
+    is_open = f"COALESCE({row}.{OPEN_CONDITION}, 0)"
+    if sign > 0:
+        return " ".join(
+            f"INSERT INTO task_counts (col, value, total, open) "
+            f"VALUES ('{col}', COALESCE({row}.{col}, ''), 1, {is_open}) "
+            f"ON CONFLICT (col, value) DO UPDATE "
+            f"SET total = total + 1, open = open + excluded.open;"
+            for col in COUNTER_COLUMNS
+        )
+    return " ".join(
+        f"UPDATE task_counts SET total = total - 1, open = open - {is_open} "
+        f"WHERE col = '{col}' AND value = COALESCE({row}.{col}, '');"
+        for col in COUNTER_COLUMNS
+    )
+
+
+TASK_COUNTS_DDL = {
+    "task_counts": (
+        "CREATE TABLE IF NOT EXISTS task_counts ("
+        "  col   TEXT NOT NULL, "
+        "  value TEXT NOT NULL, "
+        "  total INTEGER NOT NULL, "
+        "  open  INTEGER NOT NULL, "
+        "  PRIMARY KEY (col, value)"
+        ") WITHOUT ROWID"
+    ),
+    "task_counts_ai": (
+        "CREATE TRIGGER IF NOT EXISTS task_counts_ai AFTER INSERT ON ActionList BEGIN "
+        f"{_counter_sql('NEW', +1)} END"
+    ),
+    "task_counts_ad": (
+        "CREATE TRIGGER IF NOT EXISTS task_counts_ad AFTER DELETE ON ActionList BEGIN "
+        f"{_counter_sql('OLD', -1)} END"
+    ),
+    # Status decides "open" for every column, so any change to the three
+    # moves the row out of all its old counters and into the new ones.
+    "task_counts_au": (
+        "CREATE TRIGGER IF NOT EXISTS task_counts_au "
+        "AFTER UPDATE OF Status, Project, Who ON ActionList "
+        "WHEN OLD.Status IS NOT NEW.Status OR OLD.Project IS NOT NEW.Project "
+        "  OR OLD.Who IS NOT NEW.Who BEGIN "
+        f"{_counter_sql('OLD', -1)} {_counter_sql('NEW', +1)} END"
+    ),
+}
+
+
+def _count_rows(con, where="", params=()):
+    """Insert (or add onto) counters for the ActionList rows matching where."""
+    for col in COUNTER_COLUMNS:
+        con.execute(
+            f"INSERT INTO task_counts (col, value, total, open) "
+            f"SELECT '{col}', COALESCE({col}, ''), COUNT(*), "
+            f"       TOTAL(COALESCE({OPEN_CONDITION}, 0)) "
+            f"FROM ActionList {where} GROUP BY 2 "
+            f"ON CONFLICT (col, value) DO UPDATE "
+            f"SET total = total + excluded.total, open = open + excluded.open",
+            params,
+        )
+
+
+def _add_task_counters(con):
+    for ddl in TASK_COUNTS_DDL.values():
+        con.execute(ddl)
+    con.execute("DELETE FROM task_counts")
+    _count_rows(con)
+
+
+def check_counters():
+    """Recount ActionList and compare with task_counts.
+
+    Returns [(col, value, stored (total, open), counted (total, open))] for
+    every counter that is off; an empty list means they agree.
+    """
+    con = get_connection()
+    counted = {}
+    for col in COUNTER_COLUMNS:
+        for value, total, n_open in con.execute(
+            f"SELECT COALESCE({col}, ''), COUNT(*), TOTAL(COALESCE({OPEN_CONDITION}, 0)) "
+            f"FROM ActionList GROUP BY 1"
+        ):
+            counted[(col, value)] = (total, int(n_open))
+    stored = {(r[0], r[1]): (r[2], r[3]) for r in con.execute(
+        "SELECT col, value, total, open FROM task_counts WHERE total <> 0 OR open <> 0"
+    )}
+    return [
+        (col, value, stored.get((col, value), (0, 0)), counted.get((col, value), (0, 0)))
+        for col, value in sorted(counted.keys() | stored.keys())
+        if stored.get((col, value), (0, 0)) != counted.get((col, value), (0, 0))
+    ]
+
+
+def rebuild_counters():
+    """Recount task_counts from ActionList (the fix for check_counters)."""
+    with write_transaction() as con:
+        con.execute("DELETE FROM task_counts")
+        _count_rows(con)
+
+
+# @agent:TaskVersions:authority
+# Every version of every ActionList row, written by triggers from any
+# process. A row holds what a change overwrote, for the changed columns only:
+# bit n of `mask` is set when VERSION_COLUMNS[n] changed, and the other
+# columns stay NULL (one header byte each). Inserts store no values, deletes
+# store the whole row so they can be undone. The task list as of time T is
+# the current rows with, per column, the old value from the first change
+# after T laid over them, so it reads only the versions newer than T.
+VERSION_COLUMNS = ("Project", "Who", "Status", "Priority", "Action", "Notes")
+ALL_VERSION_BITS = (1 << len(VERSION_COLUMNS)) - 1
+# Local time to the second, the same format as status_history.changed_at.
+_LOCAL_NOW = "strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')"
+
+
+def _version_mask(old, new):
+    return " + ".join(
+        f"({old}.{col} IS NOT {new}.{col}) * {1 << n}" for n, col in enumerate(VERSION_COLUMNS)
+    )
+
+
+TASK_VERSIONS_DDL = {
+    "task_versions": (
+        "CREATE TABLE IF NOT EXISTS task_versions ("
+        "  id         INTEGER PRIMARY KEY, "
+        "  item_id    INTEGER NOT NULL, "
+        "  op         TEXT NOT NULL, "
+        "  changed_at TEXT NOT NULL, "
+        "  mask       INTEGER NOT NULL, "
+        "  Project TEXT, Who TEXT, Status TEXT, Priority INTEGER, Action TEXT, Notes TEXT"
+        ")"
+    ),
+    "ix_task_versions_item": (
+        "CREATE INDEX IF NOT EXISTS ix_task_versions_item ON task_versions (item_id, id)"
+    ),
+    # Covers the "first change after T per task and column" pass of as-of
+    # queries, which then reads old values by id.
+    "ix_task_versions_changed": (
+        "CREATE INDEX IF NOT EXISTS ix_task_versions_changed "
+        "ON task_versions (changed_at, item_id, mask)"
+    ),
+    "ix_task_versions_deleted": (
+        "CREATE INDEX IF NOT EXISTS ix_task_versions_deleted ON task_versions (op) "
+        "WHERE op = 'D'"
+    ),
+    "task_versions_ai": (
+        "CREATE TRIGGER IF NOT EXISTS task_versions_ai AFTER INSERT ON ActionList BEGIN "
+        "  INSERT INTO task_versions (item_id, op, changed_at, mask) "
+        f"  VALUES (NEW.ItemID, 'I', {_LOCAL_NOW}, 0); "
+        "END"
+    ),
+    "task_versions_au": (
+        "CREATE TRIGGER IF NOT EXISTS task_versions_au AFTER UPDATE ON ActionList "
+        f"WHEN {_version_mask('OLD', 'NEW')} <> 0 BEGIN "
+        f"  INSERT INTO task_versions (item_id, op, changed_at, mask, {', '.join(VERSION_COLUMNS)}) "
+        f"  VALUES (NEW.ItemID, 'U', {_LOCAL_NOW}, {_version_mask('OLD', 'NEW')}, "
+        + ", ".join(f"CASE WHEN OLD.{c} IS NOT NEW.{c} THEN OLD.{c} END" for c in VERSION_COLUMNS)
+        + "); END"
+    ),
+    "task_versions_ad": (
+        "CREATE TRIGGER IF NOT EXISTS task_versions_ad AFTER DELETE ON ActionList BEGIN "
+        f"  INSERT INTO task_versions (item_id, op, changed_at, mask, {', '.join(VERSION_COLUMNS)}) "
+        f"  VALUES (OLD.ItemID, 'D', {_LOCAL_NOW}, {ALL_VERSION_BITS}, "
+        + ", ".join(f"OLD.{c}" for c in VERSION_COLUMNS)
+        + "); END"
+    ),
+}
+
+
+def _add_task_versions(con):
+    """Create task_versions and seed it from status_history: an insert at
+    each live task's first history row and a Status change at each later one.
+    Other columns have no history before this, so they read as current."""
+    for ddl in TASK_VERSIONS_DDL.values():
+        con.execute(ddl)
+    status_bit = 1 << VERSION_COLUMNS.index("Status")
+    return con.execute(
+        "INSERT INTO task_versions (item_id, op, changed_at, mask, Status) "
+        "SELECT item_id, CASE WHEN prev IS NULL THEN 'I' ELSE 'U' END, changed_at, "
+        f"      CASE WHEN prev IS NULL THEN 0 ELSE {status_bit} END, prev "
+        "FROM (SELECT h.id, h.item_id, h.status, h.changed_at, "
+        "             LAG(h.status) OVER (PARTITION BY h.item_id ORDER BY h.id) AS prev, "
+        "             ROW_NUMBER() OVER (PARTITION BY h.item_id ORDER BY h.id) AS n "
+        "      FROM status_history h JOIN ActionList a ON a.ItemID = h.item_id) "
+        "WHERE n = 1 OR prev IS NOT status "
+        "ORDER BY id"
+    ).rowcount
+
+
+def _as_of_sql(columns):
+    """CTE as_of(ItemID, VERSION_COLUMNS...) for the tasks as they stood at
+    the time bound to its one parameter."""
+    firsts = ", ".join(
+        f"MIN(CASE WHEN mask & {1 << n} THEN id END) AS v{n}"
+        for n in range(len(VERSION_COLUMNS))
+    )
+    values = ", ".join(
+        f"CASE WHEN f.v{n} IS NULL THEN a.{col} "
+        f"ELSE (SELECT {col} FROM task_versions WHERE id = f.v{n}) END"
+        for n, col in enumerate(VERSION_COLUMNS)
+    )
+    return (
+        f"WITH firsts AS MATERIALIZED ("
+        f"  SELECT item_id, MIN(id) AS first_id, {firsts} "
+        # Without the hint the planner walks ix_task_versions_item for the
+        # GROUP BY, i.e. every version ever, instead of the ones after T.
+        f"  FROM task_versions INDEXED BY ix_task_versions_changed "
+        f"  WHERE changed_at > ? GROUP BY item_id"
+        f"), "
+        f"as_of (ItemID, {', '.join(VERSION_COLUMNS)}) AS ("
+        f"  SELECT ItemID, {', '.join(VERSION_COLUMNS)} FROM ActionList "
+        f"  WHERE ItemID NOT IN (SELECT item_id FROM firsts) "
+        f"  UNION ALL "
+        # A task whose first later version is its insert did not exist yet.
+        f"  SELECT f.item_id, {values} "
+        f"  FROM firsts f JOIN task_versions fv ON fv.id = f.first_id "
+        f"  LEFT JOIN ActionList a ON a.ItemID = f.item_id "
+        f"  WHERE fv.op <> 'I'"
+        f") SELECT {columns} FROM as_of"
+    )
+
+
+# @agent:TaskVersions:extension
+def fetch_as_of(at, project=None, who=None, statuses=None, sort="ItemID", direction="desc",
+                limit=None, columns=TASK_COLUMNS):
+    """The filtered, sorted task list as it stood at `at` (an ISO timestamp
+    in local time, like status_history; a bare date means its midnight).
+
+    Cost grows with the number of changes since `at`, not with the log.
+    """
+    if sort not in SORT_COLUMNS:
+        sort = "ItemID"
+    if direction not in ("asc", "desc"):
+        direction = "desc"
+    wheres, params = _task_filters(project, who, statuses)
+    sql = _as_of_sql(columns)
+    if wheres:
+        sql += " WHERE " + " AND ".join(wheres)
+    sql += " ORDER BY " + ", ".join(f"{e} {d.upper()}" for e, d in sort_keys(sort, direction))
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return get_connection().execute(sql, [at, *params]).fetchall()
+
+
+# @agent:TaskVersions:extension
+def fetch_versions(item_id):
+    """Every recorded version of one task, oldest first: {"id", "op"
+    (I/U/D), "changed_at", "changes": {column: (old, new)}}. An insert lists
+    the values it created, a delete the values it removed."""
+    con = get_connection()
+    rows = con.execute(
+        "SELECT * FROM task_versions WHERE item_id = ? ORDER BY id", (item_id,)
+    ).fetchall()
+    current = fetch_one(item_id)
+    state = {c: current[c] for c in VERSION_COLUMNS} if current else {}
+    versions = []
+    for r in reversed(rows):
+        if r["op"] == "D":
+            state = {c: r[c] for c in VERSION_COLUMNS}
+            changes = {c: (state[c], None) for c in VERSION_COLUMNS}
+        elif r["op"] == "I":
+            changes = {c: (None, state.get(c)) for c in VERSION_COLUMNS}
+        else:
+            changed = [c for n, c in enumerate(VERSION_COLUMNS) if r["mask"] & (1 << n)]
+            changes = {c: (r[c], state.get(c)) for c in changed}
+            state.update({c: r[c] for c in changed})
+        versions.append({"id": r["id"], "op": r["op"], "changed_at": r["changed_at"],
+                         "changes": changes})
+    versions.reverse()
+    return versions
+
+
+# @agent:TaskVersions:extension
+def deleted_tasks(limit=50):
+    """Tasks currently deleted, most recent first, with the values they had
+    (ItemID, deleted_at and VERSION_COLUMNS)."""
+    return get_connection().execute(
+        f"SELECT v.item_id AS ItemID, v.changed_at AS deleted_at, {', '.join(VERSION_COLUMNS)} "
+        f"FROM task_versions v INDEXED BY ix_task_versions_deleted "
+        f"WHERE v.op = 'D' "
+        f"  AND v.id = (SELECT MAX(id) FROM task_versions WHERE item_id = v.item_id) "
+        f"ORDER BY v.id DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+# @agent:TaskVersions:extension
+def restore_task(item_id):
+    """Undo the delete of a task: re-insert it under its old ItemID with the
+    values it had. Returns False if it isn't currently deleted."""
+    with write_transaction() as con:
+        last = con.execute(
+            "SELECT * FROM task_versions WHERE item_id = ? ORDER BY id DESC LIMIT 1", (item_id,)
+        ).fetchone()
+        if last is None or last["op"] != "D" or fetch_one(item_id) is not None:
+            return False
+        con.execute(
+            f"INSERT INTO ActionList (ItemID, {', '.join(VERSION_COLUMNS)}) "
+            f"VALUES (?{', ?' * len(VERSION_COLUMNS)})",
+            (item_id, *(last[c] for c in VERSION_COLUMNS)),
+        )
+    return True
+
+
+# @agent:SyncLog:authority
+# Change tracking for tasks_sync.py. Every task gets a global uid in
+# task_uids (ItemIDs stay local to each replica), and every column of every
+# task a last-writer-wins register in sync_clock: the Lamport time and
+# replica of its last write, plus `seq`, this database's own change counter,
+# which peers use as their cursor. Values are not copied; a changeset reads
+# them from ActionList. The '_alive' register tracks insert/delete. Local
+# writes are stamped here (replica NULL means this one); tasks_sync sets
+# sync_state.applying while it writes a peer's changes so they keep the
+# stamps they came with.
+SYNC_COLUMNS = VERSION_COLUMNS + ("_alive",)
+_NOT_APPLYING = "(SELECT applying FROM sync_state) = 0"
+_NEXT_STAMP = "UPDATE sync_state SET clock = clock + 1, seq = seq + 1;"
+_NEW_UID = "lower(hex(randomblob(8)))"
+
+
+def _stamp_sql(where, cols):
+    """Stamp registers `cols` (SQL yielding col names) of the tasks
+    matching `where` with the current clock/seq from sync_state."""
+    return (
+        f"INSERT INTO sync_clock (uid, col, lamport, replica, seq) "
+        f"SELECT u.uid, c.col, s.clock, NULL, s.seq "
+        f"FROM task_uids u, sync_state s, ({cols}) c WHERE {where} "
+        f"ON CONFLICT (uid, col) DO UPDATE SET "
+        f"lamport = excluded.lamport, replica = NULL, seq = excluded.seq;"
+    )
+
+
+def _sync_cols(changed_only=False):
+    cols = VERSION_COLUMNS if changed_only else SYNC_COLUMNS
+    return " UNION ALL ".join(
+        f"SELECT '{c}' AS col" + (f" WHERE OLD.{c} IS NOT NEW.{c}" if changed_only else "")
+        for c in cols
+    )
+
+
+SYNC_LOG_DDL = {
+    "sync_state": (
+        "CREATE TABLE IF NOT EXISTS sync_state ("
+        "  id          INTEGER PRIMARY KEY CHECK (id = 1), "
+        "  replica     TEXT, "
+        "  fingerprint TEXT, "
+        "  clock       INTEGER NOT NULL DEFAULT 0, "
+        "  seq         INTEGER NOT NULL DEFAULT 0, "
+        "  applying    INTEGER NOT NULL DEFAULT 0"
+        ")"
+    ),
+    "task_uids": (
+        "CREATE TABLE IF NOT EXISTS task_uids ("
+        "  item_id INTEGER PRIMARY KEY, "
+        "  uid     TEXT NOT NULL UNIQUE"
+        ")"
+    ),
+    "sync_clock": (
+        "CREATE TABLE IF NOT EXISTS sync_clock ("
+        "  uid     TEXT NOT NULL, "
+        "  col     TEXT NOT NULL, "
+        "  lamport INTEGER NOT NULL, "
+        "  replica TEXT, "
+        "  seq     INTEGER NOT NULL, "
+        "  PRIMARY KEY (uid, col)"
+        ") WITHOUT ROWID"
+    ),
+    "ix_sync_clock_seq": "CREATE INDEX IF NOT EXISTS ix_sync_clock_seq ON sync_clock (seq)",
+    "history_uids": (
+        "CREATE TABLE IF NOT EXISTS history_uids ("
+        "  history_id INTEGER PRIMARY KEY, "
+        "  uid        TEXT NOT NULL UNIQUE, "
+        "  replica    TEXT, "
+        "  seq        INTEGER NOT NULL"
+        ")"
+    ),
+    "ix_history_uids_seq": "CREATE INDEX IF NOT EXISTS ix_history_uids_seq ON history_uids (seq)",
+    # received: the peer's seq we have applied up to; acked: our seq the
+    # peer has confirmed applying (where our next changeset for it starts).
+    "sync_peers": (
+        "CREATE TABLE IF NOT EXISTS sync_peers ("
+        "  replica   TEXT PRIMARY KEY, "
+        "  received  INTEGER NOT NULL DEFAULT 0, "
+        "  acked     INTEGER NOT NULL DEFAULT 0, "
+        "  synced_at TEXT"
+        ")"
+    ),
+    # A restore re-inserts an old ItemID, which keeps its uid.
+    "sync_ai": (
+        f"CREATE TRIGGER IF NOT EXISTS sync_ai AFTER INSERT ON ActionList "
+        f"WHEN {_NOT_APPLYING} BEGIN "
+        f"  INSERT OR IGNORE INTO task_uids (item_id, uid) VALUES (NEW.ItemID, {_NEW_UID}); "
+        f"  {_NEXT_STAMP} {_stamp_sql('u.item_id = NEW.ItemID', _sync_cols())} "
+        f"END"
+    ),
+    "sync_au": (
+        f"CREATE TRIGGER IF NOT EXISTS sync_au "
+        f"AFTER UPDATE OF {', '.join(VERSION_COLUMNS)} ON ActionList "
+        f"WHEN {_NOT_APPLYING} AND ({_version_mask('OLD', 'NEW')}) <> 0 BEGIN "
+        f"  {_NEXT_STAMP} {_stamp_sql('u.item_id = NEW.ItemID', _sync_cols(changed_only=True))} "
+        f"END"
+    ),
+    "sync_ad": (
+        f"CREATE TRIGGER IF NOT EXISTS sync_ad AFTER DELETE ON ActionList "
+        f"WHEN {_NOT_APPLYING} BEGIN "
+        f"  {_NEXT_STAMP} {_stamp_sql('u.item_id = OLD.ItemID', 'SELECT ' + repr('_alive') + ' AS col')} "
+        f"END"
+    ),
+    "sync_history_ai": (
+        f"CREATE TRIGGER IF NOT EXISTS sync_history_ai AFTER INSERT ON status_history "
+        f"WHEN {_NOT_APPLYING} BEGIN "
+        f"  UPDATE sync_state SET seq = seq + 1; "
+        f"  INSERT INTO history_uids (history_id, uid, replica, seq) "
+        f"  SELECT NEW.id, {_NEW_UID}, NULL, seq FROM sync_state; "
+        f"END"
+    ),
+}
+
+
+def _add_sync_log(con):
+    """Create the sync tables and triggers. Existing tasks get the uid
+    'base-<ItemID>', so copies of one file agree on them without syncing."""
+    for ddl in SYNC_LOG_DDL.values():
+        con.execute(ddl)
+    con.execute("INSERT OR IGNORE INTO sync_state (id) VALUES (1)")
+    return con.execute(
+        "INSERT OR IGNORE INTO task_uids (item_id, uid) "
+        "SELECT ItemID, 'base-' || ItemID FROM ActionList"
+    ).rowcount
+
+
+# @agent:ChangeCounter:authority
+# A single-row counter bumped by triggers on every ActionList write, from any
+# process. Caches stamp entries with it; PRAGMA data_version can't serve here
+# because it ignores commits made on the same (pooled) connection.
+CHANGE_COUNTER_DDL = {
+    "db_version": (
+        "CREATE TABLE IF NOT EXISTS db_version ("
+        "  id         INTEGER PRIMARY KEY CHECK (id = 1), "
+        "  version    INTEGER NOT NULL, "
+        "  changed_at TEXT NOT NULL"
+        ")"
+    ),
+    "db_version_ai": (
+        "CREATE TRIGGER db_version_ai AFTER INSERT ON ActionList BEGIN "
+        "  UPDATE db_version SET version = version + 1, "
+        "    changed_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'); "
+        "END"
+    ),
+    "db_version_au": (
+        "CREATE TRIGGER db_version_au AFTER UPDATE ON ActionList BEGIN "
+        "  UPDATE db_version SET version = version + 1, "
+        "    changed_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'); "
+        "END"
+    ),
+    "db_version_ad": (
+        "CREATE TRIGGER db_version_ad AFTER DELETE ON ActionList BEGIN "
+        "  UPDATE db_version SET version = version + 1, "
+        "    changed_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'); "
+        "END"
+    ),
+}
+
+
+# @agent:ChangeCounter:authority
+def ensure_change_counter():
+    con = get_connection()
+    if _objects_present(con, CHANGE_COUNTER_DDL):
+        return
+    with write_transaction():
+        for name in tuple(CHANGE_COUNTER_DDL)[1:]:
+            con.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for ddl in CHANGE_COUNTER_DDL.values():
+            con.execute(ddl)
+        con.execute(
+            "INSERT OR IGNORE INTO db_version (id, version, changed_at) "
+            "VALUES (1, 0, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))"
+        )
+
+
+# @agent:ChangeCounter:extension
+def last_change():
+    """Return (version, changed_at ISO string) or None if not set up."""
+    try:
+        row = get_connection().execute(
+            "SELECT version, changed_at FROM db_version WHERE id = 1"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return (row[0], row[1]) if row else None
+
+
+# @agent:ChangeCounter:extension
+def data_version():
+    """Return the ActionList change counter, or None if it isn't set up."""
+    try:
+        row = get_connection().execute("SELECT version FROM db_version WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+# @agent:ChangeLog:authority
+# One row per ActionList insert/update/delete, written by triggers so every
+# process's writes land in it. `seq` is the cursor: the /events feed, the
+# /api/changes endpoint and the CLI all ask for "what changed after seq N".
+CHANGE_LOG_DDL = {
+    "change_log": (
+        "CREATE TABLE IF NOT EXISTS change_log ("
+        "  seq        INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "  item_id    INTEGER NOT NULL, "
+        "  op         TEXT NOT NULL, "
+        "  changed_at TEXT NOT NULL"
+        ")"
+    ),
+    "change_log_ai": (
+        "CREATE TRIGGER change_log_ai AFTER INSERT ON ActionList BEGIN "
+        "  INSERT INTO change_log (item_id, op, changed_at) "
+        "  VALUES (new.ItemID, 'I', strftime('%Y-%m-%dT%H:%M:%SZ', 'now')); "
+        "END"
+    ),
+    "change_log_au": (
+        "CREATE TRIGGER change_log_au AFTER UPDATE ON ActionList BEGIN "
+        "  INSERT INTO change_log (item_id, op, changed_at) "
+        "  VALUES (new.ItemID, 'U', strftime('%Y-%m-%dT%H:%M:%SZ', 'now')); "
+        "END"
+    ),
+    "change_log_ad": (
+        "CREATE TRIGGER change_log_ad AFTER DELETE ON ActionList BEGIN "
+        "  INSERT INTO change_log (item_id, op, changed_at) "
+        "  VALUES (old.ItemID, 'D', strftime('%Y-%m-%dT%H:%M:%SZ', 'now')); "
+        "END"
+    ),
+}
+
+# Rows kept by prune_change_log(). A cursor older than the oldest kept row
+# gets reset=True from changes_since() and must reload in full.
+CHANGE_LOG_KEEP = 50000
+
+
+# @agent:ChangeLog:authority
+def ensure_change_log():
+    con = get_connection()
+    if _objects_present(con, CHANGE_LOG_DDL):
+        return
+    with write_transaction():
+        for name in tuple(CHANGE_LOG_DDL)[1:]:
+            con.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for ddl in CHANGE_LOG_DDL.values():
+            con.execute(ddl)
+
+
+# @agent:ChangeLog:extension
+def change_seq():
+    """Latest change_log seq (0 if empty), or None if the log isn't set up."""
+    try:
+        return get_connection().execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM change_log"
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+# @agent:ChangeLog:extension
+def changes_since(seq, limit=500, columns=LIST_COLUMNS):
+    """Return (changes, cursor, reset) for everything after change_log `seq`.
+
+    Changes are collapsed to one per task, the latest, in seq order:
+    {"seq", "item_id", "op": "upsert"|"delete", "task": dict or None}. An
+    upsert carries the task's current row, so replaying a change twice is
+    harmless. Pass `cursor` back as `seq` next time. `reset` is True when
+    `seq` predates the retained log and the consumer should reload in full.
+    """
+    con = get_connection()
+    oldest = con.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+    reset = oldest is not None and seq < oldest - 1
+    # Driven by the seq (rowid) range, so cost tracks the delta, not the log.
+    rows = con.execute(
+        f"SELECT m.seq AS _seq, m.item_id AS _item_id, {columns} "
+        f"FROM (SELECT item_id, MAX(seq) AS seq FROM change_log "
+        f"      WHERE seq > ? GROUP BY item_id ORDER BY seq LIMIT ?) AS m "
+        f"LEFT JOIN ActionList ON ActionList.ItemID = m.item_id "
+        f"ORDER BY m.seq",
+        (seq, limit),
+    ).fetchall()
+    keys = [k for k in rows[0].keys() if not k.startswith("_")] if rows else []
+    changes = [
+        {
+            "seq": r["_seq"],
+            "item_id": r["_item_id"],
+            "op": "delete" if r["ItemID"] is None else "upsert",
+            "task": None if r["ItemID"] is None else {k: r[k] for k in keys},
+        }
+        for r in rows
+    ]
+    cursor = changes[-1]["seq"] if changes else seq
+    return changes, cursor, reset
+
+
+# @agent:ChangeLog:extension
+def prune_change_log(keep=CHANGE_LOG_KEEP):
+    """Drop all but the newest `keep` change_log rows (no-op if under)."""
+    con = get_connection()
+    oldest, newest = con.execute("SELECT MIN(seq), MAX(seq) FROM change_log").fetchone()
+    if oldest is None or newest - oldest < keep:
+        return
+    with write_transaction():
+        con.execute("DELETE FROM change_log WHERE seq <= ?", (newest - keep,))
+
+
+# @agent:SummaryCache:authority
+# LLM summaries keyed on a hash of (model, prompt version, source text), so
+# the same pasted text is never sent to the model twice. See tasks_llm.
+def ensure_summary_cache():
+    with write_transaction() as con:
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS summary_cache ("
+            "  key        TEXT PRIMARY KEY, "
+            "  title      TEXT NOT NULL, "
+            "  notes      TEXT NOT NULL, "
+            "  created_at TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+
+# @agent:SummaryCache:extension
+def get_cached_summary(key):
+    """Return (title, notes) for a cache key, or None."""
+    try:
+        row = get_connection().execute(
+            "SELECT title, notes FROM summary_cache WHERE key = ?", (key,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return (row[0], row[1]) if row else None
+
+
+# @agent:SummaryCache:extension
+def put_cached_summary(key, title, notes):
+    with write_transaction() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO summary_cache (key, title, notes, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, title, notes, datetime.now().isoformat(timespec="seconds")),
+        )
+
+
+# @agent:JobQueue:authority
+# Background work (LLM summaries) queued in tasks.db so any process can add
+# jobs and tasks_worker.py can run them. A job is claimed by flipping it to
+# 'running' inside a write transaction; a claim older than JOB_LEASE_SECONDS
+# is treated as abandoned (worker killed) and handed out again.
+JOB_STATUSES = ("queued", "running", "done", "failed")
+JOB_LEASE_SECONDS = 600
+
+
+def ensure_job_queue():
+    with write_transaction() as con:
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "  id          INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "  kind        TEXT NOT NULL, "
+            "  item_id     INTEGER, "
+            "  payload     TEXT NOT NULL, "
+            "  status      TEXT NOT NULL DEFAULT 'queued', "
+            "  attempts    INTEGER NOT NULL DEFAULT 0, "
+            "  run_after   TEXT NOT NULL, "
+            "  locked_by   TEXT, "
+            "  locked_at   TEXT, "
+            "  last_error  TEXT, "
+            "  created_at  TEXT NOT NULL, "
+            "  finished_at TEXT"
+            ")"
+        )
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after)"
+        )
+
+
+def _now():
+    return datetime.now().isoformat(timespec="milliseconds")
+
+
+# @agent:JobQueue:extension
+def enqueue_job(kind, payload, item_id=None):
+    """Queue a job (payload is JSON-serialisable). Returns the job id.
+
+    Joins the caller's write_transaction if there is one, so a task and its
+    job can be committed together.
+    """
+    now = _now()
+    with write_transaction() as con:
+        cur = con.execute(
+            "INSERT INTO jobs (kind, item_id, payload, run_after, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (kind, item_id, json.dumps(payload), now, now),
+        )
+    return cur.lastrowid
+
+
+# @agent:JobQueue:extension
+def claim_job(worker_id, kinds=None):
+    """Mark the next due job as running for worker_id and return it, or None."""
+    now = datetime.now()
+    stale = (now - timedelta(seconds=JOB_LEASE_SECONDS)).isoformat(timespec="milliseconds")
+    now = now.isoformat(timespec="milliseconds")
+    kind_sql, kind_params = "", []
+    if kinds:
+        kind_sql = f" AND kind IN ({','.join('?' * len(kinds))})"
+        kind_params = list(kinds)
+    with write_transaction() as con:
+        row = con.execute(
+            "SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?" + kind_sql +
+            " ORDER BY run_after, id LIMIT 1",
+            [now, *kind_params],
+        ).fetchone()
+        if row is None:
+            row = con.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND locked_at < ?" + kind_sql +
+                " ORDER BY locked_at LIMIT 1",
+                [stale, *kind_params],
+            ).fetchone()
+        if row is None:
+            return None
+        con.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+            "locked_by = ?, locked_at = ? WHERE id = ?",
+            (worker_id, now, row[0]),
+        )
+        return con.execute("SELECT * FROM jobs WHERE id = ?", (row[0],)).fetchone()
+
+
+# @agent:JobQueue:extension
+def finish_job(job_id, error=None, retry_at=None):
+    """Record a job's outcome: done (no error), queued again at retry_at, or failed."""
+    if error is None:
+        status = "done"
+    else:
+        status = "queued" if retry_at is not None else "failed"
+    with write_transaction() as con:
+        con.execute(
+            "UPDATE jobs SET status = ?, last_error = ?, run_after = COALESCE(?, run_after), "
+            "locked_by = NULL, locked_at = NULL, "
+            "finished_at = CASE WHEN ? = 'queued' THEN NULL ELSE ? END "
+            "WHERE id = ?",
+            (status, error, retry_at and retry_at.isoformat(timespec="milliseconds"),
+             status, _now(), job_id),
+        )
+
+
+# @agent:JobQueue:extension
+def job_counts():
+    """{status: count} over the jobs table."""
+    return dict(get_connection().execute(
+        "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+    ).fetchall())
+
+
+def _objects_present(con, ddl):
+    """True if every schema object named in the ddl dict exists."""
+    names = tuple(ddl)
+    found = con.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({','.join('?' * len(names))})",
+        names,
+    ).fetchone()[0]
+    return found == len(names)
+
+
+def _present_triggers(con, ddl):
+    """Names from the ddl dict that exist as triggers, in dict order."""
+    found = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return [name for name in ddl if name in found]
+
+
+# @agent:SearchIndex:authority
+SEARCH_INDEX_DDL = {
+    "ActionList_fts": (
+        "CREATE VIRTUAL TABLE ActionList_fts USING fts5("
+        "  Project, Action, Notes, Who, "
+        "  content='ActionList', content_rowid='ItemID', "
+        "  tokenize='unicode61 remove_diacritics 2'"
+        ")"
+    ),
+    "ActionList_fts_ai": (
+        "CREATE TRIGGER ActionList_fts_ai AFTER INSERT ON ActionList BEGIN "
+        "  INSERT INTO ActionList_fts (rowid, Project, Action, Notes, Who) "
+        "  VALUES (new.ItemID, new.Project, new.Action, new.Notes, new.Who); "
+        "END"
+    ),
+    "ActionList_fts_ad": (
+        "CREATE TRIGGER ActionList_fts_ad AFTER DELETE ON ActionList BEGIN "
+        "  INSERT INTO ActionList_fts (ActionList_fts, rowid, Project, Action, Notes, Who) "
+        "  VALUES ('delete', old.ItemID, old.Project, old.Action, old.Notes, old.Who); "
+        "END"
+    ),
+    # Status/Priority-only edits (the common quick-update) leave the index alone.
+    "ActionList_fts_au": (
+        "CREATE TRIGGER ActionList_fts_au AFTER UPDATE OF Project, Action, Notes, Who "
+        "ON ActionList BEGIN "
+        "  INSERT INTO ActionList_fts (ActionList_fts, rowid, Project, Action, Notes, Who) "
+        "  VALUES ('delete', old.ItemID, old.Project, old.Action, old.Notes, old.Who); "
+        "  INSERT INTO ActionList_fts (rowid, Project, Action, Notes, Who) "
+        "  VALUES (new.ItemID, new.Project, new.Action, new.Notes, new.Who); "
+        "END"
+    ),
+}
+
+
+# Per-row AFTER INSERT triggers that insert_tasks replaces with one set-based
+# statement each; together they halve bulk import throughput.
+BULK_DEFERRED_TRIGGERS = {
+    "ActionList_fts_ai": SEARCH_INDEX_DDL["ActionList_fts_ai"],
+    "ActionList_lookup_ai": LOOKUP_DDL["ActionList_lookup_ai"],
+    "db_version_ai": CHANGE_COUNTER_DDL["db_version_ai"],
+    "change_log_ai": CHANGE_LOG_DDL["change_log_ai"],
+    "status_spans_ai": STATUS_SPANS_DDL["status_spans_ai"],
+    "task_counts_ai": TASK_COUNTS_DDL["task_counts_ai"],
+    "task_versions_ai": TASK_VERSIONS_DDL["task_versions_ai"],
+    "sync_ai": SYNC_LOG_DDL["sync_ai"],
+    "sync_history_ai": SYNC_LOG_DDL["sync_history_ai"],
+}
+
+
+# @agent:SearchIndex:authority
+def ensure_search_index():
+    """Create the FTS5 index and its sync triggers, backfilling from ActionList.
+
+    A table rebuild (e.g. _rebuild_action_list) drops the triggers
+    along with the old table, so any missing piece rebuilds the whole set.
+    """
+    con = get_connection()
+    if _objects_present(con, SEARCH_INDEX_DDL):
+        return
+    with write_transaction():
+        if _objects_present(con, SEARCH_INDEX_DDL):
+            return
+        for name in tuple(SEARCH_INDEX_DDL)[1:]:
+            con.execute(f"DROP TRIGGER IF EXISTS {name}")
+        con.execute("DROP TABLE IF EXISTS ActionList_fts")
+        for ddl in SEARCH_INDEX_DDL.values():
+            con.execute(ddl)
+        con.execute("INSERT INTO ActionList_fts (ActionList_fts) VALUES ('rebuild')")
+
+
+# @agent:SearchIndex:extension
+def build_match_query(q: str):
+    """Translate search box text into an FTS5 MATCH expression.
+
+    Bare words match as prefixes ("inv" finds "invoice"), "quoted text" must
+    appear as a phrase, and every term has to match. Returns "" when the text
+    contains nothing searchable.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', q):
+        if phrase:
+            tokens = re.findall(r"\w+", phrase)
+            if tokens:
+                terms.append('"' + " ".join(tokens) + '"')
+        else:
+            terms.extend(f'"{t}"*' for t in re.findall(r"\w+", word))
+    return " ".join(terms)
 
 
 # @agent:TaskRead:extension
-def run_search_query(q: str):
-    like = f"%{q}%"
-    con = db_connect()
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-    rows = cur.execute(
+def run_search_query(q: str, order: str = "rank", limit=None, offset=0, lean=False,
+                     project=None, who=None, statuses=None):
+    """Full-text search over Project, Action, Notes and Who.
+
+    order="rank" sorts by bm25 relevance with status/priority as the
+    tiebreak; order="status" keeps the status/priority ordering first and
+    uses relevance as the tiebreak. limit/offset page the results and
+    lean=True returns a Notes preview like fetch_page(). project, who and
+    statuses narrow the matches as in fetch_page().
+    """
+    match = build_match_query(q)
+    if not match:
+        return []
+    wheres, params = _task_filters(project, who, statuses)
+    # The FTS table has Project and Who columns too: qualify the filters.
+    filter_clause = "".join(f" AND a.{w}" for w in wheres)
+    notes = f"substr(a.Notes, 1, {NOTES_PREVIEW_CHARS}) AS Notes" if lean else "a.Notes"
+    limit_clause = f"LIMIT {int(limit)} OFFSET {int(offset)}" if limit else ""
+    rank = "bm25(ActionList_fts, {}, {}, {}, {})".format(*SEARCH_WEIGHTS)
+    if order == "status":
+        order_clause = f"{STATUS_ORDER}, a.Priority ASC, {rank}, a.ItemID DESC"
+    else:
+        order_clause = f"{rank}, {STATUS_ORDER}, a.Priority ASC, a.ItemID DESC"
+    return get_connection().execute(
         f"""
-        SELECT ItemID, Project, Who, Status, Priority, Action, Notes
-        FROM ActionList
-        WHERE COALESCE(Project,'') LIKE ?
-           OR COALESCE(Action,'')  LIKE ?
-           OR COALESCE(Notes,'')   LIKE ?
-           OR COALESCE(Who,'')     LIKE ?
-        ORDER BY {STATUS_ORDER}, Priority ASC, ItemID DESC
+        SELECT a.ItemID, a.Project, a.Who, a.Status, a.Priority, a.Action, {notes}
+        FROM ActionList_fts
+        JOIN ActionList AS a ON a.ItemID = ActionList_fts.rowid
+        WHERE ActionList_fts MATCH ?{filter_clause}
+        ORDER BY {order_clause}
+        {limit_clause}
         """,
-        (like, like, like, like),
+        (match, *params),
     ).fetchall()
-    con.close()
+
+
+def count_search_results(q: str):
+    match = build_match_query(q)
+    if not match:
+        return 0
+    return get_connection().execute(
+        "SELECT COUNT(*) FROM ActionList_fts WHERE ActionList_fts MATCH ?", (match,)
+    ).fetchone()[0]
+
+
+# @agent:Migrations:authority
+# Ordered schema migrations. PRAGMA user_version holds the last one applied
+# and schema_migrations records when each ran and how long it took. Add new
+# steps at the end with the next version; never renumber or edit old ones.
+#
+# A plain step runs in one write transaction together with its user_version
+# bump, so it either fully applies or not at all. An online step (a batched
+# backfill) commits every batch separately so other writers get in between;
+# it must be idempotent, because an interrupted run is simply repeated.
+Migration = namedtuple("Migration", "version name apply online", defaults=(False,))
+
+BACKFILL_BATCH = 2000
+
+MIGRATION_LOG_DDL = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "  version    INTEGER PRIMARY KEY, "
+    "  name       TEXT NOT NULL, "
+    "  applied_at TEXT NOT NULL, "
+    "  seconds    REAL NOT NULL, "
+    "  rows       INTEGER"
+    ")"
+)
+
+
+def _migrate_baseline(con):
+    """Every ensure_* step. Each is idempotent and only changes what is missing."""
+    ensure_project_column()
+    ensure_status_history_table()
+    ensure_search_index()
+    ensure_indexes()
+    ensure_change_counter()
+    ensure_change_log()
+    ensure_lookup_table()
+    ensure_summary_cache()
+    ensure_job_queue()
+
+
+_CHECK_RE = re.compile(r"(,\s*)?(CONSTRAINT\s+\S+\s+)?\bCHECK\s*\(", re.IGNORECASE)
+
+
+def _strip_status_checks(sql):
+    """Remove every CHECK constraint that mentions Status from CREATE TABLE sql."""
+    out, pos = [], 0
+    for m in _CHECK_RE.finditer(sql):
+        if m.start() < pos:
+            continue
+        depth, i, quote = 1, m.end(), None
+        while depth:
+            ch = sql[i]
+            if quote:
+                quote = None if ch == quote else quote
+            elif ch in "'\"":
+                quote = ch
+            elif ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            i += 1
+        if "status" not in sql[m.end():i].lower():
+            continue
+        # A table constraint takes its leading comma with it; a column
+        # constraint leaves the column definition intact.
+        out.append(sql[pos:m.start()])
+        pos = i
+    out.append(sql[pos:])
+    return "".join(out)
+
+
+def _drop_status_check(con):
+    """Drop the CHECK on ActionList.Status (was migrate_remove_status_check.py).
+
+    Removing a CHECK leaves every stored row valid, so this only edits the
+    CREATE TABLE text in sqlite_master: no copy, no long lock. Builds that
+    refuse writable_schema (defensive mode) get the copy-and-swap rebuild.
+    """
+    sql = con.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'ActionList'"
+    ).fetchone()[0]
+    new_sql = _strip_status_checks(sql)
+    if new_sql == sql:
+        return 0
+    probe = sqlite3.connect(":memory:")
+    try:
+        probe.execute(new_sql)  # must still parse
+    finally:
+        probe.close()
+    cookie = con.execute("PRAGMA schema_version").fetchone()[0]
+    try:
+        con.execute("PRAGMA writable_schema = ON")
+        try:
+            con.execute(
+                "UPDATE sqlite_master SET sql = ? WHERE type = 'table' AND name = 'ActionList'",
+                (new_sql,),
+            )
+            con.execute(f"PRAGMA schema_version = {cookie + 1}")
+        finally:
+            con.execute("PRAGMA writable_schema = OFF")
+    except sqlite3.DatabaseError:
+        return _rebuild_action_list(con, new_sql)
+    return 0
+
+
+def _rebuild_action_list(con, new_sql):
+    """Copy ActionList into a table created from new_sql and swap it in."""
+    seq = None
+    if con.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        seq = con.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ActionList'").fetchone()
+    cols = ", ".join(r[1] for r in con.execute("PRAGMA table_info(ActionList)"))
+    con.execute(re.sub(r"ActionList", "ActionList_new", new_sql, count=1))
+    rows = con.execute(
+        f"INSERT INTO ActionList_new ({cols}) SELECT {cols} FROM ActionList"
+    ).rowcount
+    con.execute("DROP TABLE ActionList")
+    con.execute("ALTER TABLE ActionList_new RENAME TO ActionList")
+    if seq is not None:
+        # Keep AUTOINCREMENT from handing out ids of rows deleted before.
+        con.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'ActionList'", (seq[0],))
+    # The indexes and triggers went with the old table.
+    _migrate_baseline(con)
     return rows
+
+
+def _batched_update(set_sql, where_sql, batch_size):
+    """UPDATE ActionList in ItemID-ordered batches, one transaction each.
+
+    Returns the number of rows changed. Only rows matching where_sql are
+    written, so triggers fire for real changes only and a re-run is cheap.
+    """
+    con = get_connection()
+    lo, changed = 0, 0
+    while True:
+        hi = con.execute(
+            "SELECT MAX(ItemID) FROM "
+            "(SELECT ItemID FROM ActionList WHERE ItemID > ? ORDER BY ItemID LIMIT ?)",
+            (lo, batch_size),
+        ).fetchone()[0]
+        if hi is None:
+            return changed
+        with write_transaction():
+            changed += con.execute(
+                f"UPDATE ActionList SET {set_sql} "
+                f"WHERE ItemID > ? AND ItemID <= ? AND ({where_sql})",
+                (lo, hi),
+            ).rowcount
+        lo = hi
+
+
+def _normalise_project_who(batch_size):
+    """Trim Project/Who and cap Who at 5 chars on rows written before the
+    app enforced it, so the lookup lists stop showing near-duplicates."""
+    return _batched_update(
+        "Project = TRIM(Project), Who = SUBSTR(TRIM(Who), 1, 5)",
+        "Project IS NOT TRIM(Project) OR Who IS NOT SUBSTR(TRIM(Who), 1, 5)",
+        batch_size,
+    )
+
+
+MIGRATIONS = [
+    Migration(1, "baseline schema (tables, indexes, FTS, triggers)", _migrate_baseline),
+    Migration(2, "drop CHECK constraint on ActionList.Status", _drop_status_check),
+    Migration(3, "trim Project/Who, cap Who at 5 chars", _normalise_project_who, online=True),
+    Migration(4, "index status_history by task, add status_spans", _add_status_spans),
+    Migration(5, "task_counts counters per Status/Project/Who", _add_task_counters),
+    Migration(6, "task_versions row history, seeded from status_history", _add_task_versions),
+    Migration(7, "sync_clock / task_uids change tracking for tasks_sync", _add_sync_log),
+]
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _record_migration(con, m, seconds, rows):
+    con.execute(
+        "INSERT OR REPLACE INTO schema_migrations (version, name, applied_at, seconds, rows) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (m.version, m.name, _now(), seconds, rows),
+    )
+    con.execute(f"PRAGMA user_version = {m.version}")
+
+
+def migrate(target=None, batch_size=BACKFILL_BATCH):
+    """Apply pending migrations up to target (default: all).
+
+    Returns [(version, name, seconds, rows)] for the steps run here. Safe to
+    call from several processes at once: each step re-checks user_version
+    under the write lock before it commits.
+    """
+    target = SCHEMA_VERSION if target is None else target
+    con = get_connection()
+    with write_transaction():
+        con.execute(MIGRATION_LOG_DDL)
+    applied = []
+    for m in MIGRATIONS:
+        if m.version > target or m.version <= schema_version(con):
+            continue
+        t0 = time.perf_counter()
+        if m.online:
+            rows = m.apply(batch_size)
+            with write_transaction():
+                if schema_version(con) >= m.version:
+                    continue
+                _record_migration(con, m, time.perf_counter() - t0, rows)
+        else:
+            with write_transaction():
+                if schema_version(con) >= m.version:
+                    continue
+                rows = m.apply(con)
+                _record_migration(con, m, time.perf_counter() - t0, rows)
+        applied.append((m.version, m.name, time.perf_counter() - t0, rows))
+    return applied
+
+
+def migration_status():
+    """[(version, name, applied_at, seconds, rows)] for every migration;
+    applied_at is None for pending ones."""
+    con = get_connection()
+    current = schema_version(con)
+    logged = {}
+    if con.execute("SELECT 1 FROM sqlite_master WHERE name = 'schema_migrations'").fetchone():
+        logged = {r["version"]: r for r in con.execute("SELECT * FROM schema_migrations")}
+    status = []
+    for m in MIGRATIONS:
+        row = logged.get(m.version)
+        if row is not None:
+            status.append((m.version, m.name, row["applied_at"], row["seconds"], row["rows"]))
+        else:
+            status.append((m.version, m.name, "(before log)" if m.version <= current else None,
+                           None, None))
+    return status
@@ -0,0 +1,176 @@
+"""
+Bulk import / export for tasks.db (CSV or JSONL).
+
+    python tasks_io.py import backlog.csv --batch-size 5000
+    python tasks_io.py export tasks.jsonl --status Open --status IP
+    python tasks_io.py export - --format csv > tasks.csv
+
+Import reads the file as a stream, validates each record and commits every
+--batch-size rows with one executemany (plus one bulk status_history insert).
+Invalid records are reported on stderr with their line number and skipped.
+Export streams rows from a cursor, so memory use does not grow with the table.
+"""
+import argparse
+import csv
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+
+import tasks_db
+from tasks_db import ALLOWED_STATUS, ensure_schema, insert_tasks, iter_tasks
+
+FIELDS = ("ItemID", "Project", "Who", "Status", "Priority", "Action", "Notes")
+IMPORT_FIELDS = ("Project", "Who", "Status", "Priority", "Action", "Notes")
+DEFAULT_BATCH_SIZE = 5000
+
+
+class RecordError(ValueError):
+    pass
+
+
+def _text(rec, key):
+    # JSONL values can be numbers or booleans; CSV ones are always strings.
+    value = rec.get(key)
+    return "" if value is None else str(value).strip()
+
+
+# @agent:BulkImport:authority
+def validate_record(rec):
+    """Return an insert_tasks() tuple for a dict record, or raise RecordError.
+
+    Keys are matched case-insensitively; ItemID is ignored (new IDs are
+    assigned). Status must be in ALLOWED_STATUS, Priority 1-5, Action set.
+    """
+    rec = {str(k).strip().lower(): v for k, v in rec.items() if k is not None}
+    status = _text(rec, "status") or "Open"
+    if status not in ALLOWED_STATUS:
+        raise RecordError(f"invalid Status {status!r}")
+    try:
+        priority = int(rec.get("priority") or 3)
+    except (TypeError, ValueError):
+        raise RecordError(f"invalid Priority {rec.get('priority')!r}")
+    if not 1 <= priority <= 5:
+        raise RecordError(f"Priority {priority} out of range 1-5")
+    action = _text(rec, "action")
+    if not action:
+        raise RecordError("missing Action")
+    project = _text(rec, "project")
+    who = _text(rec, "who")
+    notes = "" if rec.get("notes") is None else str(rec["notes"])
+    return project, who, status, priority, action, notes
+
+
+def read_records(path, fmt):
+    """Yield (line_number, dict) from a CSV (header row) or JSONL file."""
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for rec in reader:
+                yield reader.line_num, rec
+        else:
+            for n, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield n, exc
+                    continue
+                yield n, rec
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def import_file(path, fmt, batch_size=DEFAULT_BATCH_SIZE, errors=sys.stderr):
+    """Import a file; returns (imported, skipped)."""
+    imported = skipped = 0
+
+    def valid_rows():
+        nonlocal skipped
+        for n, rec in read_records(path, fmt):
+            try:
+                if not isinstance(rec, dict):
+                    raise RecordError(str(rec) if isinstance(rec, Exception) else "not an object")
+                yield validate_record(rec)
+            except RecordError as exc:
+                skipped += 1
+                print(f"{path}:{n}: skipped: {exc}", file=errors)
+
+    rows = valid_rows()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        imported += insert_tasks(batch)
+    return imported, skipped
+
+
+# @agent:BulkExport:authority
+def export_file(path, fmt, project=None, who=None, statuses=None):
+    """Stream matching tasks to a file (or stdout for "-"); returns row count."""
+    f = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    count = 0
+    try:
+        rows = iter_tasks(project, who, statuses, sort="ItemID", direction="asc")
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for row in rows:
+                writer.writerow([row[k] for k in FIELDS])
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps({k: row[k] for k in FIELDS}, ensure_ascii=False) + "\n")
+                count += 1
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return count
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return "csv" if Path(path).suffix.lower() == ".csv" else "jsonl"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk import/export for tasks.db.")
+    ap.add_argument("--db", help="database path (default: tasks_db.DB)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="import tasks from CSV/JSONL")
+    imp.add_argument("file", help='input file, or "-" for stdin')
+    imp.add_argument("--format", choices=("csv", "jsonl"))
+    imp.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                     help="rows per transaction (default %(default)s)")
+
+    exp = sub.add_parser("export", help="export tasks to CSV/JSONL")
+    exp.add_argument("file", help='output file, or "-" for stdout')
+    exp.add_argument("--format", choices=("csv", "jsonl"))
+    exp.add_argument("--project")
+    exp.add_argument("--who")
+    exp.add_argument("--status", action="append", choices=ALLOWED_STATUS)
+
+    args = ap.parse_args(argv)
+    if args.db:
+        tasks_db.DB = args.db
+    ensure_schema()
+
+    fmt = _format_for(args.file, args.format)
+    if args.command == "import":
+        if args.batch_size < 1:
+            ap.error("--batch-size must be at least 1")
+        imported, skipped = import_file(args.file, fmt, args.batch_size)
+        print(f"Imported {imported} task(s), skipped {skipped}.", file=sys.stderr)
+        return 1 if skipped else 0
+    count = export_file(args.file, fmt, args.project, args.who, args.status)
+    print(f"Exported {count} task(s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Task summarisation through a local Ollama server's HTTP API.
+
+One keep-alive connection per thread to /api/generate, streamed NDJSON
+tokens (handed to an on_token callback as they arrive), a JSON schema passed
+as `format` so the model can only emit the summary shape, and a content-hash
+cache in tasks.db so the same text is never summarised twice.
+
+    OLLAMA_HOST=http://127.0.0.1:11435 python tasks_llm.py < pasted.txt
+
+tools/stub_ollama.py serves a fake /api/generate for trying this without a
+model.
+"""
+import hashlib
+import http.client
+import json
+import os
+import sys
+import threading
+from urllib.parse import urlsplit
+
+import tasks_profile
+from tasks_db import get_cached_summary, put_cached_summary
+
+MODEL = "qwen3:8b"
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
+# Keep the model loaded between requests (Ollama unloads after 5 min by default).
+KEEP_ALIVE = "30m"
+TIMEOUT_SECONDS = 120
+MAX_ATTEMPTS = 2
+
+# Bump when the prompt or schema changes so cached summaries are not reused.
+PROMPT_VERSION = 2
+
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "maxLength": 80},
+        "summary": {"type": "string"},
+        "bullets": {
+            "type": "array",
+            "items": {"type": "string", "maxLength": 120},
+            "minItems": 3,
+            "maxItems": 7,
+        },
+    },
+    "required": ["title", "summary", "bullets"],
+}
+
+PROMPT = (
+    "Summarize the text below as JSON with a short title (<= 80 chars), "
+    "a summary of at most 3 sentences and 3-7 bullets (<= 120 chars each).\n"
+    "Text:\n"
+)
+
+
+class SummaryError(RuntimeError):
+    pass
+
+
+# @agent:LlmClient:authority
+class OllamaClient:
+    """Streaming /api/generate over one persistent HTTP/1.1 connection."""
+
+    def __init__(self, host=None, model=MODEL, timeout=TIMEOUT_SECONDS):
+        url = urlsplit(host or OLLAMA_HOST)
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 11434
+        self.model = model
+        self.timeout = timeout
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def generate(self, prompt, format=None, on_token=None):
+        """Return the full response text, calling on_token(chunk) as it streams."""
+        body = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": KEEP_ALIVE,
+            "think": False,
+            "options": {"temperature": 0},
+        }
+        if format is not None:
+            body["format"] = format
+        payload = json.dumps(body).encode("utf-8")
+        # A kept-alive socket the server has since closed fails on first use;
+        # retry once on a fresh connection.
+        for attempt in (1, 2):
+            try:
+                return self._stream(payload, on_token)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                self.close()
+                if attempt == 2:
+                    raise SummaryError(f"Ollama connection lost: {e}") from e
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                raise SummaryError(f"Ollama request failed: {e}") from e
+
+    def _stream(self, payload, on_token):
+        conn = self._connection()
+        with tasks_profile.span("llm.wait"):  # connect, model load, prompt
+            conn.request("POST", "/api/generate", body=payload,
+                         headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+        if resp.status != 200:
+            detail = resp.read().decode("utf-8", "replace")
+            raise SummaryError(f"Ollama returned {resp.status}: {detail}")
+        parts = []
+        for line in resp:
+            if not line.strip():
+                continue
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                msg = None
+            if not isinstance(msg, dict):
+                # Truncated or garbled stream: the connection is mid-response.
+                self.close()
+                raise SummaryError(f"Ollama sent a malformed stream line: {line[:200]!r}")
+            if "error" in msg:
+                raise SummaryError(f"Ollama error: {msg['error']}")
+            chunk = msg.get("response", "")
+            if chunk:
+                parts.append(chunk)
+                if on_token is not None:
+                    on_token(chunk)
+            if msg.get("done"):
+                _record_timings(msg)
+                break
+        resp.read()  # drain so the connection can be reused
+        return "".join(parts)
+
+
+def _record_timings(msg):
+    """Ollama's own durations (ns) from the final message: starting the model
+    runner, reading the prompt and generating, as profile spans."""
+    for key, name in (("load_duration", "ollama.load"),
+                      ("prompt_eval_duration", "ollama.prompt"),
+                      ("eval_duration", "ollama.eval")):
+        if msg.get(key):
+            tasks_profile.add_span(name, msg[key] / 1e9)
+
+
+_local = threading.local()
+
+
+def get_client():
+    """This thread's OllamaClient (one keep-alive connection per thread)."""
+    client = getattr(_local, "client", None)
+    if client is None:
+        client = _local.client = OllamaClient()
+    return client
+
+
+def extract_json(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        s = text.find("{")
+        e = text.rfind("}")
+        if s >= 0 and e > s:
+            try:
+                return json.loads(text[s:e + 1])
+            except json.JSONDecodeError:
+                pass
+    return None
+
+
+def validate_summary(data):
+    """Return error string if schema invalid, else None."""
+    if not isinstance(data, dict):
+        return "Response is not a JSON object."
+    if not isinstance(data.get("title"), str) or not data["title"].strip():
+        return "Missing or empty 'title' field."
+    if not isinstance(data.get("summary"), str) or not data["summary"].strip():
+        return "Missing or empty 'summary' field."
+    bullets = data.get("bullets")
+    if not isinstance(bullets, list) or len(bullets) == 0:
+        return "'bullets' must be a non-empty list."
+    if not all(isinstance(b, str) for b in bullets):
+        return "'bullets' must contain only strings."
+    return None
+
+
+def cache_key(text, model=MODEL):
+    raw = f"{model}\0{PROMPT_VERSION}\0{text.strip()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# @agent:LlmSummary:authority
+def summarize(text, on_token=None, client=None):
+    """Return (title, notes) for text, from the cache or the model.
+
+    Raises SummaryError if the server is unreachable or the output is still
+    invalid after MAX_ATTEMPTS.
+    """
+    client = client or get_client()
+    key = cache_key(text, client.model)
+    cached = get_cached_summary(key)
+    if cached is not None:
+        return cached
+
+    prompt = PROMPT + text
+    error = None
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if error is not None:
+            prompt = (PROMPT + text + f"\n\nYour previous response was invalid: {error}"
+                      "\nReturn ONLY valid JSON matching the required schema.")
+        data = extract_json(client.generate(prompt, format=SUMMARY_SCHEMA, on_token=on_token))
+        error = validate_summary(data) if data is not None else "Could not parse JSON."
+        if error is None:
+            break
+    else:
+        raise SummaryError(f"Model failed to return valid output after {MAX_ATTEMPTS} attempts: {error}")
+
+    title = data["title"].strip()[:80]
+    bullets_txt = "\n".join(f"- {b.strip()}" for b in data["bullets"] if b.strip())
+    notes = f"{data['summary'].strip()}\n\n{bullets_txt}".strip()
+    put_cached_summary(key, title, notes)
+    return title, notes
+
+
+if __name__ == "__main__":
+    from tasks_db import ensure_schema
+
+    ensure_schema()
+    title, notes = summarize(sys.stdin.read(), on_token=lambda t: print(t, end="", flush=True))
+    print(f"\n\nTitle: {title}\n\n{notes}")
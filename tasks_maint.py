@@ -0,0 +1,361 @@
+"""
+Maintenance for tasks.db: online backups, vacuum, statistics, integrity.
+
+    python tasks_maint.py run --backup D:\\Backups\\tasks --keep 14   # scheduled
+    python tasks_maint.py backup D:\\Backups\\tasks                   # one copy
+    python tasks_maint.py check [--full]
+    python tasks_maint.py vacuum [--full]
+    python tasks_maint.py analyze [--full | --clear]
+    python tasks_maint.py space
+
+Every step runs while the CLI and web app keep working. A backup copies
+pages in small steps through sqlite3's backup API, from its own read
+snapshot, so writers are never blocked and the copy is consistent. Vacuum
+frees pages in small write transactions once the database uses
+auto_vacuum=INCREMENTAL; `vacuum --full` switches it over (one full
+VACUUM, which does hold the write lock while it rewrites the file).
+
+Each step reports how long it took and how much space it reclaimed;
+`--json` prints the report as one line, for appending to a log from a
+scheduled task.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import tasks_db
+from tasks_db import check_counters, ensure_schema, get_connection, write_transaction
+
+# Pages per backup step, and the pause between steps that lets writers in.
+BACKUP_STEP_PAGES = 256
+BACKUP_PAUSE = 0.005
+# A write by another connection restarts a stepped backup. After this many
+# restarts the rest is copied in one step from a single read snapshot, which
+# under WAL still does not block writers.
+BACKUP_MAX_RESTARTS = 3
+BACKUP_PATTERN = "tasks-*.db"
+
+VACUUM_STEP_PAGES = 512
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Rows ANALYZE samples per index by default; 0 reads them all.
+ANALYSIS_LIMIT = 1000
+
+
+class MaintenanceError(RuntimeError):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Space
+# ---------------------------------------------------------------------------
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def space():
+    """Page and file sizes of the database: {page_size, pages, free_pages,
+    auto_vacuum, db_bytes, wal_bytes}."""
+    con = get_connection()
+    pragma = lambda name: con.execute(f"PRAGMA {name}").fetchone()[0]
+    return {
+        "page_size": pragma("page_size"),
+        "pages": pragma("page_count"),
+        "free_pages": pragma("freelist_count"),
+        "auto_vacuum": ("none", "full", "incremental")[pragma("auto_vacuum")],
+        "db_bytes": _file_size(tasks_db.DB),
+        "wal_bytes": _file_size(tasks_db.DB + "-wal"),
+    }
+
+
+def _on_disk(s):
+    return s["db_bytes"] + s["wal_bytes"]
+
+
+def checkpoint():
+    """Copy the WAL into the database file and truncate it.
+
+    Returns {busy, wal_pages, checkpointed}; busy=1 means a reader still
+    needed part of the WAL, so it could not be truncated this time.
+    """
+    busy, log, done = get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return {"busy": busy, "wal_pages": log, "checkpointed": done}
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+# @agent:Maintenance:authority
+def backup(dest, keep=None, step_pages=BACKUP_STEP_PAGES, pause=BACKUP_PAUSE, verify=True):
+    """Copy the live database to dest without blocking writers.
+
+    dest is a file, or a directory that gets a timestamped tasks-*.db (the
+    newest `keep` are kept). The copy is written next to its target,
+    switched to a single-file journal, checked with quick_check and only
+    then renamed into place, so a failed run never leaves a partial backup.
+    """
+    t0 = time.perf_counter()
+    dest = Path(dest)
+    folder = dest if dest.is_dir() or not dest.suffix else None
+    if folder is not None:
+        folder.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("tasks-%Y%m%d-%H%M%S")
+        dest, n = folder / f"{stamp}.db", 1
+        while dest.exists():
+            n += 1
+            dest = folder / f"{stamp}-{n}.db"
+    tmp = dest.with_name(dest.name + ".part")
+    if tmp.exists():
+        tmp.unlink()
+
+    restarts = 0
+    last = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last
+        if last is not None and remaining > last:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts
+        last = remaining
+
+    source = tasks_db.db_connect()
+    target = sqlite3.connect(tmp)
+    try:
+        try:
+            source.backup(target, pages=step_pages, progress=progress, sleep=pause)
+        except _TooManyRestarts:
+            source.backup(target, pages=-1)
+        pages = target.execute("PRAGMA page_count").fetchone()[0]
+        target.execute("PRAGMA journal_mode = DELETE")
+        check = target.execute("PRAGMA quick_check").fetchone()[0] if verify else None
+    finally:
+        target.close()
+        source.close()
+    if check not in (None, "ok"):
+        tmp.unlink()
+        raise MaintenanceError(f"backup failed quick_check: {check}")
+    os.replace(tmp, dest)
+
+    removed = []
+    if folder is not None and keep:
+        old = sorted(folder.glob(BACKUP_PATTERN))[:-keep]
+        for path in old:
+            path.unlink()
+            removed.append(path.name)
+    return {
+        "step": "backup", "seconds": time.perf_counter() - t0, "path": str(dest),
+        "pages": pages, "bytes": _file_size(dest), "restarts": restarts, "removed": removed,
+    }
+
+
+# @agent:Maintenance:extension
+def vacuum(full=False, step_pages=VACUUM_STEP_PAGES):
+    """Give free pages back to the file system.
+
+    With auto_vacuum=INCREMENTAL this frees step_pages at a time, each in
+    its own short write transaction. full=True rebuilds the file with VACUUM
+    (holding the write lock throughout) and turns incremental mode on, which
+    an existing database needs once. The WAL is checkpointed afterwards so
+    the file actually shrinks.
+    """
+    t0 = time.perf_counter()
+    con = get_connection()
+    before = space()
+    if full:
+        if before["auto_vacuum"] != "incremental":
+            con.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        con.execute("VACUUM")
+    elif before["auto_vacuum"] == "incremental":
+        while con.execute("PRAGMA freelist_count").fetchone()[0]:
+            with write_transaction():
+                con.execute(f"PRAGMA incremental_vacuum({step_pages})").fetchall()
+    ckpt = checkpoint()
+    after = space()
+    return {
+        "step": "vacuum", "seconds": time.perf_counter() - t0, "mode": after["auto_vacuum"],
+        "freed_pages": before["free_pages"] - after["free_pages"],
+        "free_pages": after["free_pages"],
+        "reclaimed_bytes": _on_disk(before) - _on_disk(after),
+        "db_bytes": after["db_bytes"], "checkpoint_busy": ckpt["busy"],
+    }
+
+
+# @agent:Maintenance:extension
+def analyze(full=False, clear=False):
+    """Refresh the planner's statistics (sqlite_stat1).
+
+    By default ANALYZE samples ANALYSIS_LIMIT rows per index, which keeps
+    the run short on a large table; full=True reads every row. clear=True
+    drops the statistics instead, back to the planner's built-in guesses.
+    """
+    t0 = time.perf_counter()
+    con = get_connection()
+    if clear:
+        if con.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            with write_transaction():
+                con.execute("DELETE FROM sqlite_stat1")
+        con.execute("ANALYZE sqlite_master")  # reload the (now empty) statistics
+    else:
+        con.execute(f"PRAGMA analysis_limit = {0 if full else ANALYSIS_LIMIT}")
+        con.execute("ANALYZE")
+    stats = 0
+    if con.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        stats = con.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+    return {"step": "analyze", "seconds": time.perf_counter() - t0,
+            "cleared": clear, "stat_rows": stats}
+
+
+# @agent:Maintenance:extension
+def check(full=False):
+    """Integrity checks. Returns the report; report["ok"] is False on any
+    problem, which is listed in report["problems"].
+
+    quick_check verifies every page and row (O(N)); full=True runs
+    integrity_check, which also matches every index against its table.
+    The full-text index and the trigger-maintained task counters are
+    checked against ActionList too.
+    """
+    t0 = time.perf_counter()
+    con = get_connection()
+    pragma = "integrity_check" if full else "quick_check"
+    problems = [r[0] for r in con.execute(f"PRAGMA {pragma}") if r[0] != "ok"]
+    problems += [f"foreign key: {r[0]} row {r[1]} -> {r[2]}"
+                 for r in con.execute("PRAGMA foreign_key_check")]
+    try:
+        with write_transaction():
+            con.execute("INSERT INTO ActionList_fts (ActionList_fts) VALUES ('integrity-check')")
+    except sqlite3.DatabaseError as e:
+        problems.append(f"search index: {e} (rebuild with "
+                        f"INSERT INTO ActionList_fts (ActionList_fts) VALUES ('rebuild'))")
+    drift = check_counters()
+    if drift:
+        problems.append(f"task counters: {len(drift)} off (python tasks_cli.py counters --fix)")
+    return {"step": "check", "seconds": time.perf_counter() - t0, "mode": pragma,
+            "ok": not problems, "problems": problems}
+
+
+# @agent:Maintenance:entry
+def run(backup_to=None, keep=None, full=False):
+    """The scheduled job: check, back up, vacuum, analyze, in that order.
+
+    Stops after the check if it finds a problem, so rotation never replaces
+    good backups with copies of a damaged database.
+    """
+    steps = [check(full=full)]
+    if not steps[0]["ok"]:
+        return steps
+    if backup_to:
+        steps.append(backup(backup_to, keep=keep))
+    steps.append(vacuum())
+    steps.append(analyze())
+    return steps
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _mb(n):
+    return f"{n / 1048576:.1f} MB"
+
+
+def _describe(step):
+    kind = step["step"]
+    if kind == "backup":
+        restarts = f", {step['restarts']} restart(s)" if step["restarts"] else ""
+        removed = f", removed {len(step['removed'])} old" if step["removed"] else ""
+        return f"{step['path']} ({_mb(step['bytes'])}{restarts}{removed})"
+    if kind == "vacuum":
+        text = (f"reclaimed {_mb(step['reclaimed_bytes'])} on disk "
+                f"({step['freed_pages']} free pages, the rest WAL), file {_mb(step['db_bytes'])}")
+        if step["mode"] != "incremental" and step["free_pages"]:
+            text += f"; {step['free_pages']} free pages need a one-off `vacuum --full`"
+        return text
+    if kind == "analyze":
+        return "statistics cleared" if step["cleared"] else f"{step['stat_rows']} stat rows"
+    if kind == "check":
+        return step["mode"] + (" ok" if step["ok"] else ": " + "; ".join(step["problems"][:5]))
+    return ""
+
+
+def _report(steps, as_json):
+    if as_json:
+        print(json.dumps({"at": datetime.now().isoformat(timespec="seconds"),
+                          "db": str(tasks_db.DB), "steps": steps}))
+        return
+    for step in steps:
+        print(f"  {step['step']:<8} {step['seconds'] * 1000:>8.0f} ms  {_describe(step)}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Back up and maintain tasks.db.")
+    ap.add_argument("--db", help="database path (default: tasks_db.DB)")
+    ap.add_argument("--json", action="store_true", help="one JSON line per run")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="check, backup, vacuum and analyze (for a scheduler)")
+    p.add_argument("--backup", metavar="DIR", help="also back up into DIR")
+    p.add_argument("--keep", type=int, help="backups to keep in DIR")
+    p.add_argument("--full", action="store_true", help="integrity_check instead of quick_check")
+    p = sub.add_parser("backup", help="online backup to a file or directory")
+    p.add_argument("dest")
+    p.add_argument("--keep", type=int, help="backups to keep when dest is a directory")
+    p.add_argument("--pages", type=int, default=BACKUP_STEP_PAGES, help="pages per step")
+    p = sub.add_parser("check", help="integrity, search index and counters")
+    p.add_argument("--full", action="store_true", help="integrity_check instead of quick_check")
+    p = sub.add_parser("vacuum", help="return free pages to the file system")
+    p.add_argument("--full", action="store_true",
+                   help="rebuild with VACUUM and switch to incremental auto_vacuum")
+    p = sub.add_parser("analyze", help="refresh query planner statistics")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--full", action="store_true", help="read every row, not a sample")
+    g.add_argument("--clear", action="store_true", help="drop the statistics")
+    sub.add_parser("space", help="page counts and file sizes")
+
+    args = ap.parse_args(argv)
+    if args.db:
+        tasks_db.DB = args.db
+    ensure_schema()
+
+    if args.command == "space":
+        s = space()
+        if args.json:
+            print(json.dumps(s))
+        else:
+            print(f"{_mb(s['db_bytes'])} + {_mb(s['wal_bytes'])} WAL, {s['pages']} pages of "
+                  f"{s['page_size']} B, {s['free_pages']} free, auto_vacuum {s['auto_vacuum']}")
+        return 0
+    try:
+        if args.command == "run":
+            steps = run(args.backup, keep=args.keep, full=args.full)
+        elif args.command == "backup":
+            steps = [backup(args.dest, keep=args.keep, step_pages=args.pages)]
+        elif args.command == "check":
+            steps = [check(full=args.full)]
+        elif args.command == "vacuum":
+            steps = [vacuum(full=args.full)]
+        else:
+            steps = [analyze(full=args.full, clear=args.clear)]
+    except (OSError, sqlite3.Error, MaintenanceError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    _report(steps, args.json)
+    return 0 if all(s.get("ok", True) for s in steps) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
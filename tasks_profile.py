@@ -0,0 +1,403 @@
+"""
+Opt-in timing for tasks_db queries, web requests and LLM calls.
+
+    set TASKS_PROFILE=1                 (export TASKS_PROFILE=1 on Linux/macOS)
+    python tasks_web.py                 # Server-Timing headers, /_stats page
+    python tasks_cli.py search invoice  # timing summary on stderr
+    python tasks_cli_interactive.py     # timing line after each summary
+
+When on, tasks_db opens its connections with TimedConnection. That records
+every query's SQL, row count and time (execute plus fetches) into the
+current Trace, which is one web request or one CLI operation. Queries slower
+than TASKS_SLOW_SQL_MS (default 50) go to the slow-query log: stderr, plus
+the last SLOW_LOG_SIZE on /_stats.
+
+When off, which is the default, nothing is installed. tasks_db opens plain
+sqlite3 connections, the web app registers no hooks, and span() and
+add_span() return after one flag check.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import tasks_db
+
+ENABLED = os.environ.get("TASKS_PROFILE", "") not in ("", "0")
+SLOW_SQL_MS = float(os.environ.get("TASKS_SLOW_SQL_MS", "50"))
+SLOW_LOG_SIZE = 100
+# Distinct SQL texts kept in the per-statement totals.
+MAX_STATEMENTS = 500
+# Upper bounds (ms) of the latency histogram buckets; one more for slower.
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_routes = {}
+_statements = {}
+_slow = deque(maxlen=SLOW_LOG_SIZE)
+
+
+def _one_line(sql, limit=300):
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= limit else sql[:limit] + "…"
+
+
+# ---------------------------------------------------------------------------
+# Traces
+# ---------------------------------------------------------------------------
+
+class Trace:
+    """The queries and named spans of one request or CLI operation."""
+
+    __slots__ = ("name", "started", "queries", "spans")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.queries = []
+        self.spans = {}  # name -> [count, seconds]
+
+    def add(self, name, seconds):
+        span = self.spans.setdefault(name, [0, 0.0])
+        span[0] += 1
+        span[1] += seconds
+
+    def db_seconds(self):
+        return sum(q.seconds for q in self.queries)
+
+    def timings(self):
+        """[(name, count, seconds)]: db, then each span, then the total."""
+        out = [("db", len(self.queries), self.db_seconds())]
+        out += [(name, n, s) for name, (n, s) in self.spans.items()]
+        out.append(("total", 1, time.perf_counter() - self.started))
+        return out
+
+    def summary(self):
+        return "  ".join(
+            f"{name}{f' x{n}' if n > 1 or name == 'db' else ''} {s * 1000:.1f}ms"
+            for name, n, s in self.timings()
+        )
+
+
+def current():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def trace(name, report=sys.stderr):
+    """Collect timings for the block and print a summary line to `report`
+    (None: don't print). Yields the Trace, or None when profiling is off."""
+    if not ENABLED:
+        yield None
+        return
+    outer, t = current(), Trace(name)
+    _local.trace = t
+    try:
+        yield t
+    finally:
+        _local.trace = outer
+        if report is not None:
+            print(f"[profile] {name}: {t.summary()}", file=report)
+
+
+def add_span(name, seconds):
+    """Add `seconds` under `name` to the current trace (if any)."""
+    if ENABLED:
+        t = current()
+        if t is not None:
+            t.add(name, seconds)
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        add_span(self.name, time.perf_counter() - self.t0)
+
+
+class _NoSpan:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Context manager timing the block as `name` in the current trace."""
+    return _Span(name) if ENABLED else _NO_SPAN
+
+
+# ---------------------------------------------------------------------------
+# Query timing
+# ---------------------------------------------------------------------------
+
+class QueryRecord:
+    __slots__ = ("sql", "rows", "seconds", "done")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.rows = 0
+        self.seconds = 0.0
+        self.done = False
+
+
+def _begin(sql):
+    record = QueryRecord(sql)
+    t = current()
+    if t is not None:
+        t.queries.append(record)
+    return record
+
+
+def _finish(record):
+    if record is None or record.done:
+        return
+    record.done = True
+    ms = record.seconds * 1000
+    with _stats_lock:
+        stat = _statements.get(record.sql)
+        if stat is None and len(_statements) < MAX_STATEMENTS:
+            stat = _statements[record.sql] = [0, 0.0, 0.0, 0]
+        if stat is not None:
+            stat[0] += 1
+            stat[1] += record.seconds
+            stat[2] = max(stat[2], record.seconds)
+            stat[3] += record.rows
+        if ms >= SLOW_SQL_MS:
+            t = current()
+            _slow.append({"at": datetime.now().isoformat(timespec="seconds"),
+                          "ms": ms, "rows": record.rows, "sql": _one_line(record.sql),
+                          "context": t.name if t is not None else ""})
+    if ms >= SLOW_SQL_MS:
+        print(f"[slow sql] {ms:.1f}ms {record.rows} rows: {_one_line(record.sql)}",
+              file=sys.stderr)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """A cursor that times execute and every fetch into a QueryRecord."""
+
+    _record = None
+
+    def _run(self, method, sql, *args):
+        _finish(self._record)
+        record = self._record = _begin(sql)
+        t0 = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            record.seconds += time.perf_counter() - t0
+            if self.description is None:  # not a query: nothing to fetch
+                record.rows = max(self.rowcount, 0)
+                _finish(record)
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._run(super().executescript, sql_script)
+
+    def _fetched(self, t0, rows, last):
+        record = self._record
+        if record is not None:
+            record.seconds += time.perf_counter() - t0
+            record.rows += rows
+            if last:
+                _finish(record)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t0, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows), True)
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t0, 0, True)
+            raise
+        self._fetched(t0, 1, False)
+        return row
+
+    def close(self):
+        _finish(self._record)
+        super().close()
+
+    def __del__(self):
+        _finish(self._record)
+
+
+class TimedConnection(sqlite3.Connection):
+    """tasks_db's connection class while profiling: every execute goes
+    through a TimedCursor, and opening the file is timed as db.connect."""
+
+    def __init__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        super().__init__(*args, **kwargs)
+        add_span("db.connect", time.perf_counter() - t0)
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def enable():
+    """Turn profiling on for connections opened from now on."""
+    global ENABLED
+    ENABLED = True
+    tasks_db.CONNECTION_FACTORY = TimedConnection
+
+
+if ENABLED:
+    enable()
+
+
+# ---------------------------------------------------------------------------
+# Web requests
+# ---------------------------------------------------------------------------
+
+def _bucket(ms):
+    for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+        if ms <= bound:
+            return i
+    return len(HISTOGRAM_BOUNDS_MS)
+
+
+def record_route(route, t):
+    seconds = time.perf_counter() - t.started
+    with _stats_lock:
+        stat = _routes.get(route)
+        if stat is None:
+            stat = _routes[route] = {"count": 0, "seconds": 0.0, "db": 0.0, "queries": 0,
+                                     "max": 0.0, "buckets": [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)}
+        stat["count"] += 1
+        stat["seconds"] += seconds
+        stat["db"] += t.db_seconds()
+        stat["queries"] += len(t.queries)
+        stat["max"] = max(stat["max"], seconds)
+        stat["buckets"][_bucket(seconds * 1000)] += 1
+
+
+def _percentile_ms(buckets, count, p):
+    """Upper bound of the bucket holding the p-th percentile (None: slower
+    than the last bound)."""
+    target, seen = count * p, 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= target and n:
+            return HISTOGRAM_BOUNDS_MS[i] if i < len(HISTOGRAM_BOUNDS_MS) else None
+    return None
+
+
+def stats():
+    """Per-route latency, the costliest statements and the slow-query log
+    for this process."""
+    with _stats_lock:
+        routes = []
+        for route, s in sorted(_routes.items(), key=lambda kv: -kv[1]["seconds"]):
+            n = s["count"]
+            routes.append({
+                "route": route, "count": n, "avg_ms": s["seconds"] / n * 1000,
+                "db_ms": s["db"] / n * 1000, "queries": s["queries"] / n,
+                "max_ms": s["max"] * 1000, "buckets": list(s["buckets"]),
+                "p50": _percentile_ms(s["buckets"], n, 0.5),
+                "p99": _percentile_ms(s["buckets"], n, 0.99),
+            })
+        statements = [
+            {"sql": _one_line(sql), "count": n, "total_ms": total * 1000,
+             "avg_ms": total / n * 1000, "max_ms": worst * 1000, "rows": rows / n}
+            for sql, (n, total, worst, rows) in sorted(
+                _statements.items(), key=lambda kv: -kv[1][1])[:50]
+        ]
+        slow = list(reversed(_slow))
+    return {"routes": routes, "statements": statements, "slow": slow,
+            "bounds": HISTOGRAM_BOUNDS_MS, "slow_ms": SLOW_SQL_MS, "pid": os.getpid()}
+
+
+def reset():
+    with _stats_lock:
+        _routes.clear()
+        _statements.clear()
+        _slow.clear()
+
+
+def _server_timing(t):
+    parts = [f'db;dur={t.db_seconds() * 1000:.2f};desc="{len(t.queries)} queries"']
+    parts += [f"{name};dur={s * 1000:.2f}" for name, (n, s) in t.spans.items()]
+    parts.append(f"app;dur={(time.perf_counter() - t.started) * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def init_app(app):
+    """Add the request hooks to a Flask app; does nothing when profiling is off."""
+    if not ENABLED:
+        return
+    from flask import before_render_template, request, template_rendered
+
+    @app.before_request
+    def _start_trace():
+        _local.trace = Trace(request.path)
+        _local.renders = []
+
+    @app.after_request
+    def _finish_trace(response):
+        t = current()
+        if t is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else "(no route)"
+            record_route(f"{request.method} {rule}", t)
+            response.headers["Server-Timing"] = _server_timing(t)
+        return response
+
+    @app.teardown_request
+    def _end_trace(exc):
+        _local.trace = None
+
+    def started(sender, template, context, **extra):
+        getattr(_local, "renders", []).append(time.perf_counter())
+
+    def rendered(sender, template, context, **extra):
+        renders = getattr(_local, "renders", None)
+        if renders:
+            add_span("render", time.perf_counter() - renders.pop())
+
+    before_render_template.connect(started, app, weak=False)
+    template_rendered.connect(rendered, app, weak=False)
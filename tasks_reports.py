@@ -0,0 +1,189 @@
+"""
+Flow reports over status history: time in status, cycle time, weekly
+throughput and WIP aging, overall or per Project / Who.
+
+Everything is computed in SQL from status_spans (one row per stretch a task
+spent in a status, kept current by a trigger on status_history), with window
+functions for medians and percentiles, so no report walks the history in
+Python and each one reads only the spans in its time window.
+
+    python tasks_cli.py report cycle --by Project
+"""
+from datetime import datetime, timedelta
+
+from tasks_db import ALLOWED_STATUS, STATUS_RANK, get_connection
+
+GROUP_COLUMNS = ("Project", "Who")
+DONE_STATUS = "Done"
+START_STATUS = "IP"  # cycle time runs from the first move to IP until Done
+CLOSED_STATUSES = ("Done", "Cncld")
+DEFAULT_DAYS = 90
+DEFAULT_WEEKS = 12
+
+# count / mean / median / 85th percentile / max of `value` per (grp, key),
+# over a CTE named v(grp, key, value). Percentiles are nearest-rank; both
+# window functions share one window so the rows are sorted only once.
+_SUMMARY_SQL = """
+, ranked AS (
+    SELECT grp, key, value,
+           ROW_NUMBER() OVER w AS rn,
+           COUNT(*) OVER (w ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING) AS n
+    FROM v
+    WINDOW w AS (PARTITION BY grp, key ORDER BY value)
+)
+SELECT grp, key, n AS count, AVG(value) AS avg,
+       MAX(CASE WHEN rn = (n + 1) / 2 THEN value END) AS p50,
+       MAX(CASE WHEN rn = (85 * n + 99) / 100 THEN value END) AS p85,
+       MAX(value) AS max
+FROM ranked GROUP BY grp, key
+"""
+
+
+def _group_expr(group_by):
+    if group_by is None:
+        return "''"
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f"Cannot group by {group_by!r}")
+    # History outlives deleted tasks; their spans still count, ungrouped.
+    return f"COALESCE(a.{group_by}, '')"
+
+
+def _stamp(dt):
+    return dt.isoformat(timespec="seconds")
+
+
+def days_ago(days):
+    """Timestamp `days` days back, in status_history's format (for since=)."""
+    return _stamp(datetime.now() - timedelta(days=days))
+
+
+def _since(since):
+    return since or days_ago(DEFAULT_DAYS)
+
+
+def _summaries(sql, params, key_name):
+    rows = get_connection().execute(sql + _SUMMARY_SQL, params).fetchall()
+    out = [
+        {"group": r["grp"], key_name: r["key"], "count": r["count"], "avg": r["avg"],
+         "p50": r["p50"], "p85": r["p85"], "max": r["max"]}
+        for r in rows
+    ]
+    out.sort(key=lambda r: (r["group"], STATUS_RANK.get(r[key_name], 99)))
+    return out
+
+
+# @agent:Reports:authority
+def time_in_status(since=None, group_by=None):
+    """Days spent per visit to each status, for visits that ended after since
+    (default: the last 90 days). Keys: group, status, count, avg, p50, p85, max."""
+    sql = f"""
+        WITH v AS MATERIALIZED (
+            SELECT {_group_expr(group_by)} AS grp, s.status AS key,
+                   julianday(s.ended_at) - julianday(s.started_at) AS value
+            FROM status_spans s LEFT JOIN ActionList a ON a.ItemID = s.item_id
+            WHERE s.ended_at >= ?
+        )"""
+    return _summaries(sql, (_since(since),), "status")
+
+
+# @agent:Reports:extension
+def cycle_time(since=None, group_by=None):
+    """Days to Done for each completion after since: "cycle" from the first
+    move to IP (creation, if it never was IP), "lead" from creation.
+
+    Returns {"cycle": [...], "lead": [...]}; rows are keyed group, status,
+    count, avg, p50, p85, max.
+    """
+    since = _since(since)
+    sql = f"""
+        WITH spans AS (
+            SELECT item_id, status, started_at,
+                   FIRST_VALUE(started_at) OVER w AS created_at,
+                   MIN(CASE WHEN status = '{START_STATUS}' THEN started_at END) OVER w
+                       AS work_started_at
+            FROM status_spans
+            WHERE item_id IN (SELECT item_id FROM status_spans
+                              WHERE status = '{DONE_STATUS}' AND started_at >= ?)
+            WINDOW w AS (PARTITION BY item_id ORDER BY history_id)
+        ),
+        done AS (
+            SELECT {_group_expr(group_by)} AS grp, julianday(d.started_at) AS done_at,
+                   julianday(d.created_at) AS created_at,
+                   julianday(COALESCE(d.work_started_at, d.created_at)) AS work_started_at
+            FROM spans d LEFT JOIN ActionList a ON a.ItemID = d.item_id
+            WHERE d.status = '{DONE_STATUS}' AND d.started_at >= ?
+        ),
+        v AS (
+            SELECT grp, 'cycle' AS key, done_at - work_started_at AS value FROM done
+            UNION ALL
+            SELECT grp, 'lead', done_at - created_at FROM done
+        )"""
+    rows = _summaries(sql, (since, since), "kind")
+    result = {"cycle": [], "lead": []}
+    for row in rows:
+        kind = row.pop("kind")
+        result[kind].append({"group": row.pop("group"), "status": DONE_STATUS, **row})
+    return result
+
+
+# @agent:Reports:extension
+def weekly_throughput(weeks=DEFAULT_WEEKS, group_by=None):
+    """Tasks moved to Done per ISO week (Monday start), oldest week first.
+    Keys: week, group, done."""
+    today = datetime.now().date()
+    first_monday = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    rows = get_connection().execute(
+        f"SELECT date(s.started_at, 'weekday 0', '-6 days') AS week, "
+        f"       {_group_expr(group_by)} AS grp, COUNT(*) AS done "
+        f"FROM status_spans s LEFT JOIN ActionList a ON a.ItemID = s.item_id "
+        f"WHERE s.status = ? AND s.started_at >= ? "
+        f"GROUP BY week, grp ORDER BY week, grp",
+        (DONE_STATUS, first_monday.isoformat()),
+    ).fetchall()
+    return [{"week": r["week"], "group": r["grp"], "done": r["done"]} for r in rows]
+
+
+def _wip_where():
+    # An IN list (not NOT IN) so the Status index picks the open rows.
+    open_statuses = [s for s in ALLOWED_STATUS if s not in CLOSED_STATUSES]
+    return f"a.Status IN ({', '.join(repr(s) for s in open_statuses)})"
+
+
+# @agent:Reports:extension
+def wip_aging(group_by=None):
+    """Days open tasks have sat in their current status, summarised per
+    status. Keys: group, status, count, avg, p50, p85, max."""
+    sql = f"""
+        WITH v AS MATERIALIZED (
+            SELECT {_group_expr(group_by)} AS grp, a.Status AS key,
+                   julianday(?) - julianday(s.started_at) AS value
+            FROM ActionList a
+            JOIN status_spans s ON s.item_id = a.ItemID AND s.ended_at IS NULL
+            WHERE {_wip_where()}
+        )"""
+    return _summaries(sql, (_stamp(datetime.now()),), "status")
+
+
+# @agent:Reports:extension
+def oldest_wip(limit=20):
+    """The open tasks longest in their current status, oldest first."""
+    rows = get_connection().execute(
+        f"SELECT a.ItemID, a.Project, a.Who, a.Status, a.Priority, a.Action, "
+        f"       s.started_at AS status_since, "
+        f"       julianday(?) - julianday(s.started_at) AS days "
+        f"FROM ActionList a "
+        f"JOIN status_spans s ON s.item_id = a.ItemID AND s.ended_at IS NULL "
+        f"WHERE {_wip_where()} "
+        f"ORDER BY s.started_at LIMIT ?",
+        (_stamp(datetime.now()), limit),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+REPORTS = {
+    "time-in-status": time_in_status,
+    "cycle": cycle_time,
+    "throughput": weekly_throughput,
+    "aging": wip_aging,
+    "oldest": oldest_wip,
+}
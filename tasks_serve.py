@@ -0,0 +1,317 @@
+"""
+Production server for the web UI (tasks_web.py's `app.run` is the
+single-user development server).
+
+    python tasks_serve.py --host 0.0.0.0 --port 5000 --workers 4 --threads 8
+    python tasks_serve.py reload          # graceful reload (or kill -HUP <pid>)
+
+A supervisor process opens the listening socket and starts --workers
+worker processes that all accept on it. Each worker serves with --threads
+request threads: waitress when it is installed (pip install waitress, pure
+Python), otherwise a thread pool on werkzeug's HTTP server, which Flask
+already brings along. A worker opens its tasks_db connections and renders
+the list once before it reports ready, so its first real request is not
+slower than the rest.
+
+Reload starts a fresh set of workers, which pick up new code, and once they
+are all ready tells the old ones to stop accepting and finish what they are
+serving. If the new workers fail to start, the old ones keep running. A
+worker that dies is restarted.
+"""
+import argparse
+import base64
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import tasks_db
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5000
+# Rendering is CPU-bound Python, so more processes than cores only adds
+# contention and per-process caches to refill after each write.
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_THREADS = 8
+# Seconds a stopping worker gets to finish in-flight requests, and a new
+# worker gets to report ready.
+DRAIN_TIMEOUT = 10
+START_TIMEOUT = 30
+POLL_INTERVAL = 0.5
+RELOAD_SUFFIX = ".reload"
+
+
+def reload_file():
+    """Touching this file makes a running supervisor for the same DB reload."""
+    return Path(str(tasks_db.DB) + RELOAD_SUFFIX)
+
+
+def _log(message):
+    print(f"[tasks_serve {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def _waitress_server(app, sock, threads):
+    """(run, stop) for waitress on an already listening socket."""
+    from waitress import wasyncore
+    from waitress.server import create_server
+    server = create_server(app, sockets=[sock], threads=threads, clear_untrusted_proxy_headers=True)
+
+    def idle():
+        dispatcher = server.task_dispatcher
+        return not dispatcher.queue and dispatcher.active_count == 0 and not any(
+            channel.requests or channel.total_outbufs_len
+            for channel in list(server.active_channels.values())
+        )
+
+    def stop():
+        server.accepting = False  # the loop stops polling the listening socket
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while not idle() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        server.task_dispatcher.shutdown(cancel_pending=False, timeout=1)
+        # Closing every channel in the loop's own thread empties its socket
+        # map, which ends run().
+        server.trigger.pull_trigger(lambda: wasyncore.close_all(server._map))
+
+    return server.run, stop
+
+
+def _pooled_server(app, sock, threads):
+    """(run, stop) for werkzeug's HTTP server with a bounded thread pool."""
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class Handler(WSGIRequestHandler):
+        # One request per connection: an idle keep-alive client would
+        # otherwise hold one of the few pool threads.
+        protocol_version = "HTTP/1.0"
+
+        def log_request(self, code="-", size="-"):
+            pass
+
+    class PooledServer(BaseWSGIServer):
+        multithread = True
+
+        def __init__(self):
+            super().__init__(sock.getsockname()[0], sock.getsockname()[1], app,
+                             handler=Handler, fd=sock.fileno())
+            self.pool = ThreadPoolExecutor(threads, thread_name_prefix="tasks-web")
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._serve, request, client_address)
+
+        def _serve(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledServer()
+
+    def stop():
+        server.shutdown()
+        server.pool.shutdown(wait=True)
+
+    return server.serve_forever, stop
+
+
+def _inherit_socket(fd):
+    if fd is not None:
+        return socket.socket(fileno=fd)
+    # Windows: the supervisor sends socket.share() data as the first stdin line.
+    return socket.fromshare(base64.b64decode(sys.stdin.buffer.readline()))
+
+
+def _warm_up(app):
+    with app.test_client() as client:
+        status = client.get("/").status_code
+    tasks_db.release_connection()
+    if status != 200:
+        raise SystemExit(f"warm-up request returned {status}")
+
+
+# @agent:Serve:extension
+def run_worker(fd, threads):
+    """Serve on the inherited socket until the supervisor closes our stdin."""
+    # Ctrl+C reaches the whole console group; the supervisor decides.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sock = _inherit_socket(fd)
+    from tasks_web import app
+    # Keep at least half the threads for page requests (see /events).
+    app.config["EVENTS_MAX_STREAMS"] = max(1, threads // 2)
+    tasks_db.prepare_pool(threads)
+    _warm_up(app)
+    try:
+        run, stop = _waitress_server(app, sock, threads)
+    except ImportError:
+        run, stop = _pooled_server(app, sock, threads)
+
+    def wait_for_stop():
+        sys.stdin.buffer.read()  # EOF: the supervisor wants us gone
+        stop()
+
+    threading.Thread(target=wait_for_stop, daemon=True).start()
+    print("ready", flush=True)
+    run()
+    tasks_db.close_all_connections()
+
+
+# ---------------------------------------------------------------------------
+# Supervisor
+# ---------------------------------------------------------------------------
+
+def _listen(host, port):
+    sock = socket.create_server((host, port), backlog=128)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _spawn(sock, threads):
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--db", str(tasks_db.DB),
+           "worker", "--threads", str(threads)]
+    kwargs = {"stdin": subprocess.PIPE, "stdout": subprocess.PIPE}
+    if os.name == "nt":
+        proc = subprocess.Popen(cmd, **kwargs)
+        proc.stdin.write(base64.b64encode(sock.share(proc.pid)) + b"\n")
+        proc.stdin.flush()
+    else:
+        proc = subprocess.Popen(cmd + ["--fd", str(sock.fileno())],
+                                pass_fds=[sock.fileno()], **kwargs)
+    return proc
+
+
+def _wait_ready(procs):
+    """The workers that printed "ready" within START_TIMEOUT."""
+    ready = []
+
+    def read(proc):
+        if proc.stdout.readline().strip() == b"ready":
+            ready.append(proc)
+
+    readers = [threading.Thread(target=read, args=(p,), daemon=True) for p in procs]
+    for t in readers:
+        t.start()
+    deadline = time.monotonic() + START_TIMEOUT
+    for t in readers:
+        t.join(max(0, deadline - time.monotonic()))
+    return ready
+
+
+def _stop(procs):
+    for proc in procs:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+    deadline = time.monotonic() + DRAIN_TIMEOUT + 2
+    for proc in procs:
+        try:
+            proc.wait(max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def _start_generation(sock, workers, threads):
+    procs = [_spawn(sock, threads) for _ in range(workers)]
+    ready = _wait_ready(procs)
+    if len(ready) < len(procs):
+        _stop(procs)
+        return None
+    return procs
+
+
+def _mtime(path):
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+# @agent:Serve:entry
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, threads=DEFAULT_THREADS):
+    tasks_db.ensure_schema()  # once here, so workers never race a migration
+    tasks_db.close_all_connections()
+    sock = _listen(host, port)
+    current = _start_generation(sock, workers, threads)
+    if current is None:
+        raise SystemExit("workers failed to start")
+    try:
+        import waitress  # noqa: F401
+        backend = "waitress"
+    except ImportError:
+        backend = "werkzeug thread pool"
+    _log(f"serving http://{host}:{port} with {workers} worker(s) x {threads} thread(s) "
+         f"({backend})")
+
+    stopping, reloading = threading.Event(), threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: reloading.set())
+
+    trigger = reload_file()
+    seen = _mtime(trigger)
+    while not stopping.is_set():
+        stopping.wait(POLL_INTERVAL)
+        if _mtime(trigger) != seen:
+            seen = _mtime(trigger)
+            reloading.set()
+        if reloading.is_set() and not stopping.is_set():
+            reloading.clear()
+            fresh = _start_generation(sock, workers, threads)
+            if fresh is None:
+                _log("reload failed: new workers did not start; keeping the old ones")
+                continue
+            _stop(current)
+            current = fresh
+            _log(f"reloaded ({workers} new worker(s))")
+        for i, proc in enumerate(current):
+            if proc.poll() is not None and not stopping.is_set():
+                _log(f"worker {proc.pid} exited with {proc.returncode}; restarting")
+                replacement = _start_generation(sock, 1, threads)
+                if replacement:
+                    current[i] = replacement[0]
+    _log("stopping")
+    _stop(current)
+    sock.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve the task list web UI.")
+    ap.add_argument("--db", help="database path (default: tasks_db.DB)")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="worker processes")
+    ap.add_argument("--threads", type=int, default=DEFAULT_THREADS, help="threads per worker")
+    sub = ap.add_subparsers(dest="command")
+    sub.add_parser("reload", help="gracefully reload a running server for this DB")
+    p = sub.add_parser("worker")  # started by the supervisor
+    p.add_argument("--fd", type=int)
+    p.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+
+    args = ap.parse_args(argv)
+    if args.db:
+        tasks_db.DB = args.db
+    if args.command == "reload":
+        reload_file().touch()
+        return 0
+    if args.command == "worker":
+        run_worker(args.fd, args.threads)
+        return 0
+    serve(args.host, args.port, args.workers, args.threads)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
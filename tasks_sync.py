@@ -0,0 +1,466 @@
+"""
+Incremental sync of ActionList and status_history between tasks.db replicas.
+
+    python tasks_sync.py status
+    python tasks_sync.py drop \\\\server\\share\\tasks-sync    # shared folder
+    python tasks_sync.py serve --port 8765                   # on one machine
+    python tasks_sync.py pull otherhost:8765                 # on the others
+    python tasks_sync.py export changes.json --peer <replica>
+    python tasks_sync.py import changes.json
+
+Triggers (tasks_db.SYNC_LOG_DDL) stamp each column a task write changes
+with a Lamport time and this replica's change counter `seq`. A changeset
+holds only the stamps after the point the peer has acknowledged, with their
+current values, so its size and cost follow the edits made since the last
+sync, not the size of the table.
+
+Conflicts are settled per column: the write with the higher (Lamport time,
+replica id) wins, so every replica ends up with the same values whatever
+order changesets arrive in. Edits to different columns of a task both
+survive. A delete beats concurrent edits; restoring the task brings it back
+everywhere. Status history rows are appended once each (by uid).
+
+ItemIDs are local. A task created elsewhere keeps its ItemID here when that
+number was never used locally, and gets the next unused one otherwise.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import tasks_db
+from tasks_db import SYNC_COLUMNS, VERSION_COLUMNS, ensure_schema, get_connection, write_transaction
+
+FORMAT_VERSION = 1
+DEFAULT_PORT = 8765
+DROP_SUFFIX = ".changes.json"
+
+
+class SyncError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Replica identity and cursors
+# ---------------------------------------------------------------------------
+
+# @agent:Sync:authority
+def replica_id():
+    """This database's replica id, created on first use.
+
+    The id is tied to the host and file path, so a copy of tasks.db opened
+    somewhere else becomes a new replica instead of impersonating the old one.
+    """
+    fingerprint = f"{socket.gethostname()}|{Path(tasks_db.DB).resolve()}"
+    con = get_connection()
+    row = con.execute("SELECT replica, fingerprint FROM sync_state").fetchone()
+    if row["replica"] and row["fingerprint"] == fingerprint:
+        return row["replica"]
+    with write_transaction():
+        row = con.execute("SELECT replica, fingerprint FROM sync_state").fetchone()
+        if row["replica"] and row["fingerprint"] == fingerprint:
+            return row["replica"]
+        if row["replica"]:
+            # Stamps this file inherited stay attributed to where they were made.
+            for table in ("sync_clock", "history_uids"):
+                con.execute(f"UPDATE {table} SET replica = ? WHERE replica IS NULL",
+                            (row["replica"],))
+        replica = uuid.uuid4().hex[:12]
+        con.execute("UPDATE sync_state SET replica = ?, fingerprint = ?", (replica, fingerprint))
+        # Peers have confirmed nothing under the new id.
+        con.execute("UPDATE sync_peers SET acked = 0")
+    return replica
+
+
+def peers():
+    """{replica: {"received", "acked", "synced_at"}} for every peer seen."""
+    return {r["replica"]: {"received": r["received"], "acked": r["acked"],
+                           "synced_at": r["synced_at"]}
+            for r in get_connection().execute("SELECT * FROM sync_peers ORDER BY replica")}
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+# ---------------------------------------------------------------------------
+# Changesets
+# ---------------------------------------------------------------------------
+
+# @agent:Sync:extension
+def make_changeset(peer=None, since=None):
+    """Everything stamped here after `since` (default: what `peer` has
+    acknowledged, or everything), as a JSON-able dict.
+
+    Stamps that came from `peer` itself are left out.
+    """
+    me = replica_id()
+    con = get_connection()
+    if since is None:
+        row = con.execute("SELECT acked FROM sync_peers WHERE replica = ?", (peer,)).fetchone()
+        since = row[0] if row else 0
+    upto = con.execute("SELECT seq FROM sync_state").fetchone()[0]
+    not_from_peer = " AND (c.replica IS NULL OR c.replica <> ?)" if peer else ""
+    params = [me, since, upto] + ([peer] if peer else [])
+
+    tasks = {}
+    # One statement, so each stamp is read together with the value it stamped.
+    for r in con.execute(
+        f"SELECT c.uid, c.col, c.lamport, COALESCE(c.replica, ?) AS replica, "
+        f"       a.ItemID, {', '.join('a.' + c for c in VERSION_COLUMNS)} "
+        f"FROM sync_clock c "
+        f"LEFT JOIN task_uids u ON u.uid = c.uid "
+        f"LEFT JOIN ActionList a ON a.ItemID = u.item_id "
+        f"WHERE c.seq > ? AND c.seq <= ?{not_from_peer}",
+        params,
+    ):
+        if r["col"] == "_alive":
+            value = int(r["ItemID"] is not None)
+        elif r["ItemID"] is None:
+            continue  # deleted here; its '_alive' stamp says so
+        else:
+            value = r[r["col"]]
+        task = tasks.setdefault(r["uid"], {"item_id": r["ItemID"], "cells": {}})
+        task["cells"][r["col"]] = [value, r["lamport"], r["replica"]]
+
+    not_from_peer = " AND (hu.replica IS NULL OR hu.replica <> ?)" if peer else ""
+    history = [list(r) for r in con.execute(
+        f"SELECT hu.uid, tu.uid, h.status, h.changed_at, COALESCE(hu.replica, ?) "
+        f"FROM history_uids hu "
+        f"JOIN status_history h ON h.id = hu.history_id "
+        f"JOIN task_uids tu ON tu.item_id = h.item_id "
+        f"WHERE hu.seq > ? AND hu.seq <= ?{not_from_peer} ORDER BY hu.seq, h.id",
+        params,
+    )]
+    acks = {replica: p["received"] for replica, p in peers().items()}
+    return {"format": FORMAT_VERSION, "replica": me, "since": since, "upto": upto,
+            "acks": acks, "tasks": tasks, "history": history}
+
+
+def _restore_image(con, item_id):
+    """Values a deleted task had here, from its last task_versions delete."""
+    row = con.execute(
+        "SELECT * FROM task_versions WHERE item_id = ? AND op = 'D' ORDER BY id DESC LIMIT 1",
+        (item_id,),
+    ).fetchone()
+    return {c: row[c] for c in VERSION_COLUMNS} if row else {}
+
+
+def _local_item_id(con, uid, hint=None):
+    """ItemID for a task uid, reserving one if the uid is new here.
+
+    The origin's ItemID (hint) is kept if this replica never handed it out.
+    Reserving bumps sqlite_sequence, so local inserts never reuse the id;
+    it also lets history arrive for a task that is already deleted.
+    """
+    row = con.execute("SELECT item_id FROM task_uids WHERE uid = ?", (uid,)).fetchone()
+    if row:
+        return row[0]
+    row = con.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ActionList'").fetchone()
+    last = row[0] if row else 0
+    item_id = hint if hint is not None and hint > last else last + 1
+    if row:
+        con.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'ActionList'", (item_id,))
+    else:
+        con.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('ActionList', ?)", (item_id,))
+    con.execute("INSERT INTO task_uids (item_id, uid) VALUES (?, ?)", (item_id, uid))
+    return item_id
+
+
+def _apply_task(con, me, uid, task, seq):
+    """Apply one task's cells; returns the number of registers that won."""
+    local = {
+        r["col"]: (r["lamport"], r["replica"] or me)
+        for r in con.execute("SELECT col, lamport, replica FROM sync_clock WHERE uid = ?", (uid,))
+    }
+    wins = {
+        col: (value, lamport, replica)
+        for col, (value, lamport, replica) in task["cells"].items()
+        if col in SYNC_COLUMNS and (lamport, replica) > local.get(col, (0, ""))
+    }
+    if not wins:
+        return 0
+    row = con.execute("SELECT item_id FROM task_uids WHERE uid = ?", (uid,)).fetchone()
+    item_id = row[0] if row else None
+    current = item_id is not None and con.execute(
+        "SELECT * FROM ActionList WHERE ItemID = ?", (item_id,)
+    ).fetchone()
+    alive = wins.get("_alive", (None,))[0]
+    values = {col: v[0] for col, v in wins.items() if col != "_alive"}
+
+    if alive == 0:
+        if current:
+            con.execute("DELETE FROM ActionList WHERE ItemID = ?", (item_id,))
+    elif current:
+        # Skip values we already hold, so no-op merges fire no triggers.
+        values = {col: v for col, v in values.items() if current[col] != v}
+        if values:
+            con.execute(
+                f"UPDATE ActionList SET {', '.join(f'{c} = ?' for c in values)} WHERE ItemID = ?",
+                [*values.values(), item_id],
+            )
+    elif alive == 1:
+        if item_id is None:
+            item_id = _local_item_id(con, uid, task.get("item_id"))
+        row = {**_restore_image(con, item_id), **values}
+        con.execute(
+            f"INSERT INTO ActionList (ItemID, {', '.join(VERSION_COLUMNS)}) "
+            f"VALUES (?{', ?' * len(VERSION_COLUMNS)})",
+            (item_id, *(row.get(c) for c in VERSION_COLUMNS)),
+        )
+    # A task deleted here and only edited there stays deleted; the stamps
+    # are still kept so a later restore sees the newest values.
+    con.executemany(
+        "INSERT INTO sync_clock (uid, col, lamport, replica, seq) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (uid, col) DO UPDATE SET "
+        "lamport = excluded.lamport, replica = excluded.replica, seq = excluded.seq",
+        [(uid, col, lamport, None if replica == me else replica, seq)
+         for col, (_, lamport, replica) in wins.items()],
+    )
+    return len(wins)
+
+
+def _apply_history(con, me, history, seq):
+    """Append unseen status_history rows; returns the ItemIDs touched."""
+    touched = set()
+    for uid, task_uid, status, changed_at, replica in history:
+        if con.execute("SELECT 1 FROM history_uids WHERE uid = ?", (uid,)).fetchone():
+            continue
+        item_id = _local_item_id(con, task_uid)
+        cur = con.execute(
+            "INSERT INTO status_history (item_id, status, changed_at) VALUES (?, ?, ?)",
+            (item_id, status, changed_at),
+        )
+        con.execute(
+            "INSERT INTO history_uids (history_id, uid, replica, seq) VALUES (?, ?, ?, ?)",
+            (cur.lastrowid, uid, None if replica == me else replica, seq),
+        )
+        touched.add(item_id)
+    if touched:
+        # Rows from a peer can predate local ones; rebuild those tasks'
+        # spans in time order rather than arrival order.
+        ids = json.dumps(sorted(touched))
+        con.execute("DELETE FROM status_spans WHERE item_id IN (SELECT value FROM json_each(?))",
+                    (ids,))
+        con.execute(
+            "INSERT INTO status_spans (history_id, item_id, status, started_at, ended_at) "
+            "SELECT id, item_id, status, changed_at, "
+            "       LEAD(changed_at) OVER (PARTITION BY item_id ORDER BY changed_at, id) "
+            "FROM status_history WHERE item_id IN (SELECT value FROM json_each(?))",
+            (ids,),
+        )
+    return touched
+
+
+# @agent:Sync:extension
+def apply_changeset(changeset):
+    """Merge a peer's changeset in one transaction. Safe to apply twice.
+
+    Returns {"replica", "cells", "tasks", "history"}: registers that won,
+    tasks they touched, and status_history rows added.
+    """
+    if changeset.get("format") != FORMAT_VERSION:
+        raise SyncError(f"Unsupported changeset format: {changeset.get('format')!r}")
+    me = replica_id()
+    source = changeset["replica"]
+    result = {"replica": source, "cells": 0, "tasks": 0, "history": 0}
+    if source == me:
+        return result
+    lamport = max((cell[1] for task in changeset["tasks"].values()
+                   for cell in task["cells"].values()), default=0)
+    with write_transaction() as con:
+        con.execute(
+            "UPDATE sync_state SET applying = 1, seq = seq + 1, clock = MAX(clock, ?)", (lamport,)
+        )
+        try:
+            seq = con.execute("SELECT seq FROM sync_state").fetchone()[0]
+            for uid, task in changeset["tasks"].items():
+                won = _apply_task(con, me, uid, task, seq)
+                result["cells"] += won
+                result["tasks"] += bool(won)
+            result["history"] = len(_apply_history(con, me, changeset["history"], seq))
+        finally:
+            con.execute("UPDATE sync_state SET applying = 0")
+        row = con.execute("SELECT received FROM sync_peers WHERE replica = ?", (source,)).fetchone()
+        received = row[0] if row else 0
+        # A changeset that starts after what we hold leaves a gap; apply it
+        # but keep the cursor, so the peer resends from there.
+        if changeset["since"] <= received:
+            received = max(received, changeset["upto"])
+        con.execute(
+            "INSERT INTO sync_peers (replica, received, acked, synced_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (replica) DO UPDATE SET received = excluded.received, "
+            "acked = MAX(acked, excluded.acked), synced_at = excluded.synced_at",
+            (source, received, changeset["acks"].get(me, 0), _now()),
+        )
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Transports
+# ---------------------------------------------------------------------------
+
+def write_changeset(changeset, path):
+    """Write atomically, so a peer reading a shared folder never sees half."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(changeset, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def read_changeset(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+# @agent:Sync:extension
+def drop_sync(folder):
+    """Sync through a shared folder: apply every other replica's
+    <replica>.changes.json, then rewrite ours with what the slowest peer in
+    the folder has not acknowledged yet. Returns the apply results."""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    me = replica_id()
+    results = [apply_changeset(read_changeset(p))
+               for p in sorted(folder.glob("*" + DROP_SUFFIX))
+               if p.name != me + DROP_SUFFIX]
+    # Peers that no longer write here don't hold the file back.
+    acked = {replica: p["acked"] for replica, p in peers().items()}
+    since = min((acked.get(r["replica"], 0) for r in results), default=0)
+    write_changeset(make_changeset(since=since), folder / (me + DROP_SUFFIX))
+    return results
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def _receive(stream):
+    line = stream.readline()
+    if not line:
+        raise SyncError("Connection closed by peer")
+    return json.loads(line)
+
+
+class _SyncHandler(socketserver.StreamRequestHandler):
+    """One exchange: hello -> our changeset -> theirs -> result."""
+
+    def handle(self):
+        try:
+            hello = _receive(self.rfile)
+            me = replica_id()
+            _send(self.wfile, make_changeset(peer=hello["replica"],
+                                             since=hello["acks"].get(me, 0)))
+            _send(self.wfile, apply_changeset(_receive(self.rfile)))
+        except (SyncError, ValueError, KeyError, OSError) as e:
+            print(f"sync with {self.client_address[0]} failed: {e}", file=sys.stderr)
+        finally:
+            tasks_db.release_connection()
+
+
+# @agent:Sync:extension
+def serve(host="127.0.0.1", port=DEFAULT_PORT):
+    """Answer pull() requests until interrupted. No authentication: bind to
+    localhost or a trusted network only."""
+    with socketserver.ThreadingTCPServer((host, port), _SyncHandler) as server:
+        print(f"tasks_sync serving replica {replica_id()} on {host}:{port}", file=sys.stderr)
+        server.serve_forever()
+
+
+# @agent:Sync:extension
+def pull(host, port=DEFAULT_PORT, timeout=30):
+    """Two-way sync with a serve()ing peer. Returns (pulled, pushed) results."""
+    me = replica_id()
+    acks = {replica: p["received"] for replica, p in peers().items()}
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        with sock.makefile("rwb") as stream:
+            _send(stream, {"replica": me, "acks": acks})
+            theirs = _receive(stream)
+            pulled = apply_changeset(theirs)
+            _send(stream, make_changeset(peer=theirs["replica"],
+                                         since=theirs["acks"].get(me, 0)))
+            pushed = _receive(stream)
+    return pulled, pushed
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return (host, int(port)) if host else (text, DEFAULT_PORT)
+
+
+def _report(result, direction):
+    print(f"{direction} {result['replica']}: {result['cells']} field(s) on "
+          f"{result['tasks']} task(s), {result['history']} history row(s)", file=sys.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sync tasks.db replicas.")
+    ap.add_argument("--db", help="database path (default: tasks_db.DB)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="show this replica and its peers")
+    p = sub.add_parser("drop", help="sync through a shared folder")
+    p.add_argument("folder")
+    p = sub.add_parser("serve", help="accept pulls from peers")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p = sub.add_parser("pull", help="two-way sync with a serving peer")
+    p.add_argument("address", help="host[:port]")
+    p = sub.add_parser("export", help="write a changeset file")
+    p.add_argument("file")
+    p.add_argument("--peer", help="only what this replica has not acknowledged")
+    p = sub.add_parser("import", help="apply changeset files")
+    p.add_argument("files", nargs="+")
+
+    args = ap.parse_args(argv)
+    if args.db:
+        tasks_db.DB = args.db
+    ensure_schema()
+
+    if args.command == "status":
+        row = get_connection().execute("SELECT clock, seq FROM sync_state").fetchone()
+        print(f"replica {replica_id()}  seq {row['seq']}  clock {row['clock']}")
+        for replica, p in peers().items():
+            print(f"  peer {replica}  received {p['received']}  acked {p['acked']}  "
+                  f"last sync {p['synced_at']}")
+    elif args.command == "drop":
+        for result in drop_sync(args.folder):
+            _report(result, "from")
+    elif args.command == "serve":
+        try:
+            serve(args.host, args.port)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "pull":
+        try:
+            pulled, pushed = pull(*_address(args.address))
+        except (OSError, SyncError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        _report(pulled, "from")
+        _report(pushed, "to")
+    elif args.command == "export":
+        changeset = make_changeset(peer=args.peer)
+        write_changeset(changeset, args.file)
+        print(f"Wrote {len(changeset['tasks'])} task(s), {len(changeset['history'])} "
+              f"history row(s) up to seq {changeset['upto']}.", file=sys.stderr)
+    else:
+        for path in args.files:
+            try:
+                _report(apply_changeset(read_changeset(path)), "from")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"error: {path}: {e}", file=sys.stderr)
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
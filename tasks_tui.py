@@ -0,0 +1,220 @@
+"""
+Full-screen search-as-you-type for the CLI (needs prompt_toolkit).
+
+TaskIndex keeps every task in memory and filters on each keystroke; typing
+more characters only re-filters the previous matches. It stays current by
+replaying the change_log (changes_since) whenever the db_version counter
+moves, so it never re-reads the whole table after the first load.
+
+    python tasks_tui.py
+"""
+import time
+from bisect import bisect_left, insort
+
+from tasks_db import (
+    STATUS_RANK, TASK_COLUMNS, change_seq, changes_since, data_version, fetch_one,
+    get_connection,
+)
+
+try:
+    from prompt_toolkit.application import Application
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.layout import HSplit, Layout, Window
+    from prompt_toolkit.layout.controls import FormattedTextControl
+    from prompt_toolkit.widgets import TextArea
+    HAS_PROMPT_TOOLKIT = True
+except ImportError:
+    HAS_PROMPT_TOOLKIT = False
+
+SEARCH_FIELDS = ("Project", "Action", "Notes", "Who")
+MAX_SHOWN = 200
+
+
+def _sort_key(task):
+    # Same order as run_search_query: STATUS_ORDER, Priority ASC, ItemID DESC.
+    return (STATUS_RANK.get(task["Status"], 8), task["Priority"] or 0, -task["ItemID"])
+
+
+def _haystack(task):
+    return " ".join((task[f] or "") for f in SEARCH_FIELDS).lower()
+
+
+# @agent:TaskIndex:authority
+class TaskIndex:
+    """In-memory task list with incremental substring search.
+
+    Every whitespace-separated term must occur (case-insensitively) in
+    Project, Title, Notes or Who. Results are in list order: status rank,
+    then priority (1 first), newest first within a priority.
+    """
+
+    def __init__(self):
+        self._keys = {}         # ItemID -> sort key
+        self._order = []        # (sort key, haystack, task), kept sorted
+        self._seq = None
+        self._version = None
+        self._last = ("", None)  # (query, matches) for narrowing
+
+    def load(self):
+        con = get_connection()
+        self._seq = change_seq()
+        self._version = data_version()
+        tasks = [dict(r) for r in con.execute(f"SELECT {TASK_COLUMNS} FROM ActionList")]
+        self._keys = {t["ItemID"]: _sort_key(t) for t in tasks}
+        self._order = sorted((self._keys[t["ItemID"]], _haystack(t), t) for t in tasks)
+        self._last = ("", None)
+
+    def _apply(self, item_id, task):
+        """Replace (or with task=None, drop) one task, keeping _order sorted."""
+        old = self._keys.pop(item_id, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (old,))]
+        if task is not None:
+            key = self._keys[item_id] = _sort_key(task)
+            insort(self._order, (key, _haystack(task), task))
+
+    def refresh(self):
+        """Apply changes made since the last load/refresh. Returns True if any."""
+        version = data_version()
+        if version == self._version:
+            return False
+        self._version = version
+        if self._seq is None:
+            self.load()
+            return True
+        changed = False
+        while True:
+            changes, self._seq, reset = changes_since(self._seq, limit=1000,
+                                                      columns=TASK_COLUMNS)
+            if reset:
+                self.load()
+                return True
+            for c in changes:
+                self._apply(c["item_id"], c["task"])
+                changed = True
+            if len(changes) < 1000:
+                break
+        if changed:
+            self._last = ("", None)
+        return changed
+
+    @property
+    def loaded(self):
+        return self._seq is not None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, query, limit=None):
+        """Return (match count, first `limit` matching tasks)."""
+        query = query.lower()
+        terms = query.split()
+        last_query, last_matches = self._last
+        if last_matches is not None and last_query and query.startswith(last_query):
+            # Typing more only narrows the result: the last matches already
+            # contain every earlier term, so only the last one (which may
+            # have grown) and any new ones need checking.
+            pool = last_matches
+            terms = terms[max(len(last_query.split()) - 1, 0):]
+        else:
+            pool = self._order
+        # One pass per term: a plain `in` per row beats all() over a generator.
+        for term in terms:
+            pool = [entry for entry in pool if term in entry[1]]
+        self._last = (query, pool)
+        return len(pool), [entry[2] for entry in pool[:limit]]
+
+
+def _row_text(task):
+    project = (task["Project"] or "").strip()
+    title = (task["Action"] or "").strip()
+    return f'[{task["ItemID"]}] P{task["Priority"]} {task["Status"]:<5} {project} — {title}'
+
+
+# @agent:CliLiveSearch:entry
+def run_live_search(index=None):
+    """Full-screen search: type to filter, Up/Down to pick, Enter for detail,
+    Esc to close the detail or leave. Pass a loaded TaskIndex to reuse it."""
+    index = index or TaskIndex()
+    if not index.loaded:
+        index.load()
+    state = {"results": [], "count": 0, "selected": 0, "ms": 0.0, "detail": None,
+             "query": None}
+
+    search_box = TextArea(height=1, prompt="Search: ", multiline=False)
+
+    def update():
+        query = search_box.text
+        refreshed = index.refresh()
+        if not refreshed and query == state["query"]:
+            return
+        t0 = time.perf_counter()
+        state["count"], state["results"] = index.search(query, limit=MAX_SHOWN)
+        state["ms"] = (time.perf_counter() - t0) * 1000
+        state["query"] = query
+        state["selected"] = min(state["selected"], max(len(state["results"]) - 1, 0))
+
+    def results_text():
+        update()
+        lines = []
+        for n, task in enumerate(state["results"]):
+            style = "reverse" if n == state["selected"] else ""
+            lines.append((style, _row_text(task) + "\n"))
+        return lines or [("", "(no matches)\n")]
+
+    def status_text():
+        update()
+        return (f" {state['count']} match(es) of {len(index)}, showing {len(state['results'])} — "
+                f"{state['ms']:.1f} ms  |  Up/Down select, Enter detail, Esc back")
+
+    def detail_text():
+        task = state["detail"]
+        if task is None:
+            return ""
+        return (f"#{task['ItemID']}  {task['Project'] or ''}  Who: {task['Who'] or ''}  "
+                f"Status: {task['Status']}  P{task['Priority']}\n{task['Action'] or ''}\n\n"
+                f"{task['Notes'] or ''}")
+
+    kb = KeyBindings()
+
+    @kb.add("up")
+    def _(event):
+        state["selected"] = max(state["selected"] - 1, 0)
+
+    @kb.add("down")
+    def _(event):
+        state["selected"] = min(state["selected"] + 1, max(len(state["results"]) - 1, 0))
+
+    @kb.add("enter")
+    def _(event):
+        if state["results"]:
+            state["detail"] = fetch_one(state["results"][state["selected"]]["ItemID"])
+
+    @kb.add("escape", eager=True)
+    @kb.add("c-c")
+    def _(event):
+        if state["detail"] is not None:
+            state["detail"] = None
+            return
+        event.app.exit(result=None)
+
+    layout = Layout(HSplit([
+        search_box,
+        Window(height=1, content=FormattedTextControl(status_text), style="reverse"),
+        Window(content=FormattedTextControl(results_text)),
+        Window(height=12, content=FormattedTextControl(detail_text), wrap_lines=True),
+    ]), focused_element=search_box)
+
+    # refresh_interval redraws once a second, which also picks up changes
+    # made by other processes (refresh() is one counter read when idle).
+    app = Application(layout=layout, key_bindings=kb, full_screen=True, refresh_interval=1.0)
+    return app.run()
+
+
+if __name__ == "__main__":
+    from tasks_db import ensure_schema
+
+    ensure_schema()
+    if not HAS_PROMPT_TOOLKIT:
+        raise SystemExit("Live search needs prompt_toolkit (pip install prompt_toolkit).")
+    run_live_search()
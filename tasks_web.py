@@ -1,89 +1,41 @@
 import sys
 import os
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from flask import Flask, render_template_string, request, redirect, abort
+from flask import Flask, Response, render_template, request, redirect, abort, jsonify
+from jinja2 import DictLoader
+from markupsafe import Markup
 from urllib.parse import urlencode, quote, unquote
+from tasks_api import api
+import tasks_profile
+import tasks_reports
 from tasks_db import (
-    ALLOWED_STATUS, db_connect, get_distinct, fetch_one,
-    insert_task, run_search_query, log_status_change, ensure_status_history_table,
-    fetch_status_history,
+    ALLOWED_STATUS, BULK_UPDATE_FIELDS, PAGE_SIZE, release_connection,
+    data_version, get_distinct, fetch_one, fetch_page, fetch_tasks, count_tasks,
+    encode_cursor, decode_cursor, change_seq, changes_since,
+    insert_task, insert_task_for_summary, update_task, update_tasks, delete_task,
+    run_search_query, count_search_results, ensure_schema, fetch_status_history,
+    count_open_tasks, status_counts, LIST_COLUMNS, fetch_as_of, fetch_versions, deleted_tasks,
+    restore_task,
 )
 
 app = Flask(__name__)
-
-# ---------------------------------------------------------------------------
-# DB helpers (web-only — shared helpers imported from tasks_db)
-# ---------------------------------------------------------------------------
-
-# @agent:TaskRead:extension
-def fetch_all(project=None, who=None, statuses=None, sort="ItemID", direction="desc"):
-    from tasks_db import STATUS_ORDER
-    import sqlite3
-    allowed_cols = {"ItemID", "Project", "Who", "Status", "Priority", "Action"}
-    if sort not in allowed_cols:
-        sort = "ItemID"
-    if direction not in ("asc", "desc"):
-        direction = "desc"
-
-    con = db_connect()
-    con.row_factory = sqlite3.Row
-    cur = con.cursor()
-
-    wheres = []
-    params = []
-    if project:
-        wheres.append("Project = ?")
-        params.append(project)
-    if who:
-        wheres.append("Who = ?")
-        params.append(who)
-    if statuses:
-        placeholders = ",".join("?" * len(statuses))
-        wheres.append(f"Status IN ({placeholders})")
-        params.extend(statuses)
-
-    where_clause = ("WHERE " + " AND ".join(wheres)) if wheres else ""
-
-    if sort == "Status":
-        order_clause = f"ORDER BY {STATUS_ORDER} {direction.upper()}, Priority ASC"
-    else:
-        order_clause = f"ORDER BY {sort} {direction.upper()}"
-
-    rows = cur.execute(
-        f"SELECT ItemID, Project, Who, Status, Priority, Action, Notes "
-        f"FROM ActionList {where_clause} {order_clause}",
-        params,
-    ).fetchall()
-    con.close()
-    return rows
-
-
-# @agent:TaskWrite:extension
-def update_task(item_id, project, who, status, priority, action, notes):
-    con = db_connect()
-    con.row_factory = None
-    cur = con.cursor()
-    row = cur.execute("SELECT Status FROM ActionList WHERE ItemID=?", (item_id,)).fetchone()
-    old_status = row[0] if row else None
-    cur.execute(
-        "UPDATE ActionList SET Project=?, Who=?, Status=?, Priority=?, Action=?, Notes=? "
-        "WHERE ItemID=?",
-        (project, who[:5], status, int(priority), action, notes, item_id),
-    )
-    if status != old_status:
-        log_status_change(cur, item_id, status)
-    con.commit()
-    con.close()
+app.register_blueprint(api)
+# Server-Timing headers and /_stats when TASKS_PROFILE is set; no hooks otherwise.
+tasks_profile.init_app(app)
 
 
-def delete_task(item_id):
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute("DELETE FROM ActionList WHERE ItemID = ?", (item_id,))
-    con.commit()
-    con.close()
+# Hand the request's connection back to the tasks_db pool once the response
+# is done, so the next request reuses it instead of reopening tasks.db.
+@app.teardown_request
+def _release_db(exc):
+    release_connection()
 
 
 # ---------------------------------------------------------------------------
@@ -151,8 +103,12 @@ BASE = """
     <a class="navbar-brand" href="/">Task List</a>
     <div class="collapse navbar-collapse">
       <ul class="navbar-nav me-auto">
-        <li class="nav-item"><a class="nav-link" href="/">Tasks</a></li>
+        <li class="nav-item"><a class="nav-link" href="/">Tasks
+          <span class="badge rounded-pill bg-secondary" title="Open tasks (not Done / Cncld)">{{ open_count() }}</span></a></li>
         <li class="nav-item"><a class="nav-link" href="/add">Add Task</a></li>
+        <li class="nav-item"><a class="nav-link" href="/reports">Reports</a></li>
+        <li class="nav-item"><a class="nav-link" href="/as-of">As of…</a></li>
+        <li class="nav-item"><a class="nav-link" href="/deleted">Deleted</a></li>
       </ul>
     </div>
   </div>
@@ -169,28 +125,70 @@ BASE = """
 # Task list template
 # ---------------------------------------------------------------------------
 
-# @agent:TaskListTemplate:authority
-TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
-{% block content %}
-
-<!-- Print header (hidden on screen) -->
-<div class="print-header">
-  <strong>Task List</strong>
-  {% if sel_project %} &mdash; Project: {{ sel_project }}{% endif %}
-  {% if sel_who %} &mdash; User: {{ sel_who }}{% endif %}
-  {% if sel_statuses %} &mdash; Status: {{ sel_statuses | join(', ') }}{% endif %}
-  &nbsp;({{ rows|length }} tasks)
-</div>
-
-<!-- Toolbar -->
-<div class="d-flex justify-content-between align-items-center mb-3 no-print">
-  <h4 class="mb-0">Tasks <span class="badge bg-secondary">{{ rows|length }}</span></h4>
-  <div class="d-flex gap-2">
-    <button onclick="window.print()" class="btn btn-outline-secondary btn-sm">Print</button>
-    <a href="/add?return_to={{ return_to }}" class="btn btn-primary btn-sm">+ Add Task</a>
-  </div>
-</div>
+# One <tr> per task. Rendered on its own so infinite scroll can fetch just
+# the rows of the next page.
+TASK_ROWS = """
+    {% for r in rows %}
+    <tr id="row-{{ r['ItemID'] }}">
+      <td class="no-print"><input type="checkbox" class="form-check-input row-select" name="ids"
+                                  value="{{ r['ItemID'] }}" form="bulk-form"></td>
+      <td><a href="/history/{{ r['ItemID'] }}?return_to={{ return_to }}" class="text-decoration-none">{{ r['ItemID'] }}</a></td>
+      <td>{{ r['Project'] or '' }}</td>
+      <td class="no-print">
+        <form method="post" action="/quick-update/{{ r['ItemID'] }}" class="quick-form">
+          <input type="hidden" name="return_to" value="{{ return_to }}">
+          <input type="hidden" name="anchor" value="row-{{ r['ItemID'] }}">
+          <select name="who" class="form-select form-select-sm" onchange="this.form.requestSubmit()" style="min-width:70px;">
+            {% for w in whos %}
+              <option value="{{ w }}" {% if w == r['Who'] %}selected{% endif %}>{{ w }}</option>
+            {% endfor %}
+            {% if r['Who'] not in whos %}
+              <option value="{{ r['Who'] }}" selected>{{ r['Who'] }}</option>
+            {% endif %}
+          </select>
+        </form>
+      </td>
+      <td class="print-who" style="display:none;">{{ r['Who'] or '' }}</td>
+      <td class="no-print">
+        <form method="post" action="/quick-update/{{ r['ItemID'] }}" class="quick-form">
+          <input type="hidden" name="return_to" value="{{ return_to }}">
+          <input type="hidden" name="anchor" value="row-{{ r['ItemID'] }}">
+          <select name="status" class="form-select form-select-sm" onchange="this.form.requestSubmit()">
+            {% for s in all_statuses %}
+              <option value="{{ s }}" {% if s == r['Status'] %}selected{% endif %}>{{ s }}</option>
+            {% endfor %}
+          </select>
+        </form>
+      </td>
+      <td class="print-status" style="display:none;"><span class="badge badge-{{ r['Status'] }}">{{ r['Status'] }}</span></td>
+      <td class="no-print">
+        <form method="post" action="/quick-update/{{ r['ItemID'] }}" class="quick-form">
+          <input type="hidden" name="return_to" value="{{ return_to }}">
+          <input type="hidden" name="anchor" value="row-{{ r['ItemID'] }}">
+          <select name="priority" class="form-select form-select-sm" onchange="this.form.requestSubmit()" style="min-width:60px;">
+            {% for p in [1,2,3,4,5] %}
+              <option value="{{ p }}" {% if p == r['Priority'] %}selected{% endif %}>{{ p }}</option>
+            {% endfor %}
+          </select>
+        </form>
+      </td>
+      <td class="print-priority" style="display:none;">{{ r['Priority'] }}</td>
+      <td>{{ r['Action'] or '' }}</td>
+      <td class="notes-cell"><div>{{ r['Notes'] or '' }}</div></td>
+      <td class="no-print">
+        <a href="/edit/{{ r['ItemID'] }}?return_to={{ return_to }}" class="btn btn-outline-primary btn-sm">Edit</a>
+        <form method="post" action="/delete/{{ r['ItemID'] }}" class="d-inline"
+              onsubmit="return confirm('Delete item {{ r['ItemID'] }}?')">
+          <input type="hidden" name="return_to" value="{{ return_to }}">
+          <button type="submit" class="btn btn-outline-danger btn-sm">Del</button>
+        </form>
+      </td>
+    </tr>
+    {% endfor %}
+"""
 
+# Filter form (search box, Project/Who dropdowns, status checkboxes).
+TASK_FILTERS = """
 <!-- Filters -->
 <form method="get" class="row g-2 mb-3 align-items-end no-print">
   <div class="col-auto">
@@ -223,7 +221,8 @@ TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
         <div class="form-check form-check-inline mb-0">
           <input class="form-check-input" type="checkbox" name="status" value="{{ s }}"
                  id="st_{{ s }}" {% if s in sel_statuses %}checked{% endif %}>
-          <label class="form-check-label small" for="st_{{ s }}">{{ s }}</label>
+          <label class="form-check-label small" for="st_{{ s }}">{{ s }}
+            <span class="badge rounded-pill badge-{{ s }}">{{ status_totals[s] }}</span></label>
         </div>
       {% endfor %}
     </div>
@@ -233,16 +232,67 @@ TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
     <a href="/?cleared=1" class="btn btn-outline-secondary btn-sm">Clear</a>
   </div>
 </form>
+"""
+
+# @agent:TaskListTemplate:authority
+TASK_LIST = """
+{% extends "base.html" %}
+{% block content %}
+
+<!-- Print header (hidden on screen) -->
+<div class="print-header">
+  <strong>Task List</strong>
+  {% if sel_project %} &mdash; Project: {{ sel_project }}{% endif %}
+  {% if sel_who %} &mdash; User: {{ sel_who }}{% endif %}
+  {% if sel_statuses %} &mdash; Status: {{ sel_statuses | join(', ') }}{% endif %}
+  &nbsp;({{ total }} tasks)
+</div>
+
+<!-- Toolbar -->
+<div class="d-flex justify-content-between align-items-center mb-3 no-print">
+  <h4 class="mb-0">Tasks <span class="badge bg-secondary">{{ total }}</span></h4>
+  <div class="d-flex gap-2">
+    <button onclick="window.print()" class="btn btn-outline-secondary btn-sm">Print</button>
+    <a href="/add?return_to={{ return_to }}" class="btn btn-primary btn-sm">+ Add Task</a>
+  </div>
+</div>
+
+{{ filters_html }}
+
+<!-- Bulk update: applies the chosen fields to every ticked row in one POST -->
+<form method="post" action="/bulk-update" id="bulk-form"
+      class="d-none d-flex flex-wrap gap-2 align-items-center mb-2 p-2 border rounded bg-light no-print">
+  <input type="hidden" name="return_to" value="{{ return_to }}">
+  <strong class="small"><span id="bulk-count">0</span> selected</strong>
+  <select name="who" class="form-select form-select-sm w-auto">
+    <option value="">Who &mdash;</option>
+    {% for w in whos %}<option value="{{ w }}">{{ w }}</option>{% endfor %}
+  </select>
+  <select name="status" class="form-select form-select-sm w-auto">
+    <option value="">Status &mdash;</option>
+    {% for s in all_statuses %}<option value="{{ s }}">{{ s }}</option>{% endfor %}
+  </select>
+  <select name="priority" class="form-select form-select-sm w-auto">
+    <option value="">Pri &mdash;</option>
+    {% for p in [1,2,3,4,5] %}<option value="{{ p }}">{{ p }}</option>{% endfor %}
+  </select>
+  <button type="submit" class="btn btn-primary btn-sm">Apply</button>
+  <button type="button" class="btn btn-link btn-sm" id="bulk-clear">Clear selection</button>
+</form>
 {% if q %}
 <div class="alert alert-info py-1 px-2 mb-2 no-print small">
-  Searching: <strong>{{ q }}</strong> &mdash; {{ rows|length }} result(s)
+  Searching: <strong>{{ q }}</strong> &mdash; {{ total }} result(s)
 </div>
 {% endif %}
 
 <!-- Table -->
 <div class="table-responsive">
-<table class="table table-bordered table-hover table-sm align-middle resizable-table" id="task-table">
+<table class="table table-bordered table-hover table-sm align-middle resizable-table" id="task-table"
+       data-change-seq="{{ change_seq if change_seq is not none else '' }}" data-return-to="{{ return_to }}"
+       data-search="{{ '1' if q else '' }}" data-project="{{ sel_project }}" data-who="{{ sel_who }}"
+       data-statuses="{{ sel_statuses | join(',') }}">
   <colgroup>
+    <col style="width:2%"><!-- Select -->
     <col style="width:3%"><!-- ID -->
     <col style="width:5%"><!-- Project -->
     <col style="width:4%"><!-- Who -->
@@ -254,6 +304,7 @@ TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
   </colgroup>
   <thead class="table-dark">
     <tr>
+      <th class="no-print"><input type="checkbox" class="form-check-input" id="select-all" title="Select all shown"></th>
       {% for col, label in columns %}
         {% if col in ('Who', 'Status', 'Priority') %}
           <th class="no-print" style="min-width:40px;">
@@ -288,65 +339,30 @@ TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
     </tr>
   </thead>
   <tbody>
-    {% for r in rows %}
-    <tr id="row-{{ r['ItemID'] }}">
-      <td><a href="/history/{{ r['ItemID'] }}?return_to={{ return_to }}" class="text-decoration-none">{{ r['ItemID'] }}</a></td>
-      <td>{{ r['Project'] or '' }}</td>
-      <td class="no-print">
-        <form method="post" action="/quick-update/{{ r['ItemID'] }}">
-          <input type="hidden" name="return_to" value="{{ return_to }}">
-          <input type="hidden" name="anchor" value="row-{{ r['ItemID'] }}">
-          <select name="who" class="form-select form-select-sm" onchange="this.form.submit()" style="min-width:70px;">
-            {% for w in whos %}
-              <option value="{{ w }}" {% if w == r['Who'] %}selected{% endif %}>{{ w }}</option>
-            {% endfor %}
-            {% if r['Who'] not in whos %}
-              <option value="{{ r['Who'] }}" selected>{{ r['Who'] }}</option>
-            {% endif %}
-          </select>
-        </form>
-      </td>
-      <td class="print-who" style="display:none;">{{ r['Who'] or '' }}</td>
-      <td class="no-print">
-        <form method="post" action="/quick-update/{{ r['ItemID'] }}">
-          <input type="hidden" name="return_to" value="{{ return_to }}">
-          <input type="hidden" name="anchor" value="row-{{ r['ItemID'] }}">
-          <select name="status" class="form-select form-select-sm" onchange="this.form.submit()">
-            {% for s in all_statuses %}
-              <option value="{{ s }}" {% if s == r['Status'] %}selected{% endif %}>{{ s }}</option>
-            {% endfor %}
-          </select>
-        </form>
-      </td>
-      <td class="print-status" style="display:none;"><span class="badge badge-{{ r['Status'] }}">{{ r['Status'] }}</span></td>
-      <td class="no-print">
-        <form method="post" action="/quick-update/{{ r['ItemID'] }}">
-          <input type="hidden" name="return_to" value="{{ return_to }}">
-          <input type="hidden" name="anchor" value="row-{{ r['ItemID'] }}">
-          <select name="priority" class="form-select form-select-sm" onchange="this.form.submit()" style="min-width:60px;">
-            {% for p in [1,2,3,4,5] %}
-              <option value="{{ p }}" {% if p == r['Priority'] %}selected{% endif %}>{{ p }}</option>
-            {% endfor %}
-          </select>
-        </form>
-      </td>
-      <td class="print-priority" style="display:none;">{{ r['Priority'] }}</td>
-      <td>{{ r['Action'] or '' }}</td>
-      <td class="notes-cell"><div>{{ r['Notes'] or '' }}</div></td>
-      <td class="no-print">
-        <a href="/edit/{{ r['ItemID'] }}?return_to={{ return_to }}" class="btn btn-outline-primary btn-sm">Edit</a>
-        <form method="post" action="/delete/{{ r['ItemID'] }}" class="d-inline"
-              onsubmit="return confirm('Delete item {{ r['ItemID'] }}?')">
-          <input type="hidden" name="return_to" value="{{ return_to }}">
-          <button type="submit" class="btn btn-outline-danger btn-sm">Del</button>
-        </form>
-      </td>
-    </tr>
-    {% endfor %}
+    {{ rows_html }}
   </tbody>
 </table>
 </div>
 
+<!-- Paging -->
+<div class="d-flex justify-content-between align-items-center mb-3 no-print" id="pager"
+     data-next-url="{{ next_url or '' }}" data-infinite="{{ '1' if infinite else '' }}">
+  <small class="text-muted">Showing {{ shown }} of {{ total }}</small>
+  <div class="d-flex gap-2">
+    {% if paged %}
+      <a href="{{ first_url }}" class="btn btn-outline-secondary btn-sm">&laquo; First page</a>
+    {% endif %}
+    {% if next_url %}
+      <a href="{{ next_url }}" class="btn btn-outline-secondary btn-sm" id="next-page">Next page &raquo;</a>
+    {% endif %}
+    {% if infinite %}
+      <a href="{{ toggle_scroll_url }}" class="btn btn-link btn-sm">Page by page</a>
+    {% else %}
+      <a href="{{ toggle_scroll_url }}" class="btn btn-link btn-sm">Infinite scroll</a>
+    {% endif %}
+  </div>
+</div>
+
 <style>
   @media print {
     .print-only { display: inline !important; }
@@ -356,7 +372,7 @@ TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
 
 <script>
 (function() {
-  // Scroll to anchor after quick-update redirect
+  // Scroll to anchor after a full-page quick-update (the no-fetch fallback)
   if (window.location.hash) {
     const el = document.querySelector(window.location.hash);
     if (el) el.scrollIntoView({ block: 'center' });
@@ -377,10 +393,144 @@ TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
     if (c) { sel.style.backgroundColor = c.bg; sel.style.color = c.color; }
     else   { sel.style.backgroundColor = ''; sel.style.color = ''; }
   }
-  document.querySelectorAll('select[name="status"]').forEach(sel => {
-    applyStatusColor(sel);
-    sel.addEventListener('change', () => applyStatusColor(sel));
+  function colourStatusSelects(root) {
+    root.querySelectorAll('select[name="status"]').forEach(sel => {
+      applyStatusColor(sel);
+      sel.addEventListener('change', () => applyStatusColor(sel));
+    });
+  }
+  colourStatusSelects(document);
+
+  // Swap each server-rendered <tr> in for the row with the same id, keeping
+  // its bulk-select tick. Rows not on the page go to addNew, if given.
+  function replaceRows(html, addNew) {
+    const tmp = document.createElement('tbody');
+    tmp.innerHTML = html;
+    colourStatusSelects(tmp);
+    [...tmp.children].forEach(tr => {
+      const old = document.getElementById(tr.id);
+      if (!old) { if (addNew) addNew(tr); return; }
+      const was = old.querySelector('.row-select');
+      const now = tr.querySelector('.row-select');
+      if (was && now) now.checked = was.checked;
+      old.replaceWith(tr);
+    });
+  }
+
+  // Inline edits: post the one changed field and patch just that row.
+  document.querySelector('#task-table tbody').addEventListener('submit', e => {
+    const form = e.target;
+    if (!form.classList.contains('quick-form') || !window.fetch) return;
+    e.preventDefault();
+    const body = new FormData(form);
+    body.append('partial', 'row');
+    const selects = form.querySelectorAll('select');
+    selects.forEach(sel => sel.disabled = true);
+    fetch(form.action, { method: 'POST', body })
+      .then(resp => resp.ok ? resp.text() : Promise.reject(resp))
+      .then(replaceRows)
+      .catch(() => {
+        // Disabled selects are left out of a form post: re-enable them so
+        // the plain submit carries the edit.
+        selects.forEach(sel => sel.disabled = false);
+        form.submit();
+      });
+  });
+
+  // Bulk update: tick rows, pick fields, Apply. Only the changed rows come
+  // back and are swapped in place.
+  const bulkForm = document.getElementById('bulk-form');
+  const selectAll = document.getElementById('select-all');
+  function selectedBoxes() {
+    return document.querySelectorAll('#task-table .row-select:checked');
+  }
+  function syncBulkForm() {
+    const n = selectedBoxes().length;
+    document.getElementById('bulk-count').textContent = n;
+    bulkForm.classList.toggle('d-none', n === 0);
+  }
+  document.getElementById('task-table').addEventListener('change', e => {
+    if (e.target === selectAll) {
+      document.querySelectorAll('#task-table .row-select').forEach(cb => cb.checked = selectAll.checked);
+    }
+    if (e.target === selectAll || e.target.classList.contains('row-select')) syncBulkForm();
   });
+  document.getElementById('bulk-clear').addEventListener('click', () => {
+    selectedBoxes().forEach(cb => cb.checked = false);
+    selectAll.checked = false;
+    syncBulkForm();
+  });
+  bulkForm.addEventListener('submit', e => {
+    if (!window.fetch) return;
+    e.preventDefault();
+    const body = new FormData(bulkForm);
+    body.append('partial', 'rows');
+    fetch(bulkForm.action, { method: 'POST', body })
+      .then(resp => resp.ok ? resp.text() : Promise.reject(resp))
+      .then(html => {
+        replaceRows(html);
+        bulkForm.reset();
+        syncBulkForm();
+      })
+      .catch(() => bulkForm.submit());
+  });
+
+  // Live updates: /events streams what changed after the seq this page was
+  // rendered at. Deleted rows are dropped; changed rows on the page, and new
+  // ones that match the filters, are re-rendered via /rows.
+  const view = document.getElementById('task-table').dataset;
+  if (window.EventSource && view.changeSeq !== '') {
+    const statuses = view.statuses ? view.statuses.split(',') : [];
+    const matchesView = t => !view.search
+      && (!view.project || t.Project === view.project)
+      && (!view.who || t.Who === view.who)
+      && (!statuses.length || statuses.includes(t.Status));
+    const tbody = document.querySelector('#task-table tbody');
+    const events = new EventSource('/events?since=' + view.changeSeq);
+    events.addEventListener('changes', e => {
+      const ids = [];
+      JSON.parse(e.data).changes.forEach(c => {
+        const tr = document.getElementById('row-' + c.item_id);
+        if (c.op === 'delete') { if (tr) tr.remove(); }
+        else if (tr || matchesView(c.task)) ids.push(c.item_id);
+      });
+      if (!ids.length) return;
+      fetch('/rows?ids=' + ids.join(',') + '&return_to=' + encodeURIComponent(view.returnTo))
+        .then(resp => resp.text())
+        .then(html => replaceRows(html, tr => {
+          tr.classList.add('table-info');
+          tbody.prepend(tr);
+        }));
+    });
+    events.addEventListener('reset', () => { events.close(); window.location.reload(); });
+  }
+
+  // Infinite scroll: fetch the next page's rows when the pager comes into view
+  const pager = document.getElementById('pager');
+  if (pager && pager.dataset.infinite && 'IntersectionObserver' in window) {
+    const tbody = document.querySelector('#task-table tbody');
+    let loading = false;
+    const observer = new IntersectionObserver(entries => {
+      const nextUrl = pager.dataset.nextUrl;
+      if (!entries[0].isIntersecting || loading || !nextUrl) return;
+      loading = true;
+      fetch(nextUrl + '&partial=rows')
+        .then(resp => {
+          pager.dataset.nextUrl = resp.headers.get('X-Next-Page') || '';
+          return resp.text();
+        })
+        .then(html => {
+          const tmp = document.createElement('tbody');
+          tmp.innerHTML = html;
+          colourStatusSelects(tmp);
+          tbody.append(...tmp.children);
+          const next = document.getElementById('next-page');
+          if (next && !pager.dataset.nextUrl) next.remove();
+          loading = false;
+        });
+    }, { rootMargin: '400px' });
+    observer.observe(pager);
+  }
 
   // Column resize
   const table = document.getElementById('task-table');
@@ -406,13 +556,14 @@ TASK_LIST = BASE.replace("{% block content %}{% endblock %}", """
 })();
 </script>
 {% endblock %}
-""")
+"""
 
 # ---------------------------------------------------------------------------
 # Add / Edit form template
 # ---------------------------------------------------------------------------
 
-TASK_FORM = BASE.replace("{% block content %}{% endblock %}", """
+TASK_FORM = """
+{% extends "base.html" %}
 {% block content %}
 <div class="row justify-content-center">
   <div class="col-lg-7">
@@ -461,12 +612,21 @@ TASK_FORM = BASE.replace("{% block content %}{% endblock %}", """
       </div>
       <div class="mb-1">
         <label class="form-label mb-0">Title / Action</label>
-        <input type="text" name="action" class="form-control" value="{{ task.Action or '' }}" required>
+        <input type="text" name="action" id="action-input" class="form-control" value="{{ task.Action or '' }}" required>
       </div>
       <div class="mb-1">
         <label class="form-label mb-0">Notes</label>
         <textarea name="notes" class="form-control" rows="10">{{ task.Notes or '' }}</textarea>
       </div>
+      {% if can_summarize %}
+      <div class="form-check mb-1">
+        <input class="form-check-input" type="checkbox" name="summarize" value="1" id="summarize"
+               onchange="document.getElementById('action-input').required = !this.checked">
+        <label class="form-check-label" for="summarize">
+          Summarise the pasted Notes in the background (fills in Title/Notes; Title optional)
+        </label>
+      </div>
+      {% endif %}
       <input type="hidden" name="return_to" value="{{ return_to }}">
       <div class="mt-2">
       <button type="submit" class="btn btn-primary">Save</button>
@@ -499,7 +659,348 @@ document.querySelector('form').addEventListener('submit', function() {
 });
 </script>
 {% endblock %}
-""")
+"""
+
+# ---------------------------------------------------------------------------
+# Status history template
+# ---------------------------------------------------------------------------
+
+HISTORY = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Status History — #{{ task['ItemID'] }}</title>
+  <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css">
+</head>
+<body class="p-4">
+  <div class="container" style="max-width:600px;">
+    <h5 class="mb-1">Status History</h5>
+    <p class="text-muted mb-3"><strong>#{{ task['ItemID'] }}</strong> — {{ task['Action'] }}</p>
+    {% if history %}
+    <table class="table table-sm table-bordered">
+      <thead class="table-dark">
+        <tr><th>Status</th><th>Date / Time</th></tr>
+      </thead>
+      <tbody>
+        {% for h in history %}
+        <tr>
+          <td>{{ h['status'] }}</td>
+          <td>{{ h['changed_at'] }}</td>
+        </tr>
+        {% endfor %}
+      </tbody>
+    </table>
+    {% else %}
+    <p class="text-muted">No history recorded for this task.</p>
+    {% endif %}
+    {% if versions %}
+    <h5 class="mb-2 mt-4">Changes</h5>
+    <table class="table table-sm table-bordered">
+      <thead class="table-dark">
+        <tr><th>Date / Time</th><th>Field</th><th>From</th><th>To</th></tr>
+      </thead>
+      <tbody>
+        {% for v in versions %}{% for col, (old, new) in v.changes.items() %}
+        <tr>
+          <td>{% if loop.first %}{{ v.changed_at }}{% if v.op == 'I' %} <span class="text-muted small">created</span>{% endif %}{% endif %}</td>
+          <td>{{ col }}</td>
+          <td class="small">{{ '' if old is none else old|string|truncate(120) }}</td>
+          <td class="small">{{ '' if new is none else new|string|truncate(120) }}</td>
+        </tr>
+        {% endfor %}{% endfor %}
+      </tbody>
+    </table>
+    {% endif %}
+    <a href="{{ return_to }}" class="btn btn-outline-secondary btn-sm mt-2">Back</a>
+  </div>
+</body>
+</html>
+"""
+
+REPORTS = """
+{% extends "base.html" %}
+{% macro summary_table(rows, label) %}
+<table class="table table-sm table-bordered mb-4">
+  <thead class="table-dark">
+    <tr>{% if by %}<th>{{ by }}</th>{% endif %}<th>{{ label }}</th><th class="text-end">n</th>
+      <th class="text-end">Avg</th><th class="text-end">Median</th><th class="text-end">85th %</th><th class="text-end">Max</th></tr>
+  </thead>
+  <tbody>
+    {% for r in rows %}
+    <tr>{% if by %}<td>{{ r.group or '—' }}</td>{% endif %}
+      <td><span class="badge badge-{{ r.status }}">{{ r.status }}</span></td>
+      <td class="text-end">{{ r.count }}</td>
+      <td class="text-end">{{ '%.1f'|format(r.avg) }}</td>
+      <td class="text-end">{{ '%.1f'|format(r.p50) }}</td>
+      <td class="text-end">{{ '%.1f'|format(r.p85) }}</td>
+      <td class="text-end">{{ '%.1f'|format(r.max) }}</td></tr>
+    {% else %}
+    <tr><td colspan="7" class="text-muted">No data in this period.</td></tr>
+    {% endfor %}
+  </tbody>
+</table>
+{% endmacro %}
+{% block content %}
+<form class="row g-2 align-items-end mb-3 no-print" method="get">
+  <div class="col-auto">
+    <label class="form-label mb-0">Group by</label>
+    <select name="by" class="form-select form-select-sm" onchange="this.form.submit()">
+      <option value="">(all tasks)</option>
+      {% for col in group_columns %}<option {% if col == by %}selected{% endif %}>{{ col }}</option>{% endfor %}
+    </select>
+  </div>
+  <div class="col-auto">
+    <label class="form-label mb-0">Last N days</label>
+    <input type="number" name="days" min="1" value="{{ days }}" class="form-control form-control-sm" style="width:7em">
+  </div>
+  <div class="col-auto">
+    <label class="form-label mb-0">Weeks</label>
+    <input type="number" name="weeks" min="1" max="104" value="{{ weeks }}" class="form-control form-control-sm" style="width:6em">
+  </div>
+  <div class="col-auto"><button class="btn btn-sm btn-primary">Update</button></div>
+</form>
+<div class="row">
+  <div class="col-xl-6">
+    <h5>Time in status <small class="text-muted">(days per visit, ended in the last {{ days }} days)</small></h5>
+    {{ summary_table(time_in_status, "Status") }}
+    <h5>Cycle time <small class="text-muted">(days from first IP to Done)</small></h5>
+    {{ summary_table(cycle.cycle, "To") }}
+    <h5>Lead time <small class="text-muted">(days from creation to Done)</small></h5>
+    {{ summary_table(cycle.lead, "To") }}
+  </div>
+  <div class="col-xl-6">
+    <h5>Weekly throughput <small class="text-muted">(tasks moved to Done)</small></h5>
+    <table class="table table-sm table-bordered mb-4">
+      <thead class="table-dark"><tr><th>Week of</th>{% for g in tp_groups %}<th class="text-end">{{ g or ('Total' if not by else '—') }}</th>{% endfor %}</tr></thead>
+      <tbody>
+        {% for week in tp_weeks %}
+        <tr><td>{{ week }}</td>{% for g in tp_groups %}<td class="text-end">{{ throughput.get((week, g), 0) }}</td>{% endfor %}</tr>
+        {% else %}
+        <tr><td class="text-muted">No tasks done in this period.</td></tr>
+        {% endfor %}
+      </tbody>
+    </table>
+    <h5>WIP aging <small class="text-muted">(days open tasks have been in their current status)</small></h5>
+    {{ summary_table(aging, "Status") }}
+    <h5>Longest in current status</h5>
+    <table class="table table-sm table-bordered">
+      <thead class="table-dark"><tr><th>ID</th><th>Project</th><th>Who</th><th>Status</th><th>Title</th><th class="text-end">Days</th></tr></thead>
+      <tbody>
+        {% for t in oldest %}
+        <tr><td><a href="/edit/{{ t.ItemID }}">{{ t.ItemID }}</a></td><td>{{ t.Project or '' }}</td><td>{{ t.Who or '' }}</td>
+          <td><span class="badge badge-{{ t.Status }}">{{ t.Status }}</span></td><td>{{ t.Action or '' }}</td>
+          <td class="text-end">{{ '%.0f'|format(t.days) }}</td></tr>
+        {% endfor %}
+      </tbody>
+    </table>
+  </div>
+</div>
+{% endblock %}
+"""
+
+# The list as it stood at a past moment, rebuilt from task_versions.
+AS_OF = """
+{% extends "base.html" %}
+{% block content %}
+<form class="row g-2 align-items-end mb-3 no-print" method="get">
+  <div class="col-auto">
+    <label class="form-label mb-0">As of</label>
+    <input type="datetime-local" step="1" name="at" value="{{ at }}" class="form-control form-control-sm" required>
+  </div>
+  <div class="col-auto">
+    <label class="form-label mb-0">Project</label>
+    <select name="project" class="form-select form-select-sm">
+      <option value="">(all)</option>
+      {% for p in projects %}<option {% if p == sel_project %}selected{% endif %}>{{ p }}</option>{% endfor %}
+    </select>
+  </div>
+  <div class="col-auto">
+    <label class="form-label mb-0">Who</label>
+    <select name="who" class="form-select form-select-sm">
+      <option value="">(all)</option>
+      {% for w in whos %}<option {% if w == sel_who %}selected{% endif %}>{{ w }}</option>{% endfor %}
+    </select>
+  </div>
+  <div class="col-auto">
+    <label class="form-label mb-0">Status</label>
+    <select name="status" class="form-select form-select-sm">
+      <option value="">(all)</option>
+      {% for st in statuses %}<option {% if st == sel_status %}selected{% endif %}>{{ st }}</option>{% endfor %}
+    </select>
+  </div>
+  <div class="col-auto"><button class="btn btn-sm btn-primary">Show</button></div>
+</form>
+{% if rows is not none %}
+<p class="text-muted small">{{ rows|length }}{% if rows|length == limit %}+{% endif %} tasks as of {{ at|replace('T', ' ') }}.</p>
+<table class="table table-sm table-bordered">
+  <thead class="table-dark"><tr><th>ID</th><th>Project</th><th>Who</th><th>Status</th><th>Pri</th><th>Title</th><th>Notes</th></tr></thead>
+  <tbody>
+    {% for r in rows %}
+    <tr><td><a href="/history/{{ r['ItemID'] }}" class="text-decoration-none">{{ r['ItemID'] }}</a></td>
+      <td>{{ r['Project'] or '' }}</td><td>{{ r['Who'] or '' }}</td>
+      <td><span class="badge badge-{{ r['Status'] }}">{{ r['Status'] }}</span></td>
+      <td>{{ r['Priority'] }}</td><td>{{ r['Action'] or '' }}</td>
+      <td class="notes-cell"><div>{{ r['Notes'] or '' }}</div></td></tr>
+    {% endfor %}
+  </tbody>
+</table>
+{% endif %}
+{% endblock %}
+"""
+
+DELETED = """
+{% extends "base.html" %}
+{% block content %}
+<h5>Deleted tasks <small class="text-muted">(most recent first)</small></h5>
+<table class="table table-sm table-bordered">
+  <thead class="table-dark"><tr><th>ID</th><th>Deleted</th><th>Project</th><th>Who</th><th>Status</th><th>Title</th><th class="no-print"></th></tr></thead>
+  <tbody>
+    {% for t in tasks %}
+    <tr><td>{{ t['ItemID'] }}</td><td>{{ t['deleted_at']|replace('T', ' ') }}</td>
+      <td>{{ t['Project'] or '' }}</td><td>{{ t['Who'] or '' }}</td>
+      <td><span class="badge badge-{{ t['Status'] }}">{{ t['Status'] }}</span></td><td>{{ t['Action'] or '' }}</td>
+      <td class="no-print">
+        <form method="post" action="/restore/{{ t['ItemID'] }}" class="d-inline">
+          <button class="btn btn-sm btn-outline-success py-0">Restore</button>
+        </form></td></tr>
+    {% else %}
+    <tr><td colspan="7" class="text-muted">No deleted tasks.</td></tr>
+    {% endfor %}
+  </tbody>
+</table>
+{% endblock %}
+"""
+
+STATS = """
+{% extends "base.html" %}
+{% block content %}
+<h5>Request timing <small class="text-muted">(process {{ s.pid }}; slow-query threshold {{ s.slow_ms|round|int }} ms)</small>
+  <form method="post" class="d-inline"><button class="btn btn-sm btn-outline-secondary py-0 ms-2">Reset</button></form></h5>
+<table class="table table-sm table-bordered">
+  <thead class="table-dark"><tr><th>Route</th><th>Requests</th><th>Avg</th><th>p50</th><th>p99</th><th>Max</th><th>DB</th><th>Queries</th><th>Latency (ms buckets)</th></tr></thead>
+  <tbody>
+    {% for r in s.routes %}
+    {% set top = r.buckets|max %}
+    <tr><td><code>{{ r.route }}</code></td><td>{{ r.count }}</td>
+      <td>{{ '%.1f'|format(r.avg_ms) }}</td>
+      <td>{{ '≤%d'|format(r.p50) if r.p50 else '>%d'|format(s.bounds[-1]) }}</td>
+      <td>{{ '≤%d'|format(r.p99) if r.p99 else '>%d'|format(s.bounds[-1]) }}</td>
+      <td>{{ '%.1f'|format(r.max_ms) }}</td><td>{{ '%.1f'|format(r.db_ms) }}</td>
+      <td>{{ '%.1f'|format(r.queries) }}</td>
+      <td style="white-space: nowrap">{% for n in r.buckets %}<span title="{{ '≤%d'|format(s.bounds[loop.index0]) if loop.index0 < s.bounds|length else '>%d'|format(s.bounds[-1]) }} ms: {{ n }}" style="display:inline-block; width:10px; height:{{ (2 + 22 * n / top)|int if top else 2 }}px; margin-right:1px; background:{{ '#0d6efd' if n else '#dee2e6' }}"></span>{% endfor %}</td></tr>
+    {% else %}
+    <tr><td colspan="9" class="text-muted">No requests yet.</td></tr>
+    {% endfor %}
+  </tbody>
+</table>
+<p class="text-muted small">Buckets (ms): {{ s.bounds|join(', ') }}, slower.</p>
+
+<h5>Statements <small class="text-muted">(by total time)</small></h5>
+<table class="table table-sm table-bordered small">
+  <thead class="table-dark"><tr><th>SQL</th><th>Runs</th><th>Total ms</th><th>Avg ms</th><th>Max ms</th><th>Rows</th></tr></thead>
+  <tbody>
+    {% for q in s.statements %}
+    <tr><td><code>{{ q.sql }}</code></td><td>{{ q.count }}</td><td>{{ '%.1f'|format(q.total_ms) }}</td>
+      <td>{{ '%.2f'|format(q.avg_ms) }}</td><td>{{ '%.1f'|format(q.max_ms) }}</td><td>{{ '%.0f'|format(q.rows) }}</td></tr>
+    {% endfor %}
+  </tbody>
+</table>
+
+<h5>Slow queries <small class="text-muted">(newest first)</small></h5>
+<table class="table table-sm table-bordered small">
+  <thead class="table-dark"><tr><th>At</th><th>ms</th><th>Rows</th><th>During</th><th>SQL</th></tr></thead>
+  <tbody>
+    {% for q in s.slow %}
+    <tr><td>{{ q.at|replace('T', ' ') }}</td><td>{{ '%.1f'|format(q.ms) }}</td><td>{{ q.rows }}</td>
+      <td><code>{{ q.context }}</code></td><td><code>{{ q.sql }}</code></td></tr>
+    {% else %}
+    <tr><td colspan="5" class="text-muted">None.</td></tr>
+    {% endfor %}
+  </tbody>
+</table>
+{% endblock %}
+"""
+
+# ---------------------------------------------------------------------------
+# Template loading
+# ---------------------------------------------------------------------------
+
+# Served from memory through a real loader so Jinja compiles each template
+# once and reuses it, instead of re-parsing the source on every request.
+TEMPLATES = {
+    "base.html": BASE,
+    "task_list.html": TASK_LIST,
+    "task_filters.html": TASK_FILTERS,
+    "task_rows.html": TASK_ROWS,
+    "task_form.html": TASK_FORM,
+    "history.html": HISTORY,
+    "reports.html": REPORTS,
+    "as_of.html": AS_OF,
+    "deleted.html": DELETED,
+    "stats.html": STATS,
+}
+app.jinja_loader = DictLoader(TEMPLATES)
+
+
+def precompile_templates():
+    for name in TEMPLATES:
+        app.jinja_env.get_template(name)
+
+
+precompile_templates()
+
+# ---------------------------------------------------------------------------
+# Fragment cache
+# ---------------------------------------------------------------------------
+
+
+class FragmentCache:
+    """Rendered fragments keyed on request state, valid for one DB version.
+
+    Entries stamped with an older data_version() are treated as misses, so a
+    write anywhere (this app, the CLI, another process) invalidates them.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fragment_cache = FragmentCache()
+
+app.config.setdefault("FRAGMENT_CACHE", True)
+
+# ---------------------------------------------------------------------------
+# Navbar badge
+# ---------------------------------------------------------------------------
+
+@app.context_processor
+def inject_open_count():
+    # The base template calls it, so only full pages read the Status
+    # counters (see tasks_db.task_counts); fragment renders never query.
+    return {"open_count": count_open_tasks}
+
 
 # ---------------------------------------------------------------------------
 # Routes
@@ -515,6 +1016,8 @@ def task_list():
     sel_statuses = request.args.getlist("status") or ([] if cleared else ["Open", "IP", "Wait"])
     sort = request.args.get("sort", "Priority")
     direction = request.args.get("dir", "desc")
+    after = request.args.get("after", "")
+    infinite = request.args.get("scroll") == "1"
 
     # Build return_to so edit/delete can restore this exact view
     qs_parts = []
@@ -526,22 +1029,54 @@ def task_list():
         qs_parts.append(("who", sel_who))
     for s in sel_statuses:
         qs_parts.append(("status", s))
+    if cleared and not sel_statuses:
+        qs_parts.append(("cleared", "1"))
     if sort != "Priority":
         qs_parts.append(("sort", sort))
     if direction != "desc":
         qs_parts.append(("dir", direction))
-    return_to = quote("/?" + urlencode(qs_parts), safe="") if qs_parts else "%2F"
+    view_parts = qs_parts + ([("scroll", "1")] if infinite else [])
+    page_parts = view_parts + ([("after", after)] if after else [])
+    return_to = quote("/?" + urlencode(page_parts), safe="") if page_parts else "%2F"
 
-    if q:
-        rows = run_search_query(q)
-    else:
-        rows = fetch_all(
-            project=sel_project or None,
-            who=sel_who or None,
-            statuses=sel_statuses,
-            sort=sort,
-            direction=direction,
-        )
+    # Read before the rows so the live feed replays anything that lands while
+    # (or after) they are rendered; replaying a change is harmless.
+    seq = change_seq()
+    version = data_version() if app.config["FRAGMENT_CACHE"] else None
+    use_cache = version is not None
+
+    # Table rows (plus paging state) for this exact view and page.
+    rows_key = ("rows", q, sel_project, sel_who, tuple(sel_statuses), cleared,
+                sort, direction, after, infinite)
+    cached = fragment_cache.get(rows_key, version) if use_cache else None
+    if cached is None:
+        cached = _render_rows(q, sel_project, sel_who, sel_statuses, sort, direction,
+                              after, return_to)
+        if use_cache:
+            fragment_cache.put(rows_key, version, cached)
+    rows_html, next_pos, shown, total = cached
+    next_url = ("/?" + urlencode(view_parts + [("after", encode_cursor(next_pos))])
+                if next_pos is not None else None)
+    if request.args.get("partial") == "rows":
+        return rows_html, 200, {"X-Next-Page": next_url or ""}
+
+    # Filter dropdowns and status counts only change with the data version.
+    filters_key = ("filters", q, sel_project, sel_who, tuple(sel_statuses))
+    filters_html = fragment_cache.get(filters_key, version) if use_cache else None
+    if filters_html is None:
+        filters_html = Markup(render_template(
+            "task_filters.html",
+            projects=get_distinct("Project"),
+            whos=get_distinct("Who"),
+            status_totals=status_counts(),
+            all_statuses=ALLOWED_STATUS,
+            q=q,
+            sel_project=sel_project,
+            sel_who=sel_who,
+            sel_statuses=sel_statuses,
+        ))
+        if use_cache:
+            fragment_cache.put(filters_key, version, filters_html)
 
     columns = [
         ("ItemID", "ID"),
@@ -551,12 +1086,17 @@ def task_list():
         ("Priority", "Pri"),
         ("Action", "Title"),
     ]
-    return render_template_string(
-        TASK_LIST,
-        rows=rows,
-        projects=get_distinct("Project"),
-        whos=get_distinct("Who"),
-        all_statuses=ALLOWED_STATUS,
+    return render_template(
+        "task_list.html",
+        rows_html=rows_html,
+        filters_html=filters_html,
+        shown=shown,
+        total=total,
+        paged=bool(after),
+        next_url=next_url,
+        first_url="/?" + urlencode(view_parts),
+        infinite=infinite,
+        toggle_scroll_url="/?" + urlencode(qs_parts + ([] if infinite else [("scroll", "1")])),
         q=q,
         sel_project=sel_project,
         sel_who=sel_who,
@@ -564,10 +1104,44 @@ def task_list():
         sort=sort,
         direction=direction,
         columns=columns,
+        change_seq=seq,
+        whos=get_distinct("Who"),
+        all_statuses=ALLOWED_STATUS,
         return_to=return_to,
     )
 
 
+def _render_rows(q, sel_project, sel_who, sel_statuses, sort, direction, after, return_to):
+    """Query one page and render its rows. Returns (html, next_pos, shown, total)."""
+    # Search pages by offset (relevance has no stable seek key); the list
+    # pages by keyset on the active sort.
+    position = decode_cursor(after)
+    if q:
+        offset = position if isinstance(position, int) and position > 0 else 0
+        rows = run_search_query(q, limit=PAGE_SIZE + 1, offset=offset, lean=True)
+        next_pos = offset + PAGE_SIZE if len(rows) > PAGE_SIZE else None
+        rows = rows[:PAGE_SIZE]
+        total = count_search_results(q)
+    else:
+        rows, next_pos = fetch_page(
+            project=sel_project or None,
+            who=sel_who or None,
+            statuses=sel_statuses,
+            sort=sort,
+            direction=direction,
+            after=position if isinstance(position, list) else None,
+        )
+        total = count_tasks(sel_project or None, sel_who or None, sel_statuses)
+    html = Markup(render_template(
+        "task_rows.html",
+        rows=rows,
+        whos=get_distinct("Who"),
+        all_statuses=ALLOWED_STATUS,
+        return_to=return_to,
+    ))
+    return html, next_pos, len(rows), total
+
+
 # @agent:TaskAddRoute:entry
 @app.route("/add", methods=["GET", "POST"])
 def add_task():
@@ -579,6 +1153,9 @@ def add_task():
         action = request.form.get("action", "").strip()
         notes = request.form.get("notes", "").strip()
         return_to = unquote(request.form.get("return_to", "%2F"))
+        if project and notes and request.form.get("summarize"):
+            insert_task_for_summary(project, who, status, priority, notes, title=action)
+            return redirect(return_to)
         if project and action:
             insert_task(project, who, status, priority, action, notes)
             return redirect(return_to)
@@ -588,10 +1165,11 @@ def add_task():
         Project = Who = Status = Action = Notes = ""
         Priority = 3
 
-    return render_template_string(
-        TASK_FORM,
+    return render_template(
+        "task_form.html",
         form_title="Add Task",
         task=Empty(),
+        can_summarize=True,
         statuses=ALLOWED_STATUS,
         projects=get_distinct("Project"),
         whos=get_distinct("Who"),
@@ -618,8 +1196,8 @@ def edit_task(item_id):
         return redirect(return_to)
 
     return_to = request.args.get("return_to", "%2F")
-    return render_template_string(
-        TASK_FORM,
+    return render_template(
+        "task_form.html",
         form_title=f"Edit Task #{item_id}",
         task=row,
         statuses=ALLOWED_STATUS,
@@ -632,18 +1210,180 @@ def edit_task(item_id):
 # @agent:TaskQuickUpdateRoute:entry
 @app.route("/quick-update/<int:item_id>", methods=["POST"])
 def quick_update(item_id):
-    row = fetch_one(item_id)
-    if row is None:
-        abort(404)
+    """Apply the inline-dropdown field(s) submitted for one task.
+
+    The list's JS posts with partial=row and gets back just that task's
+    <tr>; an Accept: application/json client gets the task as JSON. Plain
+    form posts redirect back to return_to, anchored on the row.
+    """
     # Apply only the field(s) submitted; keep existing values for the rest
-    who = request.form.get("who", row["Who"] or "").strip()
-    status = request.form.get("status", row["Status"] or "Open")
-    priority = request.form.get("priority", row["Priority"] or 3)
-    update_task(item_id, row["Project"] or "", who, status, priority,
-                row["Action"] or "", row["Notes"] or "")
+    try:
+        changed = update_tasks([item_id], _submitted_changes(request.form))
+    except ValueError as e:
+        abort(400, description=str(e))
+    rows = fetch_tasks([item_id])
+    if not rows:
+        abort(404)
+    return_to = request.form.get("return_to", "%2F")
+    if request.form.get("partial") == "row":
+        return _rows_fragment(rows, return_to)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(updated=bool(changed), task=dict(rows[0]))
     anchor = request.form.get("anchor", f"row-{item_id}")
-    return_to = unquote(request.form.get("return_to", "%2F"))
-    return redirect(return_to + f"#{anchor}")
+    return redirect(unquote(return_to) + f"#{anchor}")
+
+
+def _rows_fragment(rows, return_to):
+    """The task_rows.html <tr>s for just these rows (no list query)."""
+    return render_template(
+        "task_rows.html",
+        rows=rows,
+        whos=get_distinct("Who"),
+        all_statuses=ALLOWED_STATUS,
+        return_to=return_to,
+    )
+
+
+# @agent:TaskRowsRoute:entry
+@app.route("/rows")
+def task_rows():
+    """Rendered <tr>s for ?ids=1,2,3 (used by the live feed to patch the list)."""
+    raw = request.args.get("ids", "")
+    ids = [int(i) for i in raw.split(",") if i.strip().isdigit()][:PAGE_SIZE]
+    rows = fetch_tasks(ids) if ids else []
+    return _rows_fragment(rows, request.args.get("return_to", "%2F"))
+
+
+# ---------------------------------------------------------------------------
+# Live change feed
+# ---------------------------------------------------------------------------
+
+EVENTS_POLL_SECONDS = 1.0
+EVENTS_HEARTBEAT_SECONDS = 15
+# Streams end after this long; EventSource reconnects with Last-Event-ID, so
+# a dev-server thread is never pinned to one tab forever.
+EVENTS_MAX_SECONDS = 300
+EVENTS_BATCH = 200
+# Streams open at once in this process (None: no limit). tasks_serve sets it
+# below its thread count, so live-update tabs can't hold every request
+# thread; a tab over the limit is told to reconnect after EVENTS_BUSY_RETRY_MS.
+app.config.setdefault("EVENTS_MAX_STREAMS", None)
+EVENTS_BUSY_RETRY_MS = 15000
+_open_streams = 0
+_streams_lock = threading.Lock()
+
+
+def _claim_stream():
+    global _open_streams
+    limit = app.config["EVENTS_MAX_STREAMS"]
+    with _streams_lock:
+        if limit is not None and _open_streams >= limit:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _release_stream():
+    global _open_streams
+    with _streams_lock:
+        _open_streams -= 1
+
+
+def _sse(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# @agent:ChangeFeedRoute:entry
+@app.route("/events")
+def change_events():
+    """Server-Sent Events: task changes after ?since=<seq> (or Last-Event-ID).
+
+    Each `changes` event carries {"changes": [...], "cursor": seq} as built by
+    changes_since(), with the cursor as the event id. Between batches only the
+    db_version counter is polled. A `reset` event means the cursor is older
+    than the retained change_log and the client should reload.
+    """
+    raw = request.headers.get("Last-Event-ID") or request.args.get("since", "")
+    since = int(raw) if raw.isdigit() else change_seq()
+    if since is None:
+        abort(404)
+
+    def stream(seq):
+        if not _claim_stream():
+            yield f"retry: {EVENTS_BUSY_RETRY_MS}\n\n"
+            return
+        try:
+            yield "retry: 2000\n\n"
+            version = -1
+            started = last_sent = time.monotonic()
+            while time.monotonic() - started < EVENTS_MAX_SECONDS:
+                current = data_version()
+                if current != version:
+                    changes, cursor, reset = changes_since(seq, limit=EVENTS_BATCH)
+                    if reset:
+                        yield _sse("reset", {"cursor": change_seq()})
+                        return
+                    if changes:
+                        yield _sse("changes", {"changes": changes, "cursor": cursor}, cursor)
+                        seq, last_sent = cursor, time.monotonic()
+                    if len(changes) == EVENTS_BATCH:
+                        continue  # more may be queued behind a full batch
+                    version = current
+                elif time.monotonic() - last_sent >= EVENTS_HEARTBEAT_SECONDS:
+                    yield ": ping\n\n"
+                    last_sent = time.monotonic()
+                time.sleep(EVENTS_POLL_SECONDS)
+        finally:
+            _release_stream()
+            # The generator outlives the request context, so teardown has
+            # already run; hand this thread's connection back ourselves.
+            release_connection()
+
+    return Response(stream(since), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _submitted_changes(form):
+    """{column: value} for the quick/bulk-update fields present and non-empty."""
+    return {
+        col: form[col.lower()]
+        for col in BULK_UPDATE_FIELDS
+        if form.get(col.lower(), "").strip()
+    }
+
+
+# @agent:TaskBulkUpdateRoute:entry
+@app.route("/bulk-update", methods=["POST"])
+def bulk_update():
+    """Apply one set of field changes to many tasks in a single transaction.
+
+    Form posts (ids=..., who/status/priority/project) redirect back to
+    return_to; with partial=rows the rendered rows of just the changed tasks
+    are returned instead. A JSON body {"ids": [...], "changes": {...}} gets
+    the changed tasks back as JSON.
+    """
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            abort(400, description="expected a JSON object")
+        ids, changes = body.get("ids", []), body.get("changes", {})
+        # A string would be iterated as its characters.
+        if not isinstance(ids, list) or not isinstance(changes, dict):
+            abort(400, description='"ids" must be a list and "changes" an object')
+    else:
+        ids, changes = request.form.getlist("ids"), _submitted_changes(request.form)
+    try:
+        changed = update_tasks(ids, changes)
+    except (TypeError, ValueError) as e:
+        abort(400, description=str(e))
+    rows = fetch_tasks(changed) if changed else []
+    if request.is_json:
+        return jsonify(updated=changed, tasks=[dict(r) for r in rows])
+    return_to = request.form.get("return_to", "%2F")
+    if request.form.get("partial") == "rows":
+        return _rows_fragment(rows, return_to), 200, {"X-Updated": ",".join(map(str, changed))}
+    return redirect(unquote(return_to))
 
 
 # @agent:TaskDeleteRoute:entry
@@ -665,44 +1405,97 @@ def status_history(item_id):
         abort(404)
     history = fetch_status_history(item_id)
     return_to = request.args.get("return_to", "/")
-    return render_template_string("""
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>Status History — #{{ task['ItemID'] }}</title>
-  <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css">
-</head>
-<body class="p-4">
-  <div class="container" style="max-width:600px;">
-    <h5 class="mb-1">Status History</h5>
-    <p class="text-muted mb-3"><strong>#{{ task['ItemID'] }}</strong> — {{ task['Action'] }}</p>
-    {% if history %}
-    <table class="table table-sm table-bordered">
-      <thead class="table-dark">
-        <tr><th>Status</th><th>Date / Time</th></tr>
-      </thead>
-      <tbody>
-        {% for h in history %}
-        <tr>
-          <td>{{ h['status'] }}</td>
-          <td>{{ h['changed_at'] }}</td>
-        </tr>
-        {% endfor %}
-      </tbody>
-    </table>
-    {% else %}
-    <p class="text-muted">No history recorded for this task.</p>
-    {% endif %}
-    <a href="{{ return_to }}" class="btn btn-outline-secondary btn-sm mt-2">Back</a>
-  </div>
-</body>
-</html>
-""", task=task, history=history, return_to=return_to)
+    return render_template(
+        "history.html", task=task, history=history, versions=fetch_versions(item_id),
+        return_to=return_to,
+    )
+
+
+AS_OF_LIMIT = 1000
+
+
+# @agent:AsOfRoute:entry
+@app.route("/as-of")
+def as_of():
+    at = request.args.get("at", "")
+    sel_project = request.args.get("project", "")
+    sel_who = request.args.get("who", "")
+    sel_status = request.args.get("status", "")
+    rows = None
+    if at:
+        try:
+            at = datetime.fromisoformat(at).isoformat(timespec="seconds")
+        except ValueError:
+            abort(400)
+        rows = fetch_as_of(at, sel_project or None, sel_who or None,
+                           [sel_status] if sel_status else None,
+                           limit=AS_OF_LIMIT, columns=LIST_COLUMNS)
+    return render_template(
+        "as_of.html", at=at, rows=rows, limit=AS_OF_LIMIT,
+        projects=get_distinct("Project"), whos=get_distinct("Who"), statuses=ALLOWED_STATUS,
+        sel_project=sel_project, sel_who=sel_who, sel_status=sel_status,
+    )
+
+
+# @agent:DeletedTasksRoute:entry
+@app.route("/deleted")
+def deleted():
+    return render_template("deleted.html", tasks=deleted_tasks(limit=200))
+
+
+# @agent:TaskRestoreRoute:entry
+@app.route("/restore/<int:item_id>", methods=["POST"])
+def restore_task_route(item_id):
+    if not restore_task(item_id):
+        abort(404)
+    return redirect(f"/history/{item_id}")
+
+
+def _int_arg(name, default, lo, hi):
+    try:
+        return min(max(int(request.args.get(name, default)), lo), hi)
+    except ValueError:
+        return default
+
+
+# @agent:ReportsRoute:entry
+@app.route("/reports")
+def reports():
+    by = request.args.get("by") or None
+    if by not in tasks_reports.GROUP_COLUMNS:
+        by = None
+    days = _int_arg("days", tasks_reports.DEFAULT_DAYS, 1, 3650)
+    weeks = _int_arg("weeks", tasks_reports.DEFAULT_WEEKS, 1, 104)
+    since = tasks_reports.days_ago(days)
+    throughput = tasks_reports.weekly_throughput(weeks=weeks, group_by=by)
+    return render_template(
+        "reports.html",
+        by=by, days=days, weeks=weeks, group_columns=tasks_reports.GROUP_COLUMNS,
+        time_in_status=tasks_reports.time_in_status(since=since, group_by=by),
+        cycle=tasks_reports.cycle_time(since=since, group_by=by),
+        aging=tasks_reports.wip_aging(group_by=by),
+        oldest=tasks_reports.oldest_wip(limit=20),
+        throughput={(r["week"], r["group"]): r["done"] for r in throughput},
+        tp_weeks=sorted({r["week"] for r in throughput}),
+        tp_groups=sorted({r["group"] for r in throughput}),
+    )
+
+
+# @agent:StatsRoute:entry
+@app.route("/_stats", methods=["GET", "POST"])
+def profile_stats():
+    """Timing collected by tasks_profile in this process (404 unless
+    TASKS_PROFILE is set). POST clears it."""
+    if not tasks_profile.ENABLED:
+        abort(404)
+    if request.method == "POST":
+        tasks_profile.reset()
+        return redirect("/_stats")
+    return render_template("stats.html", s=tasks_profile.stats())
 
 
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    ensure_status_history_table()
+    ensure_schema()
     app.run(debug=True, port=5000)
@@ -0,0 +1,170 @@
+"""
+Background worker for the tasks.db job queue.
+
+Claims queued jobs, runs them and records the outcome. Summaries that fail
+(model server down, invalid output, a locked database) are retried with
+exponential backoff up to --max-attempts, then marked failed; unexpected
+errors also print their traceback. Prints throughput and latency
+every --report seconds and on exit.
+
+    python tasks_worker.py                 # run until Ctrl+C
+    python tasks_worker.py --once          # drain what is due, then exit
+    python tasks_worker.py --threads 2     # two jobs at a time
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import tasks_db
+import tasks_profile
+from tasks_db import (
+    SUMMARY_JOB, apply_summary, claim_job, ensure_schema, finish_job, job_counts,
+    release_connection,
+)
+from tasks_llm import SummaryError, summarize
+
+IDLE_POLL_SECONDS = 1.0
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 600
+MAX_ATTEMPTS = 5
+
+
+def backoff_delay(attempts):
+    """Seconds before retry number `attempts`: exponential, capped, jittered."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_summary_job(job):
+    payload = json.loads(job["payload"])
+    title, notes = summarize(payload["text"])
+    apply_summary(job["item_id"], payload["text"], title, notes,
+                  keep_title=payload.get("keep_title", False))
+
+
+HANDLERS = {SUMMARY_JOB: run_summary_job}
+
+
+class Stats:
+    """Thread-safe counters plus per-job queue wait and run time."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = self.failed = self.retried = 0
+        self.wait = []
+        self.run = []
+        self._lock = threading.Lock()
+
+    def record(self, outcome, wait, run):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.wait.append(wait)
+            self.run.append(run)
+
+    def report(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            lines = [
+                f"done={self.done} retried={self.retried} failed={self.failed} "
+                f"throughput={self.done / elapsed * 60:.1f} jobs/min"
+            ]
+            for label, values in (("queue wait", self.wait), ("run time", self.run)):
+                if values:
+                    q = (statistics.quantiles(values, n=20, method="inclusive")
+                         if len(values) > 1 else values * 19)
+                    lines.append(f"  {label}: p50 {statistics.median(values):.2f}s "
+                                 f"p95 {q[18]:.2f}s max {max(values):.2f}s")
+        return "\n".join(lines)
+
+
+def process(job, stats, max_attempts):
+    queued_at = datetime.fromisoformat(job["run_after"])
+    wait = (datetime.now() - queued_at).total_seconds()
+    t0 = time.monotonic()
+    try:
+        with tasks_profile.trace(f"job {job['id']} {job['kind']}"):
+            HANDLERS[job["kind"]](job)
+    except Exception as e:
+        run = time.monotonic() - t0
+        if not isinstance(e, (SummaryError, KeyError, ValueError)):
+            # Unexpected (database locked, client OSError, a bug): keep the
+            # traceback, and retry like any other failure.
+            traceback.print_exc()
+        if job["attempts"] < max_attempts and not isinstance(e, KeyError):
+            retry_at = datetime.now() + timedelta(seconds=backoff_delay(job["attempts"]))
+            finish_job(job["id"], error=str(e), retry_at=retry_at)
+            stats.record("retried", wait, run)
+        else:
+            finish_job(job["id"], error=f"{type(e).__name__}: {e}")
+            stats.record("failed", wait, run)
+        return
+    finish_job(job["id"])
+    stats.record("done", wait, time.monotonic() - t0)
+
+
+def work(worker_id, stats, stop, once, max_attempts):
+    try:
+        while not stop.is_set():
+            job = claim_job(worker_id, kinds=tuple(HANDLERS))
+            if job is None:
+                if once:
+                    return
+                stop.wait(IDLE_POLL_SECONDS)
+                continue
+            try:
+                process(job, stats, max_attempts)
+            except Exception:
+                # finish_job itself failed; the job's lease expires and it is
+                # claimed again. Keep this thread alive.
+                traceback.print_exc()
+                stop.wait(IDLE_POLL_SECONDS)
+    finally:
+        release_connection()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run queued tasks.db jobs.")
+    ap.add_argument("--db", help="path to tasks.db (default: tasks_db.DB)")
+    ap.add_argument("--threads", type=int, default=1)
+    ap.add_argument("--once", action="store_true", help="exit when no job is due")
+    ap.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    ap.add_argument("--report", type=float, default=60, help="seconds between stats lines")
+    args = ap.parse_args()
+    if args.db:
+        tasks_db.DB = args.db
+    ensure_schema()
+
+    stats, stop = Stats(), threading.Event()
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=work, args=(f"{base_id}:{n}", stats, stop, args.once,
+                                            args.max_attempts), daemon=True)
+        for n in range(args.threads)
+    ]
+    for t in threads:
+        t.start()
+    print(f"worker {base_id}: {args.threads} thread(s), queue {job_counts()}")
+    next_report = time.monotonic() + args.report
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.2)
+            if time.monotonic() >= next_report:
+                print(stats.report(), flush=True)
+                next_report += args.report
+    except KeyboardInterrupt:
+        stop.set()
+        for t in threads:
+            t.join()
+    print(stats.report())
+    print(f"queue {job_counts()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Online backup benchmark: how long writers wait while tasks_maint.backup()
+copies the database, per backup step size, next to copying the file under
+the write lock (what a safe plain copy needs).
+
+    python tools/bench_backup.py --rows 50000 --pages 64 256 -1
+
+A writer thread updates one task every few ms throughout. Exits 1 if any
+stepped backup fails its quick_check or its writer p99 exceeds the budget.
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import create_db
+
+import tasks_db
+import tasks_maint
+
+WRITER_P99_BUDGET_MS = 50.0
+WRITE_INTERVAL = 0.002
+
+
+class Writer(threading.Thread):
+    """Updates tasks in a loop and records each write's latency in ms."""
+
+    def __init__(self, rows):
+        super().__init__(daemon=True)
+        self.rows = rows
+        self.latencies = []
+        self.stop = threading.Event()
+
+    def run(self):
+        n = 0
+        while not self.stop.is_set():
+            t0 = time.perf_counter()
+            tasks_db.update_tasks([1 + n % self.rows], {"Priority": 1 + n % 5})
+            self.latencies.append((time.perf_counter() - t0) * 1000)
+            n += 1
+            time.sleep(WRITE_INTERVAL)
+        tasks_db.release_connection()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def measure(label, rows, copy):
+    writer = Writer(rows)
+    writer.start()
+    time.sleep(0.05)
+    writer.latencies.clear()
+    t0 = time.perf_counter()
+    result = copy()
+    seconds = time.perf_counter() - t0
+    writer.stop.set()
+    writer.join()
+    lat = writer.latencies
+    return {"label": label, "seconds": seconds, "writes": len(lat),
+            "p50": statistics.median(lat) if lat else 0.0, "p99": percentile(lat, 0.99),
+            "max": max(lat, default=0.0), "restarts": (result or {}).get("restarts", "-")}
+
+
+def locked_copy(dest):
+    """Copy the file and its WAL while holding the write lock, so no commit
+    lands mid-copy."""
+    with tasks_db.write_transaction():
+        shutil.copy(tasks_db.DB, dest)
+        shutil.copy(tasks_db.DB + "-wal", str(dest) + "-wal")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark online backups against a live writer.")
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--pages", type=int, nargs="+", default=[64, 256, -1],
+                    help="pages per backup step (-1: all at once)")
+    args = ap.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_db.DB = str(Path(tmp) / "tasks.db")
+        create_db(tasks_db.DB, args.rows)
+        tasks_db.ensure_schema()
+        size = Path(tasks_db.DB).stat().st_size
+        print(f"{args.rows} rows, {size / 1048576:.1f} MB; one write every "
+              f"{WRITE_INTERVAL * 1000:.0f} ms during each copy")
+        print(f"{'method':<22} {'time':>8} {'writes':>7} {'p50':>8} {'p99':>8} {'max':>8} restarts")
+        runs = []
+        for pages in args.pages:
+            label = f"backup, {pages} pages" if pages > 0 else "backup, one step"
+            try:
+                runs.append(measure(label, args.rows, lambda: tasks_maint.backup(
+                    Path(tmp) / f"backup{pages}.db", step_pages=pages)))
+            except tasks_maint.MaintenanceError as e:
+                failures.append(f"{label}: {e}")
+        runs.append(measure("file copy, locked", args.rows,
+                            lambda: locked_copy(Path(tmp) / "copy.db")))
+        for r in runs:
+            print(f"{r['label']:<22} {r['seconds'] * 1000:>6.0f}ms {r['writes']:>7} "
+                  f"{r['p50']:>6.1f}ms {r['p99']:>6.1f}ms {r['max']:>6.1f}ms {r['restarts']}")
+            if r["label"].startswith("backup") and r["p99"] > WRITER_P99_BUDGET_MS:
+                failures.append(f"{r['label']}: writer p99 {r['p99']:.1f}ms over "
+                                f"{WRITER_P99_BUDGET_MS:g}ms")
+        tasks_db.close_all_connections()
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Stress benchmark: CLI-style readers and web-style readers/writers hitting the
+same tasks.db at the same time.
+
+Each worker is a separate process (as the CLI and the Flask app are in real
+use). Reports ops/sec, p50/p99 latency and "database is locked" failures.
+
+    python tools/bench_concurrency.py --rows 20000 --cli 4 --web 2 --seconds 10
+    python tools/bench_concurrency.py --journal DELETE   # rollback-journal baseline
+"""
+import argparse
+import multiprocessing as mp
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import PROJECTS, WHOS, WORDS, create_db
+
+
+def _setup(db, journal):
+    import tasks_db
+    tasks_db.DB = db
+    tasks_db.JOURNAL_MODE = journal
+    tasks_db.ensure_schema()
+    return tasks_db
+
+
+def cli_worker(db, journal, seconds, out):
+    """Main-menu redraws, searches and item lookups, like tasks_cli_interactive."""
+    tasks_db = _setup(db, journal)
+    rnd = random.Random()
+    lat, errors = [], 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        try:
+            tasks_db.count_open_tasks()
+            rows = tasks_db.run_search_query(rnd.choice(WORDS))
+            if rows:
+                tasks_db.fetch_one(rows[0]["ItemID"])
+            tasks_db.get_distinct("Project")
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        lat.append(time.perf_counter() - t0)
+    out.put(("cli", lat, errors))
+
+
+def web_worker(db, journal, seconds, max_id, out):
+    """List renders plus quick-updates and adds, like tasks_web."""
+    tasks_db = _setup(db, journal)
+    import tasks_web
+    rnd = random.Random()
+    lat, errors = [], 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        try:
+            tasks_db.fetch_all(statuses=["Open", "IP", "Wait"], sort="Priority")
+            item_id = rnd.randint(1, max_id)
+            row = tasks_db.fetch_one(item_id)
+            if row is not None:
+                tasks_web.update_task(
+                    item_id, row["Project"] or "", row["Who"] or "",
+                    rnd.choice(tasks_db.ALLOWED_STATUS), rnd.randint(1, 5),
+                    row["Action"] or "", row["Notes"] or "",
+                )
+            if rnd.random() < 0.1:
+                tasks_db.insert_task(rnd.choice(PROJECTS), rnd.choice(WHOS),
+                                     "Open", 3, "bench task", "")
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        lat.append(time.perf_counter() - t0)
+    out.put(("web", lat, errors))
+
+
+def _pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--cli", type=int, default=4, help="CLI-style reader processes")
+    ap.add_argument("--web", type=int, default=2, help="web-style reader/writer processes")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--journal", default="WAL", help="journal_mode to run under")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = str(Path(tmp) / "tasks.db")
+        create_db(db, args.rows)
+        _setup(db, args.journal).close_all_connections()
+
+        ctx = mp.get_context("spawn")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=cli_worker, args=(db, args.journal, args.seconds, out))
+                 for _ in range(args.cli)]
+        procs += [ctx.Process(target=web_worker,
+                              args=(db, args.journal, args.seconds, args.rows, out))
+                  for _ in range(args.web)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    print(f"journal={args.journal} rows={args.rows} cli={args.cli} web={args.web} "
+          f"seconds={args.seconds}")
+    for kind in ("cli", "web"):
+        lat = [x for k, l, _ in results if k == kind for x in l]
+        errors = sum(e for k, _, e in results if k == kind)
+        if not lat and not errors:
+            continue
+        print(
+            f"  {kind}: {len(lat) / args.seconds:8.1f} ops/s  "
+            f"p50={_pct(lat, 0.50) * 1000:7.2f}ms  p99={_pct(lat, 0.99) * 1000:7.2f}ms  "
+            f"mean={statistics.fmean(lat) * 1000 if lat else 0:7.2f}ms  locked={errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
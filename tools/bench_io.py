@@ -0,0 +1,87 @@
+"""
+Bulk import/export throughput benchmark.
+
+Writes an N-row CSV, imports it with tasks_io at one or more batch sizes,
+exports it back out as JSONL, and compares against calling insert_task()
+once per row (on a small sample).
+
+    python tools/bench_io.py --rows 1000000 --batch-size 1000 --batch-size 10000
+"""
+import argparse
+import csv
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import create_db, random_task
+
+import tasks_db
+import tasks_io
+
+
+def write_csv(path, rows):
+    rnd = random.Random(7)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(tasks_io.IMPORT_FIELDS)
+        for _ in range(rows):
+            w.writerow(random_task(rnd))
+
+
+def fresh_db(tmp, name):
+    tasks_db.close_all_connections()
+    tasks_db.DB = str(Path(tmp) / name)
+    create_db(tasks_db.DB)
+    tasks_db.ensure_schema()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark tasks_io import/export.")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--batch-size", type=int, action="append",
+                    help="may be repeated (default 5000)")
+    ap.add_argument("--baseline-rows", type=int, default=2000,
+                    help="rows inserted one insert_task() call at a time")
+    args = ap.parse_args()
+    batch_sizes = args.batch_size or [tasks_io.DEFAULT_BATCH_SIZE]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = str(Path(tmp) / "tasks.csv")
+        write_csv(src, args.rows)
+        print(f"rows={args.rows}")
+
+        fresh_db(tmp, "baseline.db")
+        rnd = random.Random(7)
+        t0 = time.perf_counter()
+        for _ in range(args.baseline_rows):
+            tasks_db.insert_task(*random_task(rnd))
+        rate = args.baseline_rows / (time.perf_counter() - t0)
+        print(f"  insert_task per row : {rate:10.0f} rows/s  ({args.baseline_rows} rows)")
+
+        for batch_size in batch_sizes:
+            fresh_db(tmp, f"import_{batch_size}.db")
+            t0 = time.perf_counter()
+            imported, skipped = tasks_io.import_file(src, "csv", batch_size)
+            elapsed = time.perf_counter() - t0
+            print(f"  import batch={batch_size:<7}: {imported / elapsed:10.0f} rows/s  "
+                  f"({imported} rows, {skipped} skipped, {elapsed:.1f}s)")
+
+        out = str(Path(tmp) / "export.jsonl")
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        count = tasks_io.export_file(out, "jsonl")
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  export jsonl        : {count / elapsed:10.0f} rows/s  "
+              f"({count} rows, peak Python memory {peak / 1024:.0f} KiB)")
+        tasks_db.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
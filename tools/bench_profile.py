@@ -0,0 +1,106 @@
+"""
+Profiling overhead: requests/sec for the main routes with TASKS_PROFILE off
+and on, each in a fresh process (the flag is read at import).
+
+    python tools/bench_profile.py --rows 20000 --requests 300
+
+Exits 1 if profiling off installs anything (a connection class other than
+sqlite3.Connection, request hooks, a Server-Timing header, a /_stats page),
+or if profiling on adds more than the budget to any route's requests. The
+budget is absolute: the cost is per query and per request, so on a route
+that takes well under a millisecond it is a large fraction of nothing.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sample_db import create_db
+
+OVERHEAD_BUDGET_MS = 1.0
+ROUTES = [
+    ("list", "/"),
+    ("search", "/?q=invoice"),
+    ("edit form", "/edit/1"),
+    ("history", "/history/1"),
+]
+
+# Run in a child process: prints one JSON object.
+CHILD = r"""
+import json, sqlite3, sys, time
+import tasks_db, tasks_profile, tasks_web
+tasks_db.DB = sys.argv[1]
+tasks_db.ensure_schema()
+n = int(sys.argv[2])
+routes = json.loads(sys.argv[3])
+app = tasks_web.app
+out = {"factory": tasks_db.CONNECTION_FACTORY is sqlite3.Connection,
+       "hooks": sum(len(f) for f in app.before_request_funcs.values()), "rps": {}}
+with app.test_client() as client:
+    for label, url in routes:
+        client.get(url)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            response = client.get(url)
+        out["rps"][label] = n / (time.perf_counter() - t0)
+    out["server_timing"] = "Server-Timing" in response.headers
+    out["stats_status"] = client.get("/_stats").status_code
+print(json.dumps(out))
+"""
+
+
+def run(db, n, enabled):
+    env = dict(os.environ, TASKS_PROFILE="1" if enabled else "0",
+               TASKS_SLOW_SQL_MS="100000")  # no slow-log lines in the output
+    proc = subprocess.run([sys.executable, "-c", CHILD, db, str(n), json.dumps(ROUTES)],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(proc.stderr)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the cost of TASKS_PROFILE.")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--requests", type=int, default=300)
+    args = ap.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = str(Path(tmp) / "tasks.db")
+        create_db(db, args.rows)
+        off = run(db, args.requests, False)
+        on = run(db, args.requests, True)
+
+    if not off["factory"]:
+        failures.append("profiling off: tasks_db does not use sqlite3.Connection")
+    if off["hooks"] != on["hooks"] - 1:
+        failures.append(f"profiling off: {off['hooks']} before_request hook(s), "
+                        f"{on['hooks']} when on")
+    if off["server_timing"] or off["stats_status"] != 404:
+        failures.append("profiling off: Server-Timing header or /_stats still served")
+    if not on["server_timing"] or on["stats_status"] != 200:
+        failures.append("profiling on: no Server-Timing header or /_stats page")
+
+    print(f"{args.rows} rows, {args.requests} requests per route")
+    print(f"{'route':<12} {'off':>9} {'on':>9} {'overhead':>18}")
+    for label, _ in ROUTES:
+        a, b = off["rps"][label], on["rps"][label]
+        ms = (1 / b - 1 / a) * 1000
+        print(f"{label:<12} {a:>7.1f}/s {b:>7.1f}/s {ms:>7.3f}ms/req {a / b - 1:>6.1%}")
+        if ms > OVERHEAD_BUDGET_MS:
+            failures.append(f"{label}: profiling adds {ms:.2f}ms per request, "
+                            f"over {OVERHEAD_BUDGET_MS:g}ms")
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
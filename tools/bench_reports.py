@@ -0,0 +1,77 @@
+"""
+Flow report benchmark: each tasks_reports report over a fixed 90-day window
+as the history grows, against the old approach of reading every
+status_history row into Python and pairing them up per task. Also times
+building status_spans from existing history (migration 4).
+
+    python tools/bench_reports.py --tasks 5000 --years 1 2 4
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import add_history, create_db
+
+import tasks_db
+import tasks_reports
+
+
+def best_ms(fn, runs=3):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return min(times)
+
+
+def python_time_in_status(since):
+    """The pre-report way: scan all history, pair rows, summarise in Python."""
+    rows = tasks_db.get_connection().execute(
+        "SELECT item_id, status, changed_at FROM status_history ORDER BY item_id, id"
+    ).fetchall()
+    days = {}
+    for _, history in groupby(rows, key=lambda r: r["item_id"]):
+        history = list(history)
+        for cur, nxt in zip(history, history[1:]):
+            if nxt["changed_at"] >= since:
+                d = (datetime.fromisoformat(nxt["changed_at"])
+                     - datetime.fromisoformat(cur["changed_at"])).total_seconds() / 86400
+                days.setdefault(cur["status"], []).append(d)
+    return {s: (len(v), statistics.median(v)) for s, v in days.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark status-history reports.")
+    ap.add_argument("--tasks", type=int, default=5000, help="tasks per year of history")
+    ap.add_argument("--years", type=int, nargs="+", default=[1, 2, 4])
+    args = ap.parse_args()
+
+    print(f"{'history':>9} {'spans build':>12} {'python scan':>12}  "
+          + "  ".join(f"{name:>14}" for name in tasks_reports.REPORTS))
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as tmp:
+            tasks_db.DB = str(Path(tmp) / "tasks.db")
+            create_db(tasks_db.DB, args.tasks * years)
+            history = add_history(tasks_db.DB, days=365 * years)
+            tasks_db.migrate(target=3)
+            t0 = time.perf_counter()
+            tasks_db.migrate()
+            build = (time.perf_counter() - t0) * 1000
+            since = tasks_reports.days_ago(tasks_reports.DEFAULT_DAYS)
+            scan = best_ms(lambda: python_time_in_status(since))
+            report_ms = [best_ms(fn) for fn in tasks_reports.REPORTS.values()]
+            tasks_db.close_all_connections()
+        print(f"{history:>9} {build:>10.0f}ms {scan:>10.1f}ms  "
+              + "  ".join(f"{ms:>12.1f}ms" for ms in report_ms))
+
+
+if __name__ == "__main__":
+    main()
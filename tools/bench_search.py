@@ -0,0 +1,87 @@
+"""
+Search-as-you-type benchmark: per-keystroke latency of the in-memory
+TaskIndex (tasks_tui) versus running the FTS query on every keystroke, plus
+the cost of picking up a write through the change log.
+
+    python tools/bench_search.py --rows 10000 --query "deploy invoice"
+
+Exits 1 if the TaskIndex p95 per keystroke is over BUDGET_MS.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import create_db
+
+import tasks_db
+from tasks_tui import TaskIndex
+
+BUDGET_MS = 10.0
+
+
+def keystrokes(query):
+    return [query[:n] for n in range(1, len(query) + 1)]
+
+
+def timed(fn, arg):
+    t0 = time.perf_counter()
+    fn(arg)
+    return (time.perf_counter() - t0) * 1000
+
+
+def pct(ms, p):
+    ms = sorted(ms)
+    return ms[min(len(ms) - 1, int(len(ms) * p))]
+
+
+def summary(label, ms):
+    return (f"  {label:<22} p50 {statistics.median(ms):6.2f}ms  "
+            f"p95 {pct(ms, 0.95):6.2f}ms  max {max(ms):6.2f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark incremental search.")
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--query", default="deploy invoice")
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_db.DB = str(Path(tmp) / "tasks.db")
+        create_db(tasks_db.DB, args.rows)
+        tasks_db.ensure_schema()
+
+        index = TaskIndex()
+        t0 = time.perf_counter()
+        index.load()
+        print(f"rows={args.rows} query={args.query!r}  index load {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+        mem, fts = [], []
+        for _ in range(args.rounds):
+            index.search("")  # start each round from an empty box
+            for q in keystrokes(args.query):
+                mem.append(timed(lambda q: index.search(q, limit=200), q))
+        for _ in range(args.rounds):
+            for q in keystrokes(args.query):
+                fts.append(timed(tasks_db.run_search_query, q.strip() or "a"))
+        print(summary("TaskIndex per key", mem))
+        print(summary("FTS query per key", fts))
+
+        tasks_db.insert_task("Bench", "b", "Open", 3, "new deploy invoice", "")
+        print(f"  refresh after 1 write  {timed(lambda _: index.refresh(), None):6.2f}ms")
+        print(f"  refresh, no change     {timed(lambda _: index.refresh(), None):6.2f}ms")
+        tasks_db.close_all_connections()
+
+        p95 = pct(mem, 0.95)
+        if p95 > BUDGET_MS:
+            print(f"FAIL: TaskIndex p95 {p95:.2f}ms over the {BUDGET_MS:.0f}ms budget")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Load test for the web UI: p50/p99 latency and requests/sec for `/`,
+`/quick-update` and `/edit` at several concurrency levels, against
+tasks_serve.py and, for comparison, the development server
+(`app.run(debug=True)`, as tasks_web.py starts it).
+
+    python tools/bench_serve.py --rows 5000 --concurrency 1 8 32 --seconds 5
+    python tools/bench_serve.py --workers 4 --threads 8 --no-dev
+
+Each client thread keeps one HTTP connection and loops over a mix of list
+loads, inline status changes, edit forms and edit saves. Clients run in
+this process, so on a small machine they compete with the server for CPU;
+compare runs on the same machine. Exits 1 if tasks_serve.py returned any
+error, or if its p99 for `/` at the highest concurrency exceeds the budget.
+"""
+import argparse
+import http.client
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sample_db import create_db
+
+import tasks_serve
+
+P99_BUDGET_MS = 2000.0
+# (label, weight) of each request kind in the client mix.
+MIX = [("GET /", 5), ("POST /quick-update", 3), ("GET /edit", 1), ("POST /edit", 1)]
+FORM = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start(kind, db, port, workers, threads):
+    if kind == "tasks_serve":
+        cmd = [sys.executable, str(ROOT / "tasks_serve.py"), "--db", db, "--port", str(port),
+               "--workers", str(workers), "--threads", str(threads)]
+    else:
+        cmd = [sys.executable, "-c",
+               "import tasks_db, tasks_web; tasks_db.DB = %r; tasks_db.ensure_schema(); "
+               "tasks_web.app.run(debug=True, use_reloader=False, port=%d)" % (db, port)]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"{kind} did not start")
+
+
+def one_request(conn, kind, item_id, rnd):
+    if kind == "GET /":
+        conn.request("GET", "/")
+    elif kind == "POST /quick-update":
+        body = urlencode({"status": rnd.choice(["Open", "IP", "Wait"]), "return_to": "%2F"})
+        conn.request("POST", f"/quick-update/{item_id}", body, FORM)
+    elif kind == "GET /edit":
+        conn.request("GET", f"/edit/{item_id}")
+    else:
+        body = urlencode({"project": "Load", "who": "LT", "status": "IP", "priority": "3",
+                          "action": f"load test edit {item_id}", "notes": "", "return_to": "%2F"})
+        conn.request("POST", f"/edit/{item_id}", body, FORM)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def client(port, rows, until, seed, results, errors):
+    rnd = random.Random(seed)
+    kinds = [k for k, w in MIX for _ in range(w)]
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.monotonic() < until:
+        kind = rnd.choice(kinds)
+        t0 = time.perf_counter()
+        try:
+            status = one_request(conn, kind, rnd.randint(1, rows), rnd)
+        except (OSError, http.client.HTTPException):
+            status = None
+            conn.close()
+        results[kind].append((time.perf_counter() - t0) * 1000)
+        if status is None or status >= 400:
+            errors[kind] += 1
+    conn.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def load(port, rows, concurrency, seconds):
+    results = {k: [] for k, _ in MIX}
+    errors = {k: 0 for k, _ in MIX}
+    until = time.monotonic() + seconds
+    threads = [threading.Thread(target=client, args=(port, rows, until, i, results, errors))
+               for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test the web UI servers.")
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--seconds", type=float, default=5.0, help="per concurrency level")
+    ap.add_argument("--workers", type=int, default=tasks_serve.DEFAULT_WORKERS)
+    ap.add_argument("--threads", type=int, default=tasks_serve.DEFAULT_THREADS)
+    ap.add_argument("--no-dev", action="store_true", help="skip the development server")
+    args = ap.parse_args()
+
+    failures = []
+    servers = ["tasks_serve"] + ([] if args.no_dev else ["dev"])
+    with tempfile.TemporaryDirectory() as tmp:
+        db = str(Path(tmp) / "tasks.db")
+        create_db(db, args.rows)
+        print(f"{args.rows} rows; tasks_serve: {args.workers} worker(s) x {args.threads} "
+              f"thread(s); {args.seconds:g}s per level")
+        print(f"{'server':<12} {'conc':>4}  {'route':<19} {'req/s':>7} {'p50':>9} {'p99':>9} errors")
+        for kind in servers:
+            port = free_port()
+            proc = start(kind, db, port, args.workers, args.threads)
+            try:
+                for c in sorted(args.concurrency):
+                    results, errors = load(port, args.rows, c, args.seconds)
+                    for route, lat in results.items():
+                        p50 = statistics.median(lat) if lat else 0.0
+                        p99 = percentile(lat, 0.99)
+                        print(f"{kind:<12} {c:>4}  {route:<19} {len(lat) / args.seconds:>7.1f} "
+                              f"{p50:>7.1f}ms {p99:>7.1f}ms {errors[route]}")
+                        if kind == "tasks_serve" and errors[route]:
+                            failures.append(f"{route} at concurrency {c}: {errors[route]} error(s)")
+                        if (kind == "tasks_serve" and route == "GET /"
+                                and c == max(args.concurrency) and p99 > P99_BUDGET_MS):
+                            failures.append(f"GET / p99 {p99:.0f}ms at concurrency {c}, "
+                                            f"over {P99_BUDGET_MS:g}ms")
+            finally:
+                proc.terminate()
+                proc.wait(30)
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Start-up benchmark: import time of the entry points (from -X importtime),
+first ensure_schema() on a fresh database versus on one already at
+SCHEMA_VERSION, and wall time of a whole `tasks_cli.py` invocation.
+
+    python tools/bench_startup.py --runs 7
+
+Exits 1 if an entry point's median import time or the warm start-up is over
+budget, or if a module that should load lazily shows up at import.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sample_db import create_db
+
+import tasks_db
+
+# module -> (import budget in ms, modules it must not import eagerly)
+ENTRY_POINTS = {
+    "tasks_cli_interactive": (80, ("pyperclip", "tasks_llm", "http.client", "tasks_tui",
+                                   "prompt_toolkit")),
+    "tasks_cli": (80, ("tasks_llm", "http.client", "tasks_tui", "prompt_toolkit")),
+    "tasks_web": (400, ("tasks_llm", "tasks_tui", "prompt_toolkit")),
+}
+WARM_SCHEMA_BUDGET_MS = 5.0
+CLI_RUN_BUDGET_MS = 250.0
+
+
+def import_profile(module):
+    """(total import ms, set of imported module names) for one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None, set()
+    total, names = 0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        names.add(name.strip())
+        if name.rstrip() == f" {module}":
+            total = int(cumulative) / 1000
+    return total, names
+
+
+def timed_ms(fn):
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark CLI / web start-up.")
+    ap.add_argument("--runs", type=int, default=7)
+    ap.add_argument("--rows", type=int, default=5000)
+    args = ap.parse_args()
+    failures = []
+
+    print("import time (median of fresh interpreters):")
+    for module, (budget, lazy) in ENTRY_POINTS.items():
+        runs = [import_profile(module) for _ in range(args.runs)]
+        times = [t for t, _ in runs if t is not None]
+        if not times:
+            print(f"  {module:<24} skipped (import failed: missing dependency?)")
+            continue
+        median = statistics.median(times)
+        eager = sorted(set(lazy) & runs[0][1])
+        print(f"  {module:<24} {median:7.1f}ms  (budget {budget}ms)"
+              + (f"  eager: {', '.join(eager)}" if eager else ""))
+        if median > budget:
+            failures.append(f"{module} imports in {median:.1f}ms (budget {budget}ms)")
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at start-up")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_db.DB = str(Path(tmp) / "tasks.db")
+        create_db(tasks_db.DB, args.rows)
+        cold = timed_ms(tasks_db.ensure_schema)
+        tasks_db.close_all_connections()
+        warm = statistics.median(
+            timed_ms(lambda: (tasks_db.ensure_schema(), tasks_db.close_all_connections()))
+            for _ in range(args.runs)
+        )
+        print(f"ensure_schema: first run {cold:.1f}ms, already current {warm:.2f}ms "
+              f"(incl. connection setup; budget {WARM_SCHEMA_BUDGET_MS:.0f}ms)")
+        if warm > WARM_SCHEMA_BUDGET_MS:
+            failures.append(f"warm ensure_schema {warm:.2f}ms (budget {WARM_SCHEMA_BUDGET_MS}ms)")
+
+        cmd = [sys.executable, str(ROOT / "tasks_cli.py"), "--db", tasks_db.DB,
+               "stats", "--by", "Status"]
+        run = statistics.median(
+            timed_ms(lambda: subprocess.run(cmd, capture_output=True, check=True))
+            for _ in range(args.runs)
+        )
+        print(f"tasks_cli.py stats: {run:.1f}ms per process (budget {CLI_RUN_BUDGET_MS:.0f}ms)")
+        if run > CLI_RUN_BUDGET_MS:
+            failures.append(f"tasks_cli.py stats {run:.1f}ms (budget {CLI_RUN_BUDGET_MS}ms)")
+
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
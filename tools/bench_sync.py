@@ -0,0 +1,149 @@
+"""
+Sync benchmark: two replicas of the same tasks.db, a fixed number of edits
+on each, then one exchange of changesets (tasks_sync), at growing table
+sizes. Shows changeset size and the time to build and apply it next to the
+size of the file you would otherwise copy.
+
+    python tools/bench_sync.py --rows 5000 20000 80000 --changes 200
+
+Exits 1 if the replicas do not converge, or if syncing the same number of
+changes costs more than 3x (+25ms) at the largest size than at the smallest.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import create_db
+
+import tasks_db
+import tasks_sync
+
+SCALING_FACTOR = 3.0
+SCALING_SLACK_MS = 25.0
+
+
+def use(path):
+    tasks_db.close_all_connections()
+    tasks_db.DB = str(path)
+
+
+def edit(n, seed):
+    """n mixed edits: status and field updates, a few inserts and deletes."""
+    rnd = random.Random(seed)
+    con = tasks_db.get_connection()
+    top = con.execute("SELECT MAX(ItemID) FROM ActionList").fetchone()[0]
+    for i in range(n):
+        item_id = rnd.randint(1, top)
+        kind = i % 10
+        if kind < 6:
+            tasks_db.update_tasks([item_id], {"Status": rnd.choice(tasks_db.ALLOWED_STATUS)})
+        elif kind < 8:
+            tasks_db.update_tasks([item_id], {"Who": rnd.choice(["RM", "JS", "AK"]),
+                                              "Priority": rnd.randint(1, 5)})
+        elif kind == 8:
+            tasks_db.insert_task("Sync", "RM", "Open", 3, f"new task {seed}-{i}", "")
+        else:
+            tasks_db.delete_task(item_id)
+
+
+def snapshot():
+    """{uid: row} for every live task, and the set of history uids."""
+    con = tasks_db.get_connection()
+    tasks = {r[0]: tuple(r)[1:] for r in con.execute(
+        "SELECT u.uid, a.Project, a.Who, a.Status, a.Priority, a.Action, a.Notes "
+        "FROM ActionList a JOIN task_uids u ON u.item_id = a.ItemID"
+    )}
+    history = {tuple(r) for r in con.execute(
+        "SELECT t.uid, h.status, h.changed_at FROM status_history h "
+        "JOIN task_uids t ON t.item_id = h.item_id"
+    )}
+    return tasks, history
+
+
+def ms_since(t0):
+    return (time.perf_counter() - t0) * 1000
+
+
+def run(rows, changes, tmp):
+    base, a, b = (Path(tmp) / f"{name}-{rows}.db" for name in ("base", "a", "b"))
+    create_db(base, rows)
+    use(base)
+    tasks_db.ensure_schema()
+    tasks_db.close_all_connections()
+    shutil.copy(base, a)
+    shutil.copy(base, b)
+
+    use(b)
+    b_id = tasks_sync.replica_id()
+    edit(changes, seed=2)
+    use(a)
+    a_id = tasks_sync.replica_id()
+    edit(changes, seed=1)
+
+    # A -> B, then B -> A: what one pull() does.
+    t0 = time.perf_counter()
+    to_b = tasks_sync.make_changeset(peer=b_id)
+    build_ms = ms_since(t0)
+    size = len(json.dumps(to_b, separators=(",", ":")))
+    use(b)
+    t0 = time.perf_counter()
+    tasks_sync.apply_changeset(to_b)
+    apply_ms = ms_since(t0)
+    t0 = time.perf_counter()
+    to_a = tasks_sync.make_changeset(peer=a_id)
+    back_ms = ms_since(t0)
+    state_b = snapshot()
+    use(a)
+    t0 = time.perf_counter()
+    tasks_sync.apply_changeset(to_a)
+    back_ms += ms_since(t0)
+    converged = snapshot() == state_b
+    tasks_db.close_all_connections()
+    return {
+        "rows": rows, "file_kb": os.path.getsize(a) / 1024, "changeset_kb": size / 1024,
+        "build_ms": build_ms, "apply_ms": apply_ms, "back_ms": back_ms,
+        "total_ms": build_ms + apply_ms + back_ms, "converged": converged,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark changeset sync between replicas.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[5000, 20000, 80000])
+    ap.add_argument("--changes", type=int, default=200, help="edits per replica")
+    args = ap.parse_args()
+
+    print(f"{args.changes} edits on each of two replicas, then one two-way exchange")
+    print(f"{'rows':>7} {'db file':>10} {'changeset':>10} {'build':>8} {'apply':>8} "
+          f"{'B->A':>8} {'total':>8}  converged")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sorted(args.rows):
+            r = run(rows, args.changes, tmp)
+            results.append(r)
+            print(f"{r['rows']:>7} {r['file_kb']:>8.0f}KB {r['changeset_kb']:>8.1f}KB "
+                  f"{r['build_ms']:>6.1f}ms {r['apply_ms']:>6.1f}ms {r['back_ms']:>6.1f}ms "
+                  f"{r['total_ms']:>6.1f}ms  {'yes' if r['converged'] else 'NO'}")
+
+    failures = [f"replicas differ after sync at {r['rows']} rows"
+                for r in results if not r["converged"]]
+    small, large = results[0], results[-1]
+    budget = small["total_ms"] * SCALING_FACTOR + SCALING_SLACK_MS
+    if len(results) > 1 and large["total_ms"] > budget:
+        failures.append(f"sync at {large['rows']} rows took {large['total_ms']:.1f}ms, "
+                        f"over {budget:.1f}ms ({SCALING_FACTOR:g}x {small['rows']} rows "
+                        f"+ {SCALING_SLACK_MS:g}ms)")
+    for f in failures:
+        print(f"FAIL: {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
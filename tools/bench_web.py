@@ -0,0 +1,116 @@
+"""
+Web rendering benchmark: requests/sec for the main routes with the fragment
+cache off and on, the template cost of compiling per request (the old
+render_template_string path) versus the precompiled template, and a triage
+pass (re-prioritise N rows) as N quick-updates versus one bulk-update.
+
+    python tools/bench_web.py --rows 20000 --requests 300
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import create_db
+
+import tasks_db
+
+ROUTES = [
+    ("list", "/"),
+    ("list sorted", "/?sort=Status&dir=asc&cleared=1"),
+    ("search", "/?q=invoice"),
+    ("edit form", "/edit/1"),
+    ("history", "/history/1"),
+]
+
+
+def requests_per_sec(client, url, n):
+    client.get(url)  # warm up
+    t0 = time.perf_counter()
+    for _ in range(n):
+        client.get(url)
+    return n / (time.perf_counter() - t0)
+
+
+def bench_templates(app, n):
+    """Compile-per-render vs cached template, same context, no DB access."""
+    from tasks_web import TEMPLATES
+    ctx = dict(
+        rows_html="", filters_html="", shown=0, total=0, paged=False, next_url=None,
+        first_url="/", infinite=False, toggle_scroll_url="/", q="", sel_project="",
+        sel_who="", sel_statuses=[], sort="Priority", direction="desc",
+        columns=[("ItemID", "ID")], whos=[], all_statuses=tasks_db.ALLOWED_STATUS,
+        return_to="%2F",
+    )
+    env = app.jinja_env
+    with app.test_request_context("/"):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            env.from_string(TEMPLATES["task_list.html"]).render(ctx)
+        per_request = (time.perf_counter() - t0) / n
+        template = env.get_template("task_list.html")
+        t0 = time.perf_counter()
+        for _ in range(n):
+            template.render(ctx)
+        precompiled = (time.perf_counter() - t0) / n
+    return per_request, precompiled
+
+
+def bench_triage(client, n):
+    """Seconds to re-prioritise n rows: n quick-updates (each followed by the
+    full list reload) versus one bulk-update returning just those rows."""
+    ids = [r[0] for r in tasks_db.get_connection().execute(
+        "SELECT ItemID FROM ActionList ORDER BY ItemID LIMIT ?", (n,))]
+    t0 = time.perf_counter()
+    for i in ids:
+        client.post(f"/quick-update/{i}", data={"priority": "1", "return_to": "%2F"},
+                    follow_redirects=True)
+    one_by_one = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    client.post("/bulk-update", data={"ids": [str(i) for i in ids], "priority": "2",
+                                      "partial": "rows", "return_to": "%2F"})
+    bulk = time.perf_counter() - t0
+    return one_by_one, bulk
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark tasks_web rendering.")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--triage", type=int, default=50, help="rows re-prioritised in the triage pass")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_db.DB = str(Path(tmp) / "tasks.db")
+        create_db(tasks_db.DB, args.rows)
+        tasks_db.ensure_schema()
+
+        import tasks_web
+        app = tasks_web.app
+        client = app.test_client()
+
+        print(f"rows={args.rows} requests={args.requests}")
+        print(f"  {'route':<12} {'cache off':>12} {'cache on':>12}")
+        for label, url in ROUTES:
+            app.config["FRAGMENT_CACHE"] = False
+            off = requests_per_sec(client, url, args.requests)
+            app.config["FRAGMENT_CACHE"] = True
+            tasks_web.fragment_cache.clear()
+            on = requests_per_sec(client, url, args.requests)
+            print(f"  {label:<12} {off:9.1f}/s {on:9.1f}/s")
+
+        per_request, precompiled = bench_templates(app, args.requests)
+        print(f"  task_list.html: compile per request {per_request * 1000:.2f}ms, "
+              f"precompiled {precompiled * 1000:.2f}ms")
+
+        one_by_one, bulk = bench_triage(client, args.triage)
+        print(f"  triage {args.triage} rows: quick-update x{args.triage} {one_by_one * 1000:.0f}ms, "
+              f"bulk-update {bulk * 1000:.1f}ms")
+        tasks_db.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
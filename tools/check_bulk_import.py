@@ -0,0 +1,72 @@
+"""
+Regression check for tasks_db.insert_tasks: a bulk import must leave the
+derived tables exactly as one insert_task per row would.
+
+Runs on a scratch database where the newest task has been deleted (its
+history stays behind with a higher item_id than any live task), then checks:
+
+  - the import succeeds and every new task has one status_history row, one
+    status_spans row and, with sync enabled, one history_uids stamp;
+  - no history row has more than one span or stamp;
+  - task_counts agrees with a recount (check_counters).
+
+    python tools/check_bulk_import.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import create_db
+
+import tasks_db
+
+ROWS = [("Import", "BI", "Open", 3, f"bulk task {i}", "") for i in range(20)]
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_db.DB = str(Path(tmp) / "tasks.db")
+        create_db(tasks_db.DB, 50)
+        tasks_db.ensure_schema()
+        doomed = tasks_db.insert_task("Import", "BI", "IP", 2, "deleted before import", "")
+        tasks_db.delete_task(doomed)
+        try:
+            inserted = tasks_db.insert_tasks(ROWS)
+        except Exception as e:
+            failures.append(f"insert_tasks after a delete: {type(e).__name__}: {e}")
+            inserted = 0
+        if inserted:
+            con = tasks_db.get_connection()
+            new = "(SELECT ItemID FROM ActionList WHERE Project = 'Import')"
+            one_each = {
+                "status_history": f"SELECT COUNT(*) FROM status_history WHERE item_id IN {new}",
+                "status_spans": f"SELECT COUNT(*) FROM status_spans WHERE item_id IN {new}",
+            }
+            if tasks_db._present_triggers(con, ["sync_history_ai"]):
+                one_each["history_uids"] = (
+                    f"SELECT COUNT(*) FROM history_uids u JOIN status_history h "
+                    f"ON h.id = u.history_id WHERE h.item_id IN {new}")
+            for table, sql in one_each.items():
+                n = con.execute(sql).fetchone()[0]
+                if n != len(ROWS):
+                    failures.append(f"{table}: {n} row(s) for {len(ROWS)} imported tasks")
+            doubled = con.execute(
+                "SELECT COUNT(*) FROM (SELECT history_id FROM status_spans "
+                "GROUP BY history_id HAVING COUNT(*) > 1)").fetchone()[0]
+            if doubled:
+                failures.append(f"status_spans: {doubled} history row(s) with several spans")
+            for col, value, stored, counted in tasks_db.check_counters():
+                failures.append(f"task_counts {col}={value!r}: stored {stored}, counted {counted}")
+        tasks_db.close_all_connections()
+    for f in failures:
+        print(f"FAIL: {f}")
+    if not failures:
+        print(f"ok: bulk import of {len(ROWS)} rows after deleting the newest task")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
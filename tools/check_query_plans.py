@@ -0,0 +1,122 @@
+"""
+Query-plan regression check for the task list.
+
+Builds a scratch database with the managed schema (FTS index + TASK_INDEXES),
+runs EXPLAIN QUERY PLAN for every filter/sort combination the task list UI
+can produce, and exits 1 if any of them regressed:
+
+  - a filtered query must SEARCH an index, never SCAN ActionList;
+  - the same holds for keyset-paged queries (fetch_page with `after`);
+  - an unfiltered query must read rows in sort order (no temp B-tree, apart
+    from the Priority tiebreak of a descending Status sort);
+  - search must go through the FTS index;
+  - an as-of query must read task_versions by changed_at range only.
+
+    python tools/check_query_plans.py        # -v prints every plan
+"""
+import argparse
+import itertools
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sample_db import create_db
+
+import tasks_db
+from tasks_db import ALLOWED_STATUS, SORT_COLUMNS
+
+# Status checkbox selections: none, a single status, the default view, all.
+STATUS_SELECTIONS = [[], ["Open"], ["Open", "IP", "Wait"], list(ALLOWED_STATUS)]
+
+
+def explain(con, sql, params):
+    return [r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def list_violations(plan, filtered, sort, direction):
+    problems = []
+    scans_table = any(
+        step.startswith("SCAN ActionList") and "USING" not in step for step in plan
+    )
+    if filtered and (scans_table or not any(step.startswith("SEARCH") for step in plan)):
+        problems.append("filtered query does not use an index")
+    if not filtered:
+        for step in plan:
+            if "TEMP B-TREE" not in step:
+                continue
+            if sort == "Status" and direction == "desc" and "RIGHT PART" in step:
+                continue
+            problems.append("unfiltered sort needs a temp B-tree")
+    return problems
+
+
+def check(verbose=False):
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_db.DB = str(Path(tmp) / "tasks.db")
+        create_db(tasks_db.DB, rows=200)
+        tasks_db.ensure_schema()
+        con = tasks_db.get_connection()
+
+        combos = itertools.product(
+            [None, "Integrate"], [None, "RM"], STATUS_SELECTIONS,
+            SORT_COLUMNS, ["asc", "desc"],
+        )
+        for project, who, statuses, sort, direction in combos:
+            # The full list, and a later page seeking past a real row.
+            _, after = tasks_db.fetch_page(project, who, statuses, sort, direction, limit=5)
+            for page, seek in (("all", None), ("page2", after)):
+                sql, params = tasks_db.build_task_query(
+                    project, who, statuses, sort, direction,
+                    after=seek, limit=tasks_db.PAGE_SIZE if seek else None,
+                )
+                plan = explain(con, sql, params)
+                filtered = bool(project or who or statuses)
+                problems = list_violations(plan, filtered, sort, direction)
+                label = (f"project={project} who={who} statuses={len(statuses)} "
+                         f"sort={sort} {direction} {page}")
+                if problems or verbose:
+                    print(f"{'FAIL' if problems else 'ok  '} {label}: {' | '.join(plan)}")
+                    for p in problems:
+                        print(f"       {p}")
+                failures += bool(problems)
+
+        match = tasks_db.build_match_query("invoice")
+        plan = explain(
+            con,
+            "SELECT a.ItemID FROM ActionList_fts "
+            "JOIN ActionList AS a ON a.ItemID = ActionList_fts.rowid "
+            "WHERE ActionList_fts MATCH ?",
+            (match,),
+        )
+        uses_fts = any("VIRTUAL TABLE INDEX" in step for step in plan)
+        if not uses_fts or verbose:
+            print(f"{'ok  ' if uses_fts else 'FAIL'} search: {' | '.join(plan)}")
+        failures += not uses_fts
+
+        sql = tasks_db._as_of_sql(tasks_db.LIST_COLUMNS)
+        plan = explain(con, sql, ("2000-01-01",))
+        ranged = any("task_versions USING COVERING INDEX ix_task_versions_changed" in step
+                     for step in plan)
+        full = any(step.startswith("SCAN task_versions") for step in plan)
+        ok = ranged and not full
+        if not ok or verbose:
+            print(f"{'ok  ' if ok else 'FAIL'} as-of: {' | '.join(plan)}")
+        failures += not ok
+        tasks_db.close_all_connections()
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check task list query plans.")
+    ap.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = ap.parse_args()
+    failures = check(args.verbose)
+    print(f"{failures} plan regression(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
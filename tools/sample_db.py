@@ -0,0 +1,99 @@
+"""
+Throwaway tasks.db files for the benchmarks and checks in this folder.
+"""
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tasks_db import ALLOWED_STATUS
+
+# Same shape as the table tasks_db migration 2 leaves.
+SCHEMA = """
+    CREATE TABLE ActionList (
+        ItemID   INTEGER PRIMARY KEY AUTOINCREMENT,
+        Project  TEXT,
+        Who      TEXT,
+        Status   TEXT,
+        Priority INTEGER,
+        Action   TEXT,
+        Notes    TEXT
+    );
+"""
+
+PROJECTS = ["Integrate", "Website", "Billing", "Ops", "Research"]
+WHOS = ["RM", "JS", "AK", "TB", "LW"]
+WORDS = "alpha beta gamma delta invoice report deploy review server client budget".split()
+
+
+def random_task(rnd):
+    return (
+        rnd.choice(PROJECTS),
+        rnd.choice(WHOS),
+        rnd.choice(ALLOWED_STATUS),
+        rnd.randint(1, 5),
+        " ".join(rnd.choices(WORDS, k=5)),
+        " ".join(rnd.choices(WORDS, k=40)),
+    )
+
+
+def create_db(path, rows=0, seed=1):
+    """Create an ActionList database at path with `rows` random tasks."""
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    rnd = random.Random(seed)
+    con.executemany(
+        "INSERT INTO ActionList (Project, Who, Status, Priority, Action, Notes) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (random_task(rnd) for _ in range(rows)),
+    )
+    con.commit()
+    con.close()
+
+
+# Typical paths a task takes through the statuses.
+FLOWS = [
+    ("Open", "IP", "Done"),
+    ("Open", "IP", "Revw", "Done"),
+    ("Open", "IP", "Wait", "IP", "Revw", "Done"),
+    ("Open", "Wait", "IP"),
+    ("Open", "IP", "Revw"),
+    ("Open", "Defrd"),
+    ("Open", "Cncld"),
+    ("Open",),
+]
+
+
+def add_history(path, days=365, seed=1):
+    """Give every task in path a status_history trail ending in its Status.
+
+    Tasks start within the last `days` days and move on every 0.5-10 days.
+    Run before tasks_db.ensure_schema() so the spans are built from it.
+    """
+    rnd = random.Random(seed)
+    now = datetime.now()
+    con = sqlite3.connect(path)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS status_history ("
+        "  id INTEGER PRIMARY KEY AUTOINCREMENT, item_id INTEGER NOT NULL, "
+        "  status TEXT NOT NULL, changed_at TEXT NOT NULL)"
+    )
+    rows = []
+    for item_id, in con.execute("SELECT ItemID FROM ActionList ORDER BY ItemID").fetchall():
+        flow = rnd.choice(FLOWS)
+        at = now - timedelta(days=rnd.uniform(0, days))
+        for status in flow:
+            if at >= now:
+                break
+            rows.append((item_id, status, at.isoformat(timespec="seconds")))
+            at += timedelta(days=rnd.uniform(0.5, 10))
+        con.execute("UPDATE ActionList SET Status = ? WHERE ItemID = ?", (rows[-1][1], item_id))
+    rows.sort(key=lambda r: r[2])
+    con.executemany("INSERT INTO status_history (item_id, status, changed_at) VALUES (?, ?, ?)",
+                    rows)
+    con.commit()
+    con.close()
+    return len(rows)
@@ -0,0 +1,100 @@
+"""
+Stub Ollama server: answers POST /api/generate with a streamed, valid
+summary built from the prompt text, so tasks_llm can be exercised without a
+model. Speaks HTTP/1.1 keep-alive and prints request / connection counts.
+
+    python tools/stub_ollama.py --port 11435 --token-delay 0.01
+    OLLAMA_HOST=http://127.0.0.1:11435 python tasks_llm.py < notes.txt
+
+--fail-first N answers the first N generate calls with invalid JSON, to
+exercise the retry path.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+stats = {"requests": 0, "connections": 0}
+_stats_lock = threading.Lock()
+
+
+def fake_summary(prompt):
+    text = prompt.split("Text:\n", 1)[-1].split("\n\nYour previous response", 1)[0]
+    words = re.findall(r"\w+", text) or ["empty"]
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()] or [text]
+    return {
+        "title": " ".join(words[:8])[:80],
+        "summary": " ".join(sentences[:2])[:400],
+        "bullets": [" ".join(words[i:i + 6])[:120] for i in range(0, 18, 6) if words[i:i + 6]],
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    token_delay = 0.0
+    fail_first = 0
+
+    def setup(self):
+        super().setup()
+        with _stats_lock:
+            stats["connections"] += 1
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with _stats_lock:
+            stats["requests"] += 1
+            failing = stats["requests"] <= self.fail_first
+        text = "not json" if failing else json.dumps(fake_summary(body.get("prompt", "")))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        tokens = re.findall(r".{1,8}", text, re.S)
+        for tok in tokens:
+            self._chunk({"model": body.get("model"), "response": tok, "done": False})
+            if self.token_delay:
+                time.sleep(self.token_delay)
+        self._chunk({"model": body.get("model"), "response": "", "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, msg):
+        data = (json.dumps(msg) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def serve(port, token_delay=0.0, fail_first=0):
+    """Start the stub in a background thread; returns the server."""
+    Handler.token_delay = token_delay
+    Handler.fail_first = fail_first
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake Ollama /api/generate for tests.")
+    ap.add_argument("--port", type=int, default=11435)
+    ap.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    ap.add_argument("--fail-first", type=int, default=0, help="return invalid JSON for the first N calls")
+    args = ap.parse_args()
+    serve(args.port, args.token_delay, args.fail_first)
+    print(f"stub ollama on http://127.0.0.1:{args.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"  requests={stats['requests']} connections={stats['connections']}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()